@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from typing import Optional, Set
+import random
+
+from db.database import get_db
+from db.queries import get_room
+from services.catalog import get_catalog
+from services.draft import build_pick_schedule
+from services.mock_draft import MAX_SIMULATIONS, build_setup, run_mock_draft_async, summarize
+from services.room_state import room_states
+
+router = APIRouter(prefix="/api/rooms", tags=["mock-drafts"])
+
+# Rooms with a simulation running in this process; one at a time per room
+_running: Set[UUID] = set()
+
+
+@router.get("/{room_id}/mock-draft")
+async def mock_draft(
+    room_id: UUID,
+    simulations: int = Query(1000, ge=1, le=MAX_SIMULATIONS),
+    seed: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Simulate the rest of the room's draft many times. Returns each player's
+    expected pick and how often they went, and each draft slot's likely
+    roster and expected points. Picks already made are kept as they are.
+    Only one simulation per room runs at a time; others get 429.
+    """
+    state = await room_states.get(room_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Room not found")
+    if len(state.participants) < 2:
+        raise HTTPException(status_code=400, detail="Need at least 2 participants to simulate")
+    
+    pick_order = list(state.pick_order)
+    if not pick_order:
+        # Not started: simulate the order the room would draft in with who has joined so far
+        room = await get_room(db, room_id)
+        index_by_position = {p.draft_position: i for i, p in enumerate(state.participants)}
+        try:
+            schedule = build_pick_schedule(
+                room.draft_order or "snake", len(state.participants), state.total_rounds, room.custom_order
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        pick_order = [index_by_position[position] for position in schedule]
+    
+    if state.current_pick >= len(pick_order):
+        raise HTTPException(status_code=400, detail="Draft is already complete")
+    
+    if room_id in _running:
+        raise HTTPException(status_code=429, detail="A mock draft for this room is already running")
+    
+    _running.add(room_id)
+    try:
+        catalog = await get_catalog()
+        rosters = [list(roster) for roster in state.rosters]
+        setup = build_setup(catalog, pick_order, rosters, state.current_pick)
+        totals = await run_mock_draft_async(setup, simulations, seed if seed is not None else random.randrange(2 ** 31))
+    finally:
+        _running.discard(room_id)
+    return summarize(catalog, setup, totals, [p.user_name for p in state.participants], rosters)
+
@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from uuid import UUID
 from typing import List, Dict
 
 from db.database import get_db
-from db.queries import get_picks_by_room, get_teams_by_room
+from db.queries import get_picks_by_room, get_teams_by_room, get_draft_results
 from api.players import PlayerResponse
 
 router = APIRouter(prefix="/api/rooms", tags=["picks"])
@@ -26,6 +26,22 @@ class TeamsResponse(BaseModel):
     teams: Dict[str, List[PlayerResponse]]
 
 
+class TeamResultResponse(BaseModel):
+    user_name: str
+    draft_position: int
+    grade: str
+    rank: int
+    projected_points: float
+    total_points: float
+    value_over_adp: float
+    positional_strength: Dict[str, float]
+
+
+class ResultsResponse(BaseModel):
+    # Best first
+    results: List[TeamResultResponse]
+
+
 @router.get("/{room_id}/picks", response_model=PicksListResponse)
 async def get_picks(
     room_id: UUID,
@@ -56,3 +72,28 @@ async def get_teams(
     }
     return TeamsResponse(teams=teams_data)
 
+
+
+@router.get("/{room_id}/results", response_model=ResultsResponse)
+async def get_results(
+    room_id: UUID,
+    db: AsyncSession = Depends(get_db)
+) -> ResultsResponse:
+    """Team grades computed by the worker after the draft; 404 until they are ready."""
+    results = await get_draft_results(db, room_id)
+    if not results:
+        raise HTTPException(status_code=404, detail="Results not ready")
+    
+    return ResultsResponse(results=[
+        TeamResultResponse(
+            user_name=r.participant.user_name,
+            draft_position=r.participant.draft_position,
+            grade=r.grade,
+            rank=r.rank,
+            projected_points=float(r.projected_points),
+            total_points=float(r.total_points),
+            value_over_adp=float(r.value_over_adp),
+            positional_strength=r.positional_strength
+        )
+        for r in results
+    ])
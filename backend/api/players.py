@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from uuid import UUID
-from typing import List
+from typing import List, Optional
+import base64
+import orjson
 
 from db.database import get_db
-from db.queries import get_all_players, get_available_players
 
 router = APIRouter(prefix="/api/players", tags=["players"])
 
@@ -34,21 +35,125 @@ class PlayerResponse(BaseModel):
 
 class PlayersListResponse(BaseModel):
     players: List[PlayerResponse]
+    # Pass back as cursor to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+
+class PlayerFilters:
+    """Query parameters shared by the player list endpoints."""
+    
+    def __init__(
+        self,
+        position: Optional[str] = None,
+        team: Optional[str] = None,
+        sort: str = "fantasy_pts",
+        search: Optional[str] = None,
+        match: str = Query("prefix", pattern="^(prefix|substring)$"),
+        limit: Optional[int] = Query(None, ge=1, le=500),
+        cursor: Optional[str] = None
+    ):
+        from services.catalog import SORT_KEYS
+        if sort not in SORT_KEYS:
+            raise HTTPException(status_code=400, detail=f"Cannot sort by {sort}")
+        
+        self.position = position.upper() if position else None
+        self.team = team.upper() if team else None
+        self.sort = sort
+        self.search = search.strip() if search else None
+        self.match = match
+        self.limit = limit
+        self.cursor = cursor
+    
+    @property
+    def is_default(self) -> bool:
+        return not (self.position or self.team or self.search or self.limit or self.cursor) and self.sort == "fantasy_pts"
+    
+    def query_args(self, catalog) -> dict:
+        """Keyword arguments for PlayerCatalog.query, one row past the page to detect a next page."""
+        return {
+            "sort": self.sort,
+            "position": self.position,
+            "team": self.team,
+            "search": self.search,
+            "match": self.match,
+            "after": self._after(catalog),
+            "limit": self.limit + 1 if self.limit else None,
+        }
+    
+    def page(self, catalog, indexes: List[int]) -> Response:
+        next_cursor = None
+        if self.limit and len(indexes) > self.limit:
+            indexes = indexes[:self.limit]
+            next_cursor = _encode_cursor(self.sort, str(catalog.ids[indexes[-1]]))
+        body = {"players": [catalog.players[i] for i in indexes], "next_cursor": next_cursor}
+        return Response(orjson.dumps(body), media_type="application/json")
+    
+    def _after(self, catalog) -> Optional[int]:
+        if not self.cursor:
+            return None
+        try:
+            data = orjson.loads(base64.urlsafe_b64decode(self.cursor.encode()))
+            index = catalog.index_of.get(UUID(data["after"]))
+            if data["sort"] != self.sort or index is None:
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return index
+
+
+def _encode_cursor(sort: str, after_player_id: str) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps({"sort": sort, "after": after_player_id})).decode()
 
 
 @router.get("", response_model=PlayersListResponse)
 async def get_players(
+    request: Request,
+    filters: PlayerFilters = Depends(),
     db: AsyncSession = Depends(get_db)
-) -> PlayersListResponse:
-    players = await get_all_players(db)
-    return PlayersListResponse(players=[PlayerResponse.model_validate(p) for p in players])
+) -> Response:
+    """
+    The player catalog, optionally filtered, sorted and paged.
+    Unfiltered requests get the pre-encoded catalog, with a 304 when the client's ETag is current.
+    """
+    from services.catalog import get_catalog
+    catalog = await get_catalog(db)
+    
+    if not filters.is_default:
+        return filters.page(catalog, catalog.query(**filters.query_args(catalog)))
+    
+    # Each encoding is its own representation, with its own strong ETag
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "ETag": catalog.etag_gzip if use_gzip else catalog.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding"
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match:
+        # Weak comparison, as If-None-Match uses; either tag means the client's copy is current
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or catalog.etag in tags or catalog.etag_gzip in tags:
+            return Response(status_code=304, headers=headers)
+    
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(catalog.body_gzip, media_type="application/json", headers=headers)
+    return Response(catalog.body, media_type="application/json", headers=headers)
 
 
 @router.get("/rooms/{room_id}/available", response_model=PlayersListResponse)
 async def get_available_players_for_room(
     room_id: UUID,
+    filters: PlayerFilters = Depends(),
     db: AsyncSession = Depends(get_db)
-) -> PlayersListResponse:
-    players = await get_available_players(db, room_id)
-    return PlayersListResponse(players=[PlayerResponse.model_validate(p) for p in players])
-
+) -> Response:
+    """Undrafted players in the room, filtered, sorted and paged like /api/players, from the room's in-memory index."""
+    from services.catalog import get_catalog
+    from services.room_state import room_states
+    
+    state = await room_states.get(room_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Room not found")
+    
+    catalog = await get_catalog(db)
+    return filters.page(catalog, state.available.top(**filters.query_args(catalog)))
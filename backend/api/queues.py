@@ -0,0 +1,64 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from uuid import UUID
+from typing import List
+
+from api.players import PlayerResponse
+from services.catalog import get_catalog
+from services.room_actor import room_actors
+from services.room_state import room_states, set_pick_queue, PickError
+
+router = APIRouter(prefix="/api/rooms", tags=["queues"])
+
+
+class SetQueueRequest(BaseModel):
+    # Best first
+    player_ids: List[UUID]
+
+
+class QueueResponse(BaseModel):
+    user_name: str
+    players: List[PlayerResponse]
+
+
+@router.get("/{room_id}/queue/{user_name}", response_model=QueueResponse)
+async def get_queue(room_id: UUID, user_name: str) -> QueueResponse:
+    state = await room_states.get(room_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Room not found")
+    if not state.participant(user_name):
+        raise HTTPException(status_code=404, detail="Participant not found")
+    
+    catalog = await get_catalog()
+    queue = state.queues.get(state.slot_by_name[user_name])
+    return QueueResponse(user_name=user_name, players=[catalog.get(pid) for pid in queue])
+
+
+@router.put("/{room_id}/queue/{user_name}", response_model=QueueResponse)
+async def set_queue(room_id: UUID, user_name: str, request: SetQueueRequest) -> QueueResponse:
+    """Replace the user's pick queue. Already drafted players are dropped."""
+    # Serialized with picks for the same room
+    return await room_actors.submit(
+        room_id, "queue_set", lambda: _set_queue(room_id, user_name, request.player_ids)
+    )
+
+
+async def _set_queue(room_id: UUID, user_name: str, player_ids: List[UUID]) -> QueueResponse:
+    from websocket.handlers import queue_message
+    from websocket.manager import manager
+    
+    state = await room_states.get(room_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Room not found")
+    if not state.participant(user_name):
+        raise HTTPException(status_code=404, detail="Participant not found")
+    
+    catalog = await get_catalog()
+    try:
+        queue = set_pick_queue(state, user_name, player_ids)
+    except PickError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Keep the user's open sockets in step
+    await manager.send_to_user(str(room_id), user_name, queue_message(queue))
+    return QueueResponse(user_name=user_name, players=[catalog.get(pid) for pid in queue])
@@ -3,26 +3,29 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from uuid import UUID
 from typing import List, Optional
-import random
-import string
 
 from db.database import get_db
-from db.models import DraftRoom, Participant
-from db.queries import get_room, get_room_by_code, get_participants_by_room, get_participant
+from db.models import Participant
+from db.queries import get_room, get_room_by_code, get_participants_by_room, join_room_row
+from services.autopick import STRATEGIES
+from services.draft import DRAFT_ORDERS, build_pick_schedule
+from services.queue import enqueue_event, event_publisher
+from services.room_codes import create_room_with_code
+from services.room_actor import room_actors
 from sqlalchemy import select
 
 router = APIRouter(prefix="/api/rooms", tags=["rooms"])
 
 
-def generate_room_code() -> str:
-    return ''.join(random.choices(string.ascii_uppercase, k=4))
-
-
 class CreateRoomRequest(BaseModel):
     name: str
     host_name: str
     turn_time_sec: int = 30
     total_rounds: int = 3
+    draft_order: str = "snake"
+    # Draft position for every pick, when draft_order is "custom"
+    custom_order: Optional[List[int]] = None
+    autopick_strategy: str = "roster_aware"
 
 
 class CreateRoomResponse(BaseModel):
@@ -42,11 +45,12 @@ class JoinRoomResponse(BaseModel):
 class RoomResponse(BaseModel):
     id: UUID
     name: str
-    code: str
+    code: Optional[str]  # None once the room's code has been reclaimed
     status: str
     current_pick: int
     total_rounds: int
     turn_time_sec: int
+    draft_order: str
     participants: List[dict]
     
     class Config:
@@ -63,33 +67,39 @@ async def create_room(
     request: CreateRoomRequest,
     db: AsyncSession = Depends(get_db)
 ) -> CreateRoomResponse:
-    # Generate unique room code
-    code = generate_room_code()
-    while await get_room_by_code(db, code):
-        code = generate_room_code()
+    if request.draft_order not in DRAFT_ORDERS:
+        raise HTTPException(status_code=400, detail=f"Unknown draft order: {request.draft_order}")
+    if request.draft_order == "custom" and not request.custom_order:
+        raise HTTPException(status_code=400, detail="Custom draft order needs custom_order")
+    if request.autopick_strategy not in STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Unknown auto-pick strategy: {request.autopick_strategy}")
     
-    # Create room
-    room = DraftRoom(
-        name=request.name,
-        code=code,
-        turn_time_sec=request.turn_time_sec,
-        total_rounds=request.total_rounds
-    )
-    db.add(room)
-    await db.flush()
+    # Create room under a fresh code
+    created = await create_room_with_code(db, {
+        "name": request.name,
+        "turn_time_sec": request.turn_time_sec,
+        "total_rounds": request.total_rounds,
+        "draft_order": request.draft_order,
+        "custom_order": request.custom_order if request.draft_order == "custom" else None,
+        "autopick_strategy": request.autopick_strategy,
+        # The host below takes position 1
+        "participant_count": 1
+    })
+    if created is None:
+        raise HTTPException(status_code=503, detail="No room codes available")
+    room_id, code = created
     
     # Create host participant using provided host_name
     host = Participant(
-        room_id=room.id,
+        room_id=room_id,
         user_name=request.host_name,
         draft_position=1,
         is_host=True
     )
     db.add(host)
     await db.commit()
-    await db.refresh(room)
     
-    return CreateRoomResponse(room_id=room.id, code=room.code)
+    return CreateRoomResponse(room_id=room_id, code=code)
 
 
 @router.get("/{room_id}", response_model=RoomResponse)
@@ -120,6 +130,7 @@ async def get_room_endpoint(
         current_pick=room.current_pick,
         total_rounds=room.total_rounds,
         turn_time_sec=room.turn_time_sec,
+        draft_order=room.draft_order or "snake",
         participants=participants_data
     )
 
@@ -142,58 +153,39 @@ async def join_room(
     request: JoinRoomRequest,
     db: AsyncSession = Depends(get_db)
 ) -> JoinRoomResponse:
-    room = await get_room(db, room_id)
-    if not room:
+    # Serialized with picks and other joins for the same room
+    return await room_actors.submit(room_id, "join", lambda: _join_room(room_id, request, db))
+
+
+async def _join_room(room_id: UUID, request: JoinRoomRequest, db: AsyncSession) -> JoinRoomResponse:
+    # Claim the next draft position, insert and list the room in one statement
+    result = await join_room_row(db, room_id, request.user_name)
+    if result.room_status == "waiting" and result.participant_id is None:
+        # The same name joined from another process at the same moment; it has committed, so look again
+        await db.rollback()
+        result = await join_room_row(db, room_id, request.user_name)
+    
+    if result.room_status is None:
         raise HTTPException(status_code=404, detail="Room not found")
     
-    if room.status != "waiting":
+    if result.room_status != "waiting":
         raise HTTPException(status_code=400, detail="Draft has already started")
     
-    # Check if user already exists
-    existing = await get_participant(db, room_id, request.user_name)
-    if existing:
-        # User already exists - broadcast updated participant list anyway
-        participants = await get_participants_by_room(db, room_id)
-        participants_data = [
-            {
-                "id": str(p.id),
-                "user_name": p.user_name,
-                "draft_position": p.draft_position,
-                "is_host": p.is_host
-            }
-            for p in participants
-        ]
-        
-        # Broadcast user joined (they're connecting from another device)
-        from websocket.manager import manager
-        await manager.broadcast(str(room_id), {
-            "event": "user_joined",
-            "user": request.user_name,
-            "participants": participants_data
-        })
-        
-        return JoinRoomResponse(
-            participant_id=existing.id,
-            draft_position=existing.draft_position
-        )
-    
-    # Get current participants to determine draft position
-    participants = await get_participants_by_room(db, room_id)
-    draft_position = len(participants) + 1
+    if result.participant_id is None:
+        raise HTTPException(status_code=409, detail="Could not join room, try again")
     
-    # Create participant
-    participant = Participant(
-        room_id=room_id,
-        user_name=request.user_name,
-        draft_position=draft_position,
-        is_host=False
-    )
-    db.add(participant)
     await db.commit()
-    await db.refresh(participant)
     
-    # Get updated participants list
-    participants = await get_participants_by_room(db, room_id)
+    participants = result.participants
+    if result.joined:
+        # Cached room state no longer has the full participant list
+        from services.room_state import room_states
+        room_states.invalidate(room_id)
+        
+        if result.draft_position > len(participants):
+            # Joiners in other processes committed while this one waited for the room
+            participants = await get_participants_by_room(db, room_id)
+    
     participants_data = [
         {
             "id": str(p.id),
@@ -204,7 +196,7 @@ async def join_room(
         for p in participants
     ]
     
-    # Broadcast user joined
+    # Broadcast user joined (an existing user is connecting from another device)
     from websocket.manager import manager
     await manager.broadcast(str(room_id), {
         "event": "user_joined",
@@ -213,8 +205,8 @@ async def join_room(
     })
     
     return JoinRoomResponse(
-        participant_id=participant.id,
-        draft_position=participant.draft_position
+        participant_id=result.participant_id,
+        draft_position=result.draft_position
     )
 
 
@@ -223,6 +215,11 @@ async def start_draft(
     room_id: UUID,
     db: AsyncSession = Depends(get_db)
 ) -> StartDraftResponse:
+    # Serialized with joins for the same room
+    return await room_actors.submit(room_id, "start", lambda: _start_draft(room_id, db))
+
+
+async def _start_draft(room_id: UUID, db: AsyncSession) -> StartDraftResponse:
     room = await get_room(db, room_id)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
@@ -234,33 +231,39 @@ async def start_draft(
     if len(participants) < 2:
         raise HTTPException(status_code=400, detail="Need at least 2 participants to start")
     
+    # A custom order is only checked once the participant count is final
+    try:
+        build_pick_schedule(room.draft_order or "snake", len(participants), room.total_rounds, room.custom_order)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     room.status = "drafting"
     room.current_pick = 0  # First pick will be 1
+    enqueue_event(db, "draft_started", room_id, participants=len(participants), total_rounds=room.total_rounds)
     await db.commit()
+    event_publisher.wake()
     
     # Broadcast draft started via WebSocket
     from websocket.manager import manager
-    from services.draft import get_current_drafter
+    from services.room_state import room_states
     from services.timer import start_timer
     
-    participants = await get_participants_by_room(db, room_id)
-    num_participants = len(participants)
-    current_drafter_position = get_current_drafter(1, num_participants)  # First pick is pick #1
-    current_participant = next(
-        (p for p in participants if p.draft_position == current_drafter_position),
-        None
-    )
+    # Rebuild the in-memory state (and its pick order) now that the draft is on
+    state = await room_states.reload(room_id)
+    current_participant = state.current_drafter() if state else None  # First pick is pick #1
     current_turn = current_participant.user_name if current_participant else None
     
+    # Start timer for first pick so the announcement can carry its deadline
+    clock = {}
+    if current_turn:
+        clock = start_timer(room_id, 1, room.turn_time_sec)
+    
     await manager.broadcast(str(room_id), {
         "event": "draft_started",
         "current_pick": 1,
-        "current_turn": current_turn
+        "current_turn": current_turn,
+        **clock
     })
     
-    # Start timer for first pick
-    if current_turn:
-        start_timer(room_id, 1, room.turn_time_sec)
-    
     return StartDraftResponse(success=True, message="Draft started")
 
@@ -1,14 +1,14 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from uuid import UUID
+from typing import Optional
 import json
 
-from db.database import get_db
-from db.queries import get_room, get_participant, get_participants_by_room
-from websocket.manager import manager
-from websocket.handlers import handle_pick, send_sync_message
-from services.draft import get_current_drafter
-from services.timer import start_timer
+from websocket.manager import manager, CAP_DEADLINE_CLOCK
+from websocket.handlers import handle_pick, handle_queue_set, queue_message, build_sync_message
+from services.catalog import get_catalog
+from services.room_state import room_states
+from services.room_actor import room_actors
+from services.timer import start_timer, get_clock_fields
 
 router = APIRouter()
 
@@ -17,8 +17,18 @@ router = APIRouter()
 async def websocket_endpoint(
     websocket: WebSocket,
     room_id: str,
-    user_name: str
+    user_name: str,
+    clock: Optional[str] = None,
+    last_seq: Optional[int] = None
 ):
+    """
+    Room socket. Clients that connect with ?clock=deadline count the pick
+    clock down locally from deadline_ms and only receive resync ticks;
+    everyone else keeps getting a timer_tick every second.
+    Reconnecting clients pass ?last_seq=N to get only the events they missed.
+    """
+    capabilities = frozenset({CAP_DEADLINE_CLOCK}) if clock == "deadline" else frozenset()
+    
     try:
         room_uuid = UUID(room_id)
     except ValueError:
@@ -26,63 +36,50 @@ async def websocket_endpoint(
         return
     
     # Verify room and participant exist
-    from db.database import async_session
-    async with async_session() as db:
-        room = await get_room(db, room_uuid)
-        if not room:
-            await websocket.close(code=1008, reason="Room not found")
-            return
-        
-        participant = await get_participant(db, room_uuid, user_name)
-        if not participant:
-            await websocket.close(code=1008, reason="Participant not found")
-            return
-        
-        # Connect
-        await manager.connect(websocket, room_id, user_name)
-        
-        # Send sync message
-        sync_msg = await send_sync_message(room_uuid, db)
-        if sync_msg:
-            await manager.send_personal_message(sync_msg, websocket)
+    state = await room_states.get(room_uuid)
+    if not state:
+        await websocket.close(code=1008, reason="Room not found")
+        return
+    
+    if not state.participant(user_name):
+        await websocket.close(code=1008, reason="Participant not found")
+        return
+    
+    # The sync is built without awaiting, so the catalog must be loaded first
+    await get_catalog()
+    
+    # Connect (presence is broadcast by the manager, debounced)
+    await manager.connect(websocket, room_id, user_name, capabilities)
+    
+    # From here to the first await nothing else runs, so the replay or sync is queued
+    # ahead of any live event. Picks may have been applied while we connected.
+    state = room_states.peek(room_uuid) or state
+    
+    # Replay missed events if they are still buffered, otherwise send a full sync
+    if last_seq is None or not manager.replay(websocket, room_id, last_seq):
+        await manager.send_personal_message(build_sync_message(state), websocket)
+    
+    # The user's pick queue, if they have one
+    queue = state.queues.get(state.slot_by_name[user_name])
+    if queue:
+        await manager.send_personal_message(queue_message(queue), websocket)
+    
+    # If draft is in progress, determine current turn
+    if state.status == "drafting":
+        current_participant = state.current_drafter()
+        current_turn = current_participant.user_name if current_participant else None
         
-        # Broadcast user joined
-        participants = await get_participants_by_room(db, room_uuid)
-        participants_data = [
-            {
-                "id": str(p.id),
-                "user_name": p.user_name,
-                "draft_position": p.draft_position,
-                "is_host": p.is_host
-            }
-            for p in participants
-        ]
+        # Start timer if it's this user's turn, without resetting a clock that is already running
+        clock_fields = get_clock_fields(room_uuid, state.current_pick + 1)
+        if current_turn == user_name and not clock_fields:
+            clock_fields = start_timer(room_uuid, state.current_pick + 1, state.turn_time_sec)
         
         await manager.broadcast(room_id, {
-            "event": "user_joined",
-            "user": user_name,
-            "participants": participants_data
+            "event": "draft_started",
+            "current_pick": state.current_pick + 1,
+            "current_turn": current_turn,
+            **clock_fields
         })
-        
-        # If draft is in progress, determine current turn
-        if room.status == "drafting":
-            num_participants = len(participants)
-            current_drafter_position = get_current_drafter(room.current_pick + 1, num_participants)
-            current_participant = next(
-                (p for p in participants if p.draft_position == current_drafter_position),
-                None
-            )
-            current_turn = current_participant.user_name if current_participant else None
-            
-            await manager.broadcast(room_id, {
-                "event": "draft_started",
-                "current_pick": room.current_pick + 1,
-                "current_turn": current_turn
-            })
-            
-            # Start timer if it's this user's turn
-            if current_turn == user_name:
-                start_timer(room_uuid, room.current_pick + 1, room.turn_time_sec)
     
     try:
         while True:
@@ -99,31 +96,27 @@ async def websocket_endpoint(
                     )
                     continue
                 
-                # Handle pick in a new database session
-                async with async_session() as db:
-                    await handle_pick(room_uuid, user_name, player_id, db)
+                await room_actors.submit(
+                    room_uuid, "pick", lambda: handle_pick(room_uuid, user_name, player_id)
+                )
+            
+            elif message.get("action") == "queue_set":
+                player_ids = message.get("player_ids")
+                if not isinstance(player_ids, list):
+                    await manager.send_to_user(
+                        room_id,
+                        user_name,
+                        {"event": "error", "message": "Missing player_ids"}
+                    )
+                    continue
+                
+                await room_actors.submit(
+                    room_uuid, "queue_set", lambda: handle_queue_set(room_uuid, user_name, player_ids)
+                )
             
     except WebSocketDisconnect:
+        # The room hears about it from the presence tracker
         manager.disconnect(websocket, room_id, user_name)
-        
-        # Broadcast user left
-        async with async_session() as db:
-            participants = await get_participants_by_room(db, room_uuid)
-            participants_data = [
-                {
-                    "id": str(p.id),
-                    "user_name": p.user_name,
-                    "draft_position": p.draft_position,
-                    "is_host": p.is_host
-                }
-                for p in participants
-            ]
-            
-            await manager.broadcast(room_id, {
-                "event": "user_left",
-                "user": user_name,
-                "participants": participants_data
-            })
     except Exception as e:
         print(f"WebSocket error: {e}")
         manager.disconnect(websocket, room_id, user_name)
@@ -0,0 +1,155 @@
+"""
+Best-available lookups: get_available_players vs the in-memory bitset index.
+
+For each catalog size, a 12-team room has drafted half the pool (at most
+15 rounds). The query column is the old path (drafted ids, then NOT IN,
+hydrating every remaining row); the index columns are AvailablePlayers on
+the same room. Times are per call.
+
+Postgres tables are created in a scratch schema that is dropped afterwards.
+BENCH_DATABASE_URL overrides the configured DATABASE_URL.
+
+Run from backend/:  python -m benchmarks.bench_available
+"""
+import asyncio
+import os
+import random
+import time
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from config import settings
+from db.database import Base
+from db.models import DraftRoom, Participant, Pick, Player
+from db.queries import get_available_players
+from services.catalog import AvailablePlayers, catalog
+
+CATALOG_SIZES = (50, 500, 5000)
+NUM_TEAMS = 12
+MAX_ROUNDS = 15
+QUERY_REPEAT = 20
+INDEX_REPEAT = 2000
+SCHEMA = "bench_available"
+
+POSITIONS = ("QB", "RB", "RB", "WR", "WR", "WR", "TE", "K", "DEF")
+TEAMS = [f"T{i:02d}" for i in range(32)]
+
+
+def make_player(i: int) -> Player:
+    position = random.choice(POSITIONS)
+    stat = lambda *positions, top=100: random.randint(0, top) if position in positions else None
+    return Player(
+        id=uuid4(),
+        name=f"Player {i}",
+        team=random.choice(TEAMS),
+        position=position,
+        fantasy_pts=Decimal(f"{random.uniform(20, 400):.1f}"),
+        pass_yds=stat("QB", top=5000),
+        pass_td=stat("QB", top=45),
+        rush_yds=stat("QB", "RB", "WR", top=1800),
+        rush_td=stat("QB", "RB", "WR", top=20),
+        rec_yds=stat("RB", "WR", "TE", top=1800),
+        rec_td=stat("RB", "WR", "TE", top=15),
+        fg_made=stat("K", top=40),
+        xp_made=stat("K", top=60),
+        sacks=stat("DEF", top=70),
+        ints=stat("DEF", top=25),
+    )
+
+
+def per_call_ms(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def per_call_ms_async(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def run(session_factory, size: int) -> str:
+    players = [make_player(i) for i in range(size)]
+    room = DraftRoom(id=uuid4(), name="bench", code=uuid4().hex[:6].upper(), status="drafting")
+    participants = [
+        Participant(id=uuid4(), room_id=room.id, user_name=f"user{i}", draft_position=i + 1)
+        for i in range(NUM_TEAMS)
+    ]
+    num_picks = min(size // 2, NUM_TEAMS * MAX_ROUNDS)
+    drafted = random.sample(players, num_picks)
+    picks = [
+        Pick(
+            room_id=room.id,
+            participant_id=participants[i % NUM_TEAMS].id,
+            player_id=player.id,
+            pick_number=i + 1
+        )
+        for i, player in enumerate(drafted)
+    ]
+
+    async with session_factory() as db:
+        db.add_all(players)
+        db.add(room)
+        await db.flush()
+        db.add_all(participants)
+        await db.flush()
+        db.add_all(picks)
+        await db.commit()
+
+    async with session_factory() as db:
+        query_ms = await per_call_ms_async(lambda: get_available_players(db, room.id), QUERY_REPEAT)
+
+    catalog.load(sorted(players, key=lambda p: p.fantasy_pts, reverse=True))
+    available = AvailablePlayers({p.id for p in drafted})
+    build_started = time.perf_counter()
+    available.top(limit=1)
+    build_ms = (time.perf_counter() - build_started) * 1000
+
+    best_ms = per_call_ms(lambda: available.top(limit=1), INDEX_REPEAT)
+    position_ms = per_call_ms(lambda: available.top(sort="rec_yds", position="WR", limit=10), INDEX_REPEAT)
+    full_ms = per_call_ms(lambda: available.top(), INDEX_REPEAT // 10)
+
+    return (
+        f"{size:5d} players {num_picks:4d} drafted   query {query_ms:8.3f} ms   "
+        f"index: build {build_ms:7.3f} ms  best {best_ms:7.4f} ms  "
+        f"top-10 WR by rec_yds {position_ms:7.4f} ms  all {full_ms:7.4f} ms"
+    )
+
+
+async def main():
+    random.seed(7)
+    url = os.environ.get("BENCH_DATABASE_URL", settings.database_url)
+    postgres = url.startswith("postgresql")
+
+    if postgres:
+        admin = create_async_engine(url)
+        async with admin.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        engine = create_async_engine(url, connect_args={"server_settings": {"search_path": SCHEMA}})
+    else:
+        engine = create_async_engine(url)
+
+    try:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        for size in CATALOG_SIZES:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+                await conn.run_sync(Base.metadata.create_all)
+            print(await run(session_factory, size))
+    finally:
+        await engine.dispose()
+        if postgres:
+            async with admin.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await admin.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""
+Fan-out latency of ConnectionManager.broadcast vs the old sequential loop.
+
+Every fake socket takes a few milliseconds per send, and one socket per room
+is stalled. The old loop re-encodes the message per socket and awaits each
+send in turn, so the stalled socket delays everyone queued behind it and the
+caller (the pick path) waits for all of it. The manager only enqueues; the
+"caller" column is how long broadcast() held up its caller.
+
+Run from backend/:  python -m benchmarks.bench_broadcast
+"""
+import asyncio
+import contextlib
+import io
+import json
+import random
+import statistics
+import time
+
+from websocket.manager import ConnectionManager
+
+ROOM_SIZES = (12, 100, 1000)
+SEND_LATENCY_SEC = (0.001, 0.004)
+STALLED_SEC = 1.0
+SEND_TIMEOUT_SEC = 0.25
+
+PICK_MADE = {
+    "event": "pick_made",
+    "user": "alice",
+    "player": {
+        "id": "6f1c2a52-1d43-4a59-9f3e-2f0b1b8a9c11",
+        "name": "Christian McCaffrey",
+        "team": "SF",
+        "position": "RB",
+        "fantasy_pts": 341.2,
+        "pass_yds": None,
+        "pass_td": None,
+        "rush_yds": 1459,
+        "rush_td": 14,
+        "rec_yds": 564,
+        "rec_td": 7,
+        "fg_made": None,
+        "xp_made": None,
+        "sacks": None,
+        "ints": None,
+        "image_url": None,
+    },
+    "pick_number": 1,
+    "next_turn": "bob",
+}
+
+
+class FakeWebSocket:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.received_at = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        await asyncio.sleep(self.latency)
+        self.received_at = time.perf_counter()
+
+    async def close(self, code: int = 1000, reason: str = None):
+        pass
+
+
+async def sequential_broadcast(connections, message):
+    """The pre-change broadcast loop: encode per socket, await each send in turn."""
+    for connection in connections:
+        await connection.send_text(json.dumps(message))
+
+
+def make_room(size: int):
+    sockets = [FakeWebSocket(random.uniform(*SEND_LATENCY_SEC)) for _ in range(size - 1)]
+    sockets.insert(random.randrange(size), FakeWebSocket(STALLED_SEC))
+    return sockets
+
+
+def healthy(sockets):
+    return [s for s in sockets if s.latency != STALLED_SEC]
+
+
+def summarize(sockets, started: float, returned: float) -> str:
+    delivered = [(s.received_at - started) * 1000 for s in healthy(sockets)]
+    return (
+        f"caller {(returned - started) * 1000:8.1f} ms   "
+        f"p50 {statistics.median(delivered):8.1f} ms   max {max(delivered):8.1f} ms"
+    )
+
+
+async def run_sequential(size: int) -> str:
+    sockets = make_room(size)
+    started = time.perf_counter()
+    await sequential_broadcast(sockets, PICK_MADE)
+    return summarize(sockets, started, time.perf_counter())
+
+
+async def run_manager(size: int) -> str:
+    manager = ConnectionManager(send_timeout=SEND_TIMEOUT_SEC)
+    sockets = make_room(size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, socket in enumerate(sockets):
+            await manager.connect(socket, "room", f"user{i}")
+        started = time.perf_counter()
+        await manager.broadcast("room", PICK_MADE)
+        returned = time.perf_counter()
+        while any(s.received_at is None for s in healthy(sockets)):
+            await asyncio.sleep(0.0005)
+        for socket, connection in list(manager.connections.items()):
+            manager.disconnect(socket, "room", connection.user_name)
+    return summarize(sockets, started, returned)
+
+
+async def main():
+    random.seed(7)
+    print(f"send latency {SEND_LATENCY_SEC[0] * 1000:.0f}-{SEND_LATENCY_SEC[1] * 1000:.0f} ms, "
+          f"one stalled socket per room ({STALLED_SEC:.0f} s), delivery time to healthy sockets")
+    for size in ROOM_SIZES:
+        print(f"{size:5d} connections  sequential  {await run_sequential(size)}")
+        print(f"{size:5d} connections  queued      {await run_manager(size)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
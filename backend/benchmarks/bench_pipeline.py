@@ -0,0 +1,164 @@
+"""
+Draft-complete pipeline throughput: outbox -> publisher -> queue -> worker -> draft_results.
+
+For each event queue backend and room count, every room is a completed
+12-team, 15-round draft with a draft_complete event waiting in the
+outbox. The publisher and the worker then run in this process until
+every room is graded. Times are wall clock from starting both to the
+last result row.
+
+Postgres tables are created in a scratch schema that is dropped afterwards.
+BENCH_DATABASE_URL overrides the configured DATABASE_URL; a
+sqlite+aiosqlite:/// URL runs without a database server (its tables are
+dropped and recreated for each run). The SQS backend
+is included when BENCH_SQS=1 (uses SQS_ENDPOINT / SQS_QUEUE_URL).
+
+Run from backend/:  python -m benchmarks.bench_pipeline
+"""
+import asyncio
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from config import settings
+from db.database import Base
+from db.models import DraftResult, DraftRoom, Participant, Pick, Player
+from services.event_queue import InMemoryQueue, SQLiteQueue, SQSQueue
+from services.queue import EventPublisher, enqueue_event
+from worker.worker import Worker
+
+ROOM_COUNTS = (100, 500)
+NUM_TEAMS = 12
+NUM_ROUNDS = 15
+NUM_PLAYERS = 400
+CONCURRENCY = 10
+SCHEMA = "bench_pipeline"
+
+POSITIONS = ("QB", "RB", "RB", "WR", "WR", "WR", "TE", "K", "DEF")
+
+
+async def seed(session_factory, num_rooms: int):
+    players = [
+        Player(
+            id=uuid4(),
+            name=f"Player {i}",
+            team="FA",
+            position=random.choice(POSITIONS),
+            fantasy_pts=Decimal(f"{random.uniform(20, 400):.1f}")
+        )
+        for i in range(NUM_PLAYERS)
+    ]
+    async with session_factory() as db:
+        db.add_all(players)
+        await db.flush()
+        for _ in range(num_rooms):
+            room = DraftRoom(
+                id=uuid4(), name="bench", code=uuid4().hex[:6].upper(), status="completed",
+                total_rounds=NUM_ROUNDS, current_pick=NUM_TEAMS * NUM_ROUNDS
+            )
+            participants = [
+                Participant(id=uuid4(), room_id=room.id, user_name=f"user{i}", draft_position=i + 1)
+                for i in range(NUM_TEAMS)
+            ]
+            drafted = random.sample(players, NUM_TEAMS * NUM_ROUNDS)
+            db.add(room)
+            await db.flush()
+            db.add_all(participants)
+            await db.flush()
+            db.add_all(
+                Pick(
+                    room_id=room.id,
+                    participant_id=participants[i % NUM_TEAMS].id,
+                    player_id=player.id,
+                    pick_number=i + 1
+                )
+                for i, player in enumerate(drafted)
+            )
+            enqueue_event(db, "draft_complete", room.id)
+        await db.commit()
+
+
+async def run(session_factory, queue, num_rooms: int) -> str:
+    publisher = EventPublisher(queue, session_factory)
+    worker = Worker(CONCURRENCY, 60, queue, session_factory)
+
+    # The worker logs every room; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        publisher.start()
+        publisher.wake()
+        consumer = asyncio.create_task(worker.run())
+        published_at = None
+        while worker.processed + worker.failed < num_rooms:
+            if published_at is None and publisher.published >= num_rooms:
+                published_at = time.perf_counter()
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        await publisher.stop()
+
+    async with session_factory() as db:
+        graded = await db.scalar(select(func.count()).select_from(DraftResult))
+    publish_s = (published_at or time.perf_counter()) - started
+    return (
+        f"{type(queue).__name__:<14} {num_rooms:5d} rooms   published in {publish_s:6.2f} s   "
+        f"graded in {elapsed:6.2f} s   {num_rooms / elapsed:7.1f} rooms/s   "
+        f"{graded} result rows, {worker.failed} failed"
+    )
+
+
+async def main():
+    random.seed(7)
+    url = os.environ.get("BENCH_DATABASE_URL", settings.database_url)
+    postgres = url.startswith("postgresql")
+
+    if postgres:
+        admin = create_async_engine(url)
+        async with admin.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        engine = create_async_engine(url, connect_args={"server_settings": {"search_path": SCHEMA}})
+    else:
+        engine = create_async_engine(url)
+
+    try:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        with tempfile.TemporaryDirectory() as directory:
+            backends = [
+                InMemoryQueue,
+                lambda: SQLiteQueue(os.path.join(directory, f"{uuid4().hex}.db")),
+            ]
+            if os.environ.get("BENCH_SQS") == "1":
+                backends.append(lambda: SQSQueue(settings.sqs_endpoint, settings.sqs_queue_url))
+
+            for num_rooms in ROOM_COUNTS:
+                for make_queue in backends:
+                    async with engine.begin() as conn:
+                        await conn.run_sync(Base.metadata.drop_all)
+                        await conn.run_sync(Base.metadata.create_all)
+                    await seed(session_factory, num_rooms)
+
+                    queue = make_queue()
+                    try:
+                        print(await run(session_factory, queue, num_rooms))
+                    finally:
+                        queue.close()
+    finally:
+        await engine.dispose()
+        if postgres:
+            async with admin.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await admin.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, DECIMAL, TIMESTAMP, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, DECIMAL, TIMESTAMP, UniqueConstraint, JSON, Float, Sequence, Uuid
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+from datetime import datetime
 import uuid
 from db.database import Base
 
@@ -9,7 +9,7 @@ from db.database import Base
 class Player(Base):
     __tablename__ = "players"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(100), nullable=False)
     team = Column(String(10), nullable=False)
     position = Column(String(10), nullable=False)  # QB, RB, WR, TE, K, DEF
@@ -36,13 +36,17 @@ class Player(Base):
 class DraftRoom(Base):
     __tablename__ = "draft_rooms"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(100), nullable=False)
-    code = Column(String(6), unique=True, nullable=False)
+    code = Column(String(6), unique=True, nullable=True)  # Released (NULL) once the room is done, see services/room_codes
     status = Column(String(20), default="waiting")  # waiting, drafting, completed
     current_pick = Column(Integer, default=0)
     total_rounds = Column(Integer, default=3)
     turn_time_sec = Column(Integer, default=30)
+    draft_order = Column(String(30), default="snake")  # snake, linear, third_round_reversal, custom
+    custom_order = Column(JSON, nullable=True)  # Draft position per pick, for custom orders
+    autopick_strategy = Column(String(30), default="roster_aware")  # See services/autopick.STRATEGIES
+    participant_count = Column(Integer, default=0)  # Draft positions handed out; the next joiner gets count + 1
     created_at = Column(TIMESTAMP, server_default=func.now())
     
     participants = relationship("Participant", back_populates="room", cascade="all, delete-orphan")
@@ -52,12 +56,12 @@ class DraftRoom(Base):
 class Participant(Base):
     __tablename__ = "participants"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    room_id = Column(UUID(as_uuid=True), ForeignKey("draft_rooms.id", ondelete="CASCADE"), nullable=False)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    room_id = Column(Uuid(as_uuid=True), ForeignKey("draft_rooms.id", ondelete="CASCADE"), nullable=False)
     user_name = Column(String(50), nullable=False)
     draft_position = Column(Integer, nullable=False)
     is_host = Column(Boolean, default=False)
-    is_connected = Column(Boolean, default=True)
+    is_connected = Column(Boolean, default=False)  # Kept up to date by websocket/presence
     created_at = Column(TIMESTAMP, server_default=func.now())
     
     room = relationship("DraftRoom", back_populates="participants")
@@ -72,10 +76,10 @@ class Participant(Base):
 class Pick(Base):
     __tablename__ = "picks"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    room_id = Column(UUID(as_uuid=True), ForeignKey("draft_rooms.id", ondelete="CASCADE"), nullable=False)
-    participant_id = Column(UUID(as_uuid=True), ForeignKey("participants.id", ondelete="CASCADE"), nullable=False)
-    player_id = Column(UUID(as_uuid=True), ForeignKey("players.id"), nullable=False)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    room_id = Column(Uuid(as_uuid=True), ForeignKey("draft_rooms.id", ondelete="CASCADE"), nullable=False)
+    participant_id = Column(Uuid(as_uuid=True), ForeignKey("participants.id", ondelete="CASCADE"), nullable=False)
+    player_id = Column(Uuid(as_uuid=True), ForeignKey("players.id"), nullable=False)
     pick_number = Column(Integer, nullable=False)
     picked_at = Column(TIMESTAMP, server_default=func.now())
     
@@ -88,3 +92,63 @@ class Pick(Base):
         UniqueConstraint("room_id", "player_id", name="unique_room_player"),
     )
 
+
+
+class PickQueueEntry(Base):
+    __tablename__ = "pick_queues"
+    
+    room_id = Column(Uuid(as_uuid=True), ForeignKey("draft_rooms.id", ondelete="CASCADE"), nullable=False)
+    participant_id = Column(Uuid(as_uuid=True), ForeignKey("participants.id", ondelete="CASCADE"), primary_key=True)
+    player_id = Column(Uuid(as_uuid=True), ForeignKey("players.id"), primary_key=True)
+    rank = Column(Integer, nullable=False)  # 1 = first choice
+
+
+class OutboxEvent(Base):
+    """Draft event waiting to be published to SQS, written in the same transaction as its cause."""
+    __tablename__ = "event_outbox"
+    
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event = Column(String(50), nullable=False)  # draft_started, pick_made, draft_complete
+    payload = Column(JSON, nullable=False)  # Message body
+    attempts = Column(Integer, default=0)
+    available_at = Column(TIMESTAMP, default=datetime.utcnow, index=True)  # UTC; pushed back after failed sends
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class DraftResult(Base):
+    """A team's grade for a completed draft, computed by the worker (services/grading)."""
+    __tablename__ = "draft_results"
+    
+    room_id = Column(Uuid(as_uuid=True), ForeignKey("draft_rooms.id", ondelete="CASCADE"), primary_key=True)
+    participant_id = Column(Uuid(as_uuid=True), ForeignKey("participants.id", ondelete="CASCADE"), primary_key=True)
+    projected_points = Column(DECIMAL(6, 1), nullable=False)  # Best starting lineup
+    total_points = Column(DECIMAL(6, 1), nullable=False)
+    value_over_adp = Column(DECIMAL(6, 1), nullable=False)  # Sum of pick number minus ADP
+    positional_strength = Column(JSON, nullable=False)  # Position -> starter points vs room average (100)
+    score = Column(Float, nullable=False)
+    grade = Column(String(2), nullable=False)  # A+ .. D
+    rank = Column(Integer, nullable=False)  # 1 = best in the room
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    
+    participant = relationship("Participant")
+
+
+class ProcessedEvent(Base):
+    """Idempotency key of a draft event the worker has handled, committed with its results."""
+    __tablename__ = "processed_events"
+    
+    key = Column(String(100), primary_key=True)
+    event = Column(String(50), nullable=False)
+    processed_at = Column(TIMESTAMP, server_default=func.now())
+
+
+# Index of the next fresh room code (services/room_codes.code_for_index)
+room_code_seq = Sequence("room_code_seq", start=0, minvalue=0, metadata=Base.metadata)
+
+
+class FreeRoomCode(Base):
+    """Room code reclaimed from a finished or abandoned room, free to hand out again."""
+    __tablename__ = "free_room_codes"
+    
+    code = Column(String(6), primary_key=True)
+    released_at = Column(TIMESTAMP, server_default=func.now(), index=True)
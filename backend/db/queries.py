@@ -1,9 +1,15 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, or_, update, delete, literal, func, case, true, tuple_, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert, UUID as PGUUID
 from sqlalchemy.orm import selectinload
-from uuid import UUID
-from typing import Optional, List
-from db.models import DraftRoom, Participant, Player, Pick
+from uuid import UUID, uuid4
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Optional, List, Tuple, NamedTuple, Dict
+from db.models import (
+    DraftRoom, Participant, Player, Pick, PickQueueEntry, OutboxEvent, DraftResult, ProcessedEvent, FreeRoomCode,
+    room_code_seq
+)
 
 
 async def get_room(db: AsyncSession, room_id: UUID) -> Optional[DraftRoom]:
@@ -41,6 +47,95 @@ async def get_participants_by_room(db: AsyncSession, room_id: UUID) -> List[Part
     return list(result.scalars().all())
 
 
+
+class ParticipantRow(NamedTuple):
+    id: UUID
+    user_name: str
+    draft_position: int
+    is_host: bool
+
+
+class JoinResult(NamedTuple):
+    room_status: Optional[str]  # None if the room does not exist
+    participant_id: Optional[UUID]  # The joiner's, whether just added or already there
+    draft_position: Optional[int]
+    joined: bool  # Added by this call
+    participants: List[ParticipantRow]  # By draft position, the joiner included
+
+
+async def join_room_row(db: AsyncSession, room_id: UUID, user_name: str) -> JoinResult:
+    """
+    Add a participant to a waiting room at the next draft position and list
+    the room's participants, in one statement. The position comes from
+    draft_rooms.participant_count, incremented under the room's row lock, so
+    concurrent joiners (from any process) get consecutive positions instead
+    of colliding. A name already in the room is returned as is. The caller
+    commits.
+
+    Rarely, the same name joins from elsewhere at the same moment; its insert
+    is then skipped and participant_id is None. Roll back (which returns the
+    claimed position) and call again.
+    """
+    name_taken = select(Participant.id).where(
+        Participant.room_id == room_id, Participant.user_name == user_name
+    ).exists()
+    claimed = (
+        update(DraftRoom)
+        .where(DraftRoom.id == room_id, DraftRoom.status == "waiting", ~name_taken)
+        .values(participant_count=func.coalesce(DraftRoom.participant_count, 0) + 1)
+        .returning(DraftRoom.participant_count)
+        .cte("claimed")
+    )
+    inserted = (
+        pg_insert(Participant)
+        .from_select(
+            ["id", "room_id", "user_name", "draft_position", "is_host", "is_connected"],
+            select(
+                literal(uuid4(), PGUUID(as_uuid=True)),
+                literal(room_id, PGUUID(as_uuid=True)),
+                literal(user_name),
+                claimed.c.participant_count,
+                literal(False),
+                literal(False)
+            )
+        )
+        .on_conflict_do_nothing()
+        .returning(Participant.id, Participant.user_name, Participant.draft_position, Participant.is_host)
+        .cte("inserted")
+    )
+    # The statement's snapshot predates the insert, so add the new row to the listing
+    listed = union_all(
+        select(
+            Participant.id, Participant.user_name, Participant.draft_position, Participant.is_host,
+            literal(False).label("is_new")
+        ).where(Participant.room_id == room_id),
+        select(
+            inserted.c.id, inserted.c.user_name, inserted.c.draft_position, inserted.c.is_host,
+            literal(True).label("is_new")
+        )
+    ).subquery()
+    result = await db.execute(
+        select(DraftRoom.status, listed.c.id, listed.c.user_name, listed.c.draft_position, listed.c.is_host, listed.c.is_new)
+        .select_from(DraftRoom)
+        .outerjoin(listed, true())
+        .where(DraftRoom.id == room_id)
+        .order_by(listed.c.draft_position)
+    )
+    rows = result.all()
+    if not rows:
+        return JoinResult(None, None, None, False, [])
+    
+    participants = [ParticipantRow(*row[1:5]) for row in rows if row[1] is not None]
+    joiner = next((row for row in rows if row[2] == user_name), None)
+    return JoinResult(
+        rows[0][0],
+        joiner[1] if joiner else None,
+        joiner[3] if joiner else None,
+        bool(joiner and joiner[5]),
+        participants
+    )
+
+
 async def get_player(db: AsyncSession, player_id: UUID) -> Optional[Player]:
     result = await db.execute(select(Player).where(Player.id == player_id))
     return result.scalar_one_or_none()
@@ -91,6 +186,119 @@ async def get_picks_by_room(db: AsyncSession, room_id: UUID) -> List[Pick]:
     return list(result.scalars().all())
 
 
+async def get_pick_rows(db: AsyncSession, room_id: UUID) -> List[Tuple[int, UUID, UUID, datetime]]:
+    """(pick_number, participant_id, player_id, picked_at) for every pick in a room, in pick order."""
+    result = await db.execute(
+        select(Pick.pick_number, Pick.participant_id, Pick.player_id, Pick.picked_at)
+        .where(Pick.room_id == room_id)
+        .order_by(Pick.pick_number)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+class PickCommitStatus(str, Enum):
+    COMMITTED = "committed"
+    STALE_PICK = "stale_pick"  # current_pick moved on, or the room is not drafting
+    PLAYER_TAKEN = "player_taken"
+    CONFLICT = "conflict"  # a concurrent statement took this pick number first
+
+
+class PickCommitResult(NamedTuple):
+    status: PickCommitStatus
+    current_pick: int
+    room_status: str
+
+
+async def commit_pick(
+    db: AsyncSession,
+    room_id: UUID,
+    participant_id: UUID,
+    player_id: UUID,
+    expected_pick: int
+) -> PickCommitResult:
+    """
+    Insert pick expected_pick + 1 and advance the room to it in one statement.
+
+    The room only advances if current_pick still equals expected_pick (CAS),
+    and is marked completed when that was the last pick. Conflicts come back
+    as a PickCommitStatus instead of an IntegrityError. The caller commits.
+    """
+    pick_number = expected_pick + 1
+    room_is_at_expected_pick = (
+        select(DraftRoom.id)
+        .where(and_(
+            DraftRoom.id == room_id,
+            DraftRoom.current_pick == expected_pick,
+            DraftRoom.status == "drafting"
+        ))
+        .exists()
+    )
+
+    inserted = (
+        pg_insert(Pick)
+        .from_select(
+            ["id", "room_id", "participant_id", "player_id", "pick_number"],
+            select(
+                literal(uuid4(), Pick.id.type),
+                literal(room_id, Pick.room_id.type),
+                literal(participant_id, Pick.participant_id.type),
+                literal(player_id, Pick.player_id.type),
+                literal(pick_number)
+            ).where(room_is_at_expected_pick)
+        )
+        .on_conflict_do_nothing()
+        .returning(Pick.pick_number)
+        .cte("inserted")
+    )
+
+    participant_count = (
+        select(func.count(Participant.id))
+        .where(Participant.room_id == room_id)
+        .scalar_subquery()
+    )
+    advanced = (
+        update(DraftRoom)
+        .where(and_(
+            DraftRoom.id == room_id,
+            DraftRoom.current_pick == expected_pick,
+            select(inserted.c.pick_number).exists()
+        ))
+        .values(
+            current_pick=pick_number,
+            status=case(
+                (literal(pick_number) >= DraftRoom.total_rounds * participant_count, "completed"),
+                else_=DraftRoom.status
+            )
+        )
+        .returning(DraftRoom.current_pick, DraftRoom.status)
+        .cte("advanced")
+    )
+
+    result = await db.execute(
+        select(
+            select(advanced.c.current_pick).scalar_subquery(),
+            select(advanced.c.status).scalar_subquery(),
+            DraftRoom.current_pick,
+            DraftRoom.status,
+            select(Pick.id).where(and_(Pick.room_id == room_id, Pick.player_id == player_id)).exists()
+        )
+        .where(DraftRoom.id == room_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return PickCommitResult(PickCommitStatus.STALE_PICK, 0, "missing")
+
+    new_pick, new_status, current_pick, room_status, player_taken = row
+    if new_pick is not None:
+        return PickCommitResult(PickCommitStatus.COMMITTED, new_pick, new_status)
+    # The rest of the row is the state from before this statement
+    if current_pick != expected_pick or room_status != "drafting":
+        return PickCommitResult(PickCommitStatus.STALE_PICK, current_pick, room_status)
+    if player_taken:
+        return PickCommitResult(PickCommitStatus.PLAYER_TAKEN, current_pick, room_status)
+    return PickCommitResult(PickCommitStatus.CONFLICT, current_pick, room_status)
+
+
 async def get_teams_by_room(db: AsyncSession, room_id: UUID) -> dict:
     picks = await get_picks_by_room(db, room_id)
     teams = {}
@@ -103,3 +311,193 @@ async def get_teams_by_room(db: AsyncSession, room_id: UUID) -> dict:
     
     return teams
 
+
+async def get_queue_rows(db: AsyncSession, room_id: UUID) -> List[Tuple[UUID, UUID]]:
+    """(participant_id, player_id) for every queued player in a room, in rank order per participant."""
+    result = await db.execute(
+        select(PickQueueEntry.participant_id, PickQueueEntry.player_id)
+        .where(PickQueueEntry.room_id == room_id)
+        .order_by(PickQueueEntry.participant_id, PickQueueEntry.rank)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def replace_queues(db: AsyncSession, room_id: UUID, queues: Dict[UUID, List[UUID]]):
+    """Overwrite the stored queues of the given participants. The caller commits."""
+    await db.execute(
+        delete(PickQueueEntry).where(PickQueueEntry.participant_id.in_(list(queues)))
+    )
+    rows = [
+        {"room_id": room_id, "participant_id": participant_id, "player_id": player_id, "rank": rank}
+        for participant_id, player_ids in queues.items()
+        for rank, player_id in enumerate(player_ids, start=1)
+    ]
+    if rows:
+        await db.execute(PickQueueEntry.__table__.insert(), rows)
+
+
+def add_outbox_event(db: AsyncSession, event_id: UUID, event: str, payload: dict):
+    """Stage an event for publishing. It is only published if the caller's transaction commits."""
+    db.add(OutboxEvent(id=event_id, event=event, payload=payload))
+
+
+async def claim_outbox_events(db: AsyncSession, limit: int) -> List[OutboxEvent]:
+    """
+    Oldest events due for publishing, locked until the caller commits.
+    Rows locked by another publisher are skipped rather than waited on.
+    """
+    result = await db.execute(
+        select(OutboxEvent)
+        .where(OutboxEvent.available_at <= datetime.utcnow())
+        .order_by(OutboxEvent.available_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return list(result.scalars().all())
+
+
+async def delete_outbox_events(db: AsyncSession, event_ids: List[UUID]):
+    if event_ids:
+        await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(event_ids)))
+
+
+def retry_outbox_event(event: OutboxEvent, delay_sec: float):
+    """Count a failed send and hold the event back for delay_sec. The caller commits."""
+    event.attempts = (event.attempts or 0) + 1
+    event.available_at = datetime.utcnow() + timedelta(seconds=delay_sec)
+
+
+async def get_graded_pick_rows(db: AsyncSession, room_id: UUID) -> List[Tuple[UUID, int, str, float, int]]:
+    """
+    (participant_id, pick_number, position, fantasy_pts, adp) for every pick
+    in a room, where adp is the player's rank by fantasy_pts in the catalog.
+    """
+    ranked = select(
+        Player.id,
+        Player.position,
+        Player.fantasy_pts,
+        func.rank().over(order_by=Player.fantasy_pts.desc()).label("adp")
+    ).subquery()
+    result = await db.execute(
+        select(Pick.participant_id, Pick.pick_number, ranked.c.position, ranked.c.fantasy_pts, ranked.c.adp)
+        .join(ranked, ranked.c.id == Pick.player_id)
+        .where(Pick.room_id == room_id)
+        .order_by(Pick.pick_number)
+    )
+    return [
+        (participant_id, pick_number, position, float(fantasy_pts or 0), adp)
+        for participant_id, pick_number, position, fantasy_pts, adp in result.all()
+    ]
+
+
+async def replace_draft_results(db: AsyncSession, room_id: UUID, rows: List[dict]):
+    """Store a room's team grades, replacing any earlier ones. The caller commits."""
+    await db.execute(delete(DraftResult).where(DraftResult.room_id == room_id))
+    if rows:
+        await db.execute(DraftResult.__table__.insert(), [{"room_id": room_id, **row} for row in rows])
+
+
+async def get_draft_results(db: AsyncSession, room_id: UUID) -> List[DraftResult]:
+    result = await db.execute(
+        select(DraftResult)
+        .options(selectinload(DraftResult.participant))
+        .where(DraftResult.room_id == room_id)
+        .order_by(DraftResult.rank)
+    )
+    return list(result.scalars().all())
+
+
+async def is_event_processed(db: AsyncSession, key: str) -> bool:
+    result = await db.execute(select(ProcessedEvent.key).where(ProcessedEvent.key == key))
+    return result.scalar_one_or_none() is not None
+
+
+def mark_event_processed(db: AsyncSession, key: str, event: str):
+    """Record the key in the caller's transaction, so it commits together with the event's effects."""
+    db.add(ProcessedEvent(key=key, event=event))
+
+
+async def claim_room_code(db: AsyncSession) -> Tuple[Optional[str], Optional[int]]:
+    """
+    (reclaimed code, None), or (None, next value of room_code_seq) when no
+    reclaimed code is free, in one statement. The reclaimed code leaves the
+    free list with the caller's commit; locked ones are skipped.
+    """
+    oldest = (
+        select(FreeRoomCode.code)
+        .order_by(FreeRoomCode.released_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    reclaimed = delete(FreeRoomCode).where(FreeRoomCode.code == oldest).returning(FreeRoomCode.code).cte("reclaimed")
+    # The sequence only advances when nothing was reclaimed
+    fresh = select(room_code_seq.next_value().label("code_index")).where(
+        ~select(reclaimed.c.code).exists()
+    ).cte("fresh")
+    result = await db.execute(
+        select(select(reclaimed.c.code).scalar_subquery(), select(fresh.c.code_index).scalar_subquery())
+    )
+    code, index = result.one()
+    return code, index
+
+
+async def insert_room(db: AsyncSession, code: str, values: dict) -> Optional[UUID]:
+    """Insert a room under the code. Returns its id, or None if another room already has the code."""
+    result = await db.execute(
+        pg_insert(DraftRoom)
+        .values(code=code, **values)
+        .on_conflict_do_nothing(index_elements=[DraftRoom.code])
+        .returning(DraftRoom.id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def release_room_codes(
+    db: AsyncSession,
+    completed_for: timedelta,
+    waiting_for: timedelta,
+    limit: int
+) -> int:
+    """
+    Move the codes of up to `limit` rooms completed (last pick) at least
+    completed_for ago, or still waiting after waiting_for, to the free list.
+    Returns how many were released. The caller commits.
+    """
+    last_pick = select(func.max(Pick.picked_at)).where(Pick.room_id == DraftRoom.id).scalar_subquery()
+    result = await db.execute(
+        select(DraftRoom.id, DraftRoom.code)
+        .where(
+            DraftRoom.code.isnot(None),
+            or_(
+                and_(
+                    DraftRoom.status == "completed",
+                    func.coalesce(last_pick, DraftRoom.created_at) < func.now() - completed_for
+                ),
+                and_(DraftRoom.status == "waiting", DraftRoom.created_at < func.now() - waiting_for)
+            )
+        )
+        .limit(limit)
+        .with_for_update(of=DraftRoom, skip_locked=True)
+    )
+    rows = result.all()
+    if not rows:
+        return 0
+    
+    await db.execute(update(DraftRoom).where(DraftRoom.id.in_([room_id for room_id, _ in rows])).values(code=None))
+    await db.execute(
+        pg_insert(FreeRoomCode).values([{"code": code} for _, code in rows]).on_conflict_do_nothing()
+    )
+    return len(rows)
+
+
+async def set_participants_connected(db: AsyncSession, states: Dict[Tuple[str, str], bool]):
+    """Set is_connected for (room_id, user_name) pairs, one statement per value. The caller commits."""
+    for connected in (True, False):
+        keys = [(UUID(room_id), user_name) for (room_id, user_name), value in states.items() if value == connected]
+        if keys:
+            await db.execute(
+                update(Participant)
+                .where(tuple_(Participant.room_id, Participant.user_name).in_(keys))
+                .values(is_connected=connected)
+            )
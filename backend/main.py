@@ -1,9 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 
 from db.database import init_db
-from api import rooms, players, picks, websocket
+from api import rooms, players, picks, queues, mock_drafts, websocket
 from seed.players import SEED_PLAYERS
 from db.models import Player
 from db.database import async_session
@@ -14,6 +15,12 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     
+    # Share room events with the other API processes
+    from config import settings
+    from websocket.backplane import create_backplane
+    from websocket.manager import manager
+    await manager.start_backplane(create_backplane(settings.ws_backplane, settings.database_url))
+    
     # Seed players if database is empty
     async with async_session() as session:
         from sqlalchemy import select
@@ -26,11 +33,44 @@ async def lifespan(app: FastAPI):
                 session.add(player)
             await session.commit()
             print("Seeded player data")
+        
+        # Warm the player catalog (and drop any stale copies in other processes)
+        from services.catalog import reload_catalog
+        await reload_catalog(session)
+    
+    # Relay draft events from the outbox to SQS
+    from services.queue import event_publisher
+    event_publisher.start()
+    
+    # Free the codes of finished rooms for reuse
+    from services.room_codes import code_reclaimer
+    code_reclaimer.start()
+    
+    worker_task = None
+    if settings.embedded_worker:
+        from worker.worker import Worker
+        worker = Worker(settings.worker_concurrency, settings.worker_visibility_timeout_sec)
+        worker_task = asyncio.create_task(worker.run())
     
     yield
     
-    # Shutdown (if needed)
-    pass
+    # Shutdown
+    from services.timer import timer_scheduler
+    from services.room_state import room_states
+    await timer_scheduler.stop()
+    await room_states.stop()
+    await room_states.queue_writes.stop()
+    await event_publisher.stop()
+    await code_reclaimer.stop()
+    await manager.presence.stop()
+    if worker_task:
+        worker_task.cancel()
+        await asyncio.gather(worker_task, return_exceptions=True)
+    from services.event_queue import get_event_queue
+    get_event_queue().close()
+    from services.mock_draft import shutdown_pool
+    shutdown_pool()
+    await manager.stop_backplane()
 
 
 app = FastAPI(title="Fantasy Football Draft API", lifespan=lifespan)
@@ -48,6 +88,8 @@ app.add_middleware(
 app.include_router(rooms.router)
 app.include_router(players.router)
 app.include_router(picks.router)
+app.include_router(queues.router)
+app.include_router(mock_drafts.router)
 app.include_router(websocket.router)
 
 
@@ -60,3 +102,22 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+
+@app.get("/metrics")
+async def metrics():
+    from services.timer import get_timer_stats
+    from websocket.manager import manager
+    from services.room_state import room_states
+    from services.room_actor import room_actors
+    from services.autopick import get_autopick_stats
+    from services.queue import event_publisher
+    return {
+        "timers": get_timer_stats(),
+        "websockets": manager.queue_stats(),
+        "room_state": room_states.stats(),
+        "room_commands": room_actors.stats(),
+        "autopick": get_autopick_stats(),
+        "events": event_publisher.stats(),
+        "presence": manager.presence.stats()
+    }
+
@@ -0,0 +1,207 @@
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, Optional
+import numpy as np
+from services.catalog import PlayerCatalog
+from services.metrics import latency_percentiles
+
+# Starting lineup used to judge a team's needs; FLEX takes one more RB, WR or TE
+POSITIONS = ("QB", "RB", "WR", "TE", "K", "DEF")
+STARTERS = {"QB": 1, "RB": 2, "WR": 2, "TE": 1, "K": 1, "DEF": 1}
+FLEX_POSITIONS = ("RB", "WR", "TE")
+FLEX_SLOTS = 1
+
+# Weight of a position once its starting (and flex) slots are filled
+BENCH_NEED = {"QB": 0.3, "RB": 0.5, "WR": 0.5, "TE": 0.3, "K": 0.0, "DEF": 0.0}
+# Players at positions outside POSITIONS
+OTHER_NEED = 0.3
+FLEX_NEED = 0.8
+# Kickers and defenses wait until the team runs out of other picks
+LATE_POSITIONS = ("K", "DEF")
+LATE_NEED = 0.05
+# How much value over the next-turn replacement counts next to raw points
+VONA_WEIGHT = 1.0
+
+
+class CatalogArrays:
+    """The player catalog as NumPy arrays, in catalog (fantasy_pts desc) order."""
+
+    def __init__(self, catalog: PlayerCatalog):
+        self.version = catalog.version
+        self.points = np.array([p["fantasy_pts"] or 0.0 for p in catalog.players], dtype=np.float64)
+        codes = {position: code for code, position in enumerate(POSITIONS)}
+        self.position = np.array(
+            [codes.get(p["position"], -1) for p in catalog.players], dtype=np.int8
+        )
+        # Catalog indexes at each position, best first
+        self.by_position = [np.flatnonzero(self.position == code) for code in range(len(POSITIONS))]
+
+
+class PickContext:
+    """Everything a strategy sees: the catalog, what is left, and the drafting team's situation."""
+    __slots__ = ("arrays", "available", "roster_counts", "picks_left", "picks_until_next")
+
+    def __init__(
+        self,
+        arrays: CatalogArrays,
+        available: np.ndarray,
+        roster_counts: np.ndarray,
+        picks_left: int,
+        picks_until_next: int
+    ):
+        self.arrays = arrays
+        # Boolean mask over the catalog
+        self.available = available
+        # Players on the team per POSITIONS entry
+        self.roster_counts = roster_counts
+        # Picks the team still has, this one included
+        self.picks_left = picks_left
+        # Picks other teams make before the team is on the clock again
+        self.picks_until_next = picks_until_next
+
+
+class AutoPickStrategy(ABC):
+    """Chooses the catalog index to draft for a team that ran out of time."""
+    name = ""
+
+    @abstractmethod
+    def choose(self, context: PickContext) -> Optional[int]:
+        ...
+
+
+class BestAvailable(AutoPickStrategy):
+    """Highest fantasy_pts left, ignoring the roster."""
+    name = "best_available"
+
+    def choose(self, context: PickContext) -> Optional[int]:
+        candidates = np.flatnonzero(context.available)
+        return int(candidates[0]) if len(candidates) else None
+
+
+class RosterAware(AutoPickStrategy):
+    """
+    Scores every available player in one pass:
+
+        need[position] * (points + VONA_WEIGHT * (points - replacement[position]))
+
+    replacement is the best player at the position expected to survive
+    until the team's next pick, assuming the other teams take the best
+    players available in the meantime (value over next available). need
+    comes from the team's unfilled lineup slots; when the team has no more
+    picks than unfilled slots, only positions that fill one count.
+    """
+    name = "roster_aware"
+
+    def choose(self, context: PickContext) -> Optional[int]:
+        arrays = context.arrays
+        available = context.available
+        if not available.any():
+            return None
+
+        # Best player per position now and after the other teams' picks
+        gone_before_next = np.flatnonzero(available)[:context.picks_until_next]
+        survives = available.copy()
+        survives[gone_before_next] = False
+        replacement = np.zeros(len(POSITIONS) + 1)
+        for code, indexes in enumerate(arrays.by_position):
+            left = indexes[survives[indexes]]
+            replacement[code] = arrays.points[left[0]] if len(left) else 0.0
+
+        # Position code -1 (not in POSITIONS) picks up the trailing entry
+        need = np.append(self._need(context), OTHER_NEED)
+        scores = need[arrays.position] * (
+            arrays.points + VONA_WEIGHT * (arrays.points - replacement[arrays.position])
+        )
+        scores[~available] = -np.inf
+
+        best = int(np.argmax(scores))
+        if scores[best] <= 0:
+            # Every remaining player is at a filled position; take the best anyway
+            return BestAvailable().choose(context)
+        return best
+
+    def _need(self, context: PickContext) -> np.ndarray:
+        return need_weights(context.roster_counts[np.newaxis, :], context.picks_left)[0]
+
+
+_STARTERS = np.array([STARTERS[p] for p in POSITIONS])
+_BENCH_NEED = np.array([BENCH_NEED[p] for p in POSITIONS])
+_IS_FLEX = np.array([p in FLEX_POSITIONS for p in POSITIONS])
+_IS_LATE = np.array([p in LATE_POSITIONS for p in POSITIONS])
+
+
+def need_weights(roster_counts: np.ndarray, picks_left: int) -> np.ndarray:
+    """
+    Weight per position (columns, in POSITIONS order) for each team (rows)
+    given its roster counts. A position with an open starting slot gets 1,
+    an open flex slot FLEX_NEED, otherwise BENCH_NEED. When a team has no
+    more picks than open slots, positions that fill none get 0.
+    """
+    open_starters = np.maximum(0, _STARTERS - roster_counts)
+    flex_surplus = np.maximum(0, roster_counts - _STARTERS)[:, _IS_FLEX].sum(axis=1)
+    open_flex = np.maximum(0, FLEX_SLOTS - flex_surplus)
+    forced = (picks_left <= open_starters.sum(axis=1) + open_flex)[:, np.newaxis]
+
+    need = np.where(forced, 0.0, _BENCH_NEED)
+    need = np.where((open_flex > 0)[:, np.newaxis] & _IS_FLEX, FLEX_NEED, need)
+    need = np.where(open_starters > 0, 1.0, need)
+    return np.where(_IS_LATE & ~forced, np.minimum(need, LATE_NEED), need)
+
+
+STRATEGIES: Dict[str, AutoPickStrategy] = {
+    strategy.name: strategy for strategy in (RosterAware(), BestAvailable())
+}
+DEFAULT_STRATEGY = RosterAware.name
+
+_arrays: Optional[CatalogArrays] = None
+_durations = deque(maxlen=1000)
+_chosen = 0
+
+
+def get_arrays(catalog: PlayerCatalog) -> CatalogArrays:
+    global _arrays
+    if _arrays is None or _arrays.version != catalog.version:
+        _arrays = CatalogArrays(catalog)
+    return _arrays
+
+
+def build_context(state, catalog: PlayerCatalog, slot: int) -> PickContext:
+    """PickContext for participants[slot] making the room's next pick."""
+    arrays = get_arrays(catalog)
+
+    available = np.ones(len(arrays.points), dtype=bool)
+    drafted = [catalog.index_of[pid] for pid in state.drafted if pid in catalog.index_of]
+    available[drafted] = False
+
+    roster = [catalog.index_of[pid] for pid in state.rosters[slot] if pid in catalog.index_of]
+    codes = arrays.position[roster]
+    roster_counts = np.bincount(codes[codes >= 0], minlength=len(POSITIONS))
+
+    pick_index = state.current_pick  # pick_order index of the pick on the clock
+    picks_left = state.pick_order[pick_index:].count(slot)
+    try:
+        picks_until_next = state.pick_order.index(slot, pick_index + 1) - pick_index - 1
+    except ValueError:
+        picks_until_next = len(state.pick_order) - pick_index - 1
+
+    return PickContext(arrays, available, roster_counts, picks_left, picks_until_next)
+
+
+def choose_auto_pick(state, catalog: PlayerCatalog, strategy_name: Optional[str] = None) -> Optional[int]:
+    """Catalog index of the player to auto-draft for whoever is on the clock, or None."""
+    global _chosen
+    participant = state.current_drafter()
+    if participant is None:
+        return None
+
+    started = time.perf_counter()
+    strategy = STRATEGIES.get(strategy_name or state.autopick_strategy) or STRATEGIES[DEFAULT_STRATEGY]
+    choice = strategy.choose(build_context(state, catalog, state.slot_by_name[participant.user_name]))
+    _durations.append(time.perf_counter() - started)
+    _chosen += 1
+    return choice
+
+
+def get_autopick_stats() -> dict:
+    return {"count": _chosen, "duration_ms": latency_percentiles(_durations)}
@@ -0,0 +1,271 @@
+import asyncio
+import gzip
+import hashlib
+import orjson
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.queries import get_all_players
+from api.players import PlayerResponse
+from websocket.manager import manager
+
+
+# Player columns the catalog keeps a ranked order for (all descending)
+SORT_KEYS = (
+    "fantasy_pts", "pass_yds", "pass_td", "rush_yds", "rush_td", "rec_yds",
+    "rec_td", "fg_made", "xp_made", "sacks", "ints"
+)
+
+
+class SortOrder:
+    """
+    The catalog ranked by one column. Bit r of a mask in this order stands
+    for the player at ranked[r], so lower bits are better players.
+    """
+    __slots__ = ("ranked", "rank_of", "all_mask", "position_masks", "team_masks")
+
+    def __init__(self, players: List[dict], key: str):
+        # Missing stats rank last; ties keep fantasy_pts order
+        self.ranked: List[int] = sorted(
+            range(len(players)),
+            key=lambda i: (players[i][key] is None, -(players[i][key] or 0), i)
+        )
+        self.rank_of: List[int] = [0] * len(players)
+        for rank, index in enumerate(self.ranked):
+            self.rank_of[index] = rank
+        self.all_mask = (1 << len(players)) - 1
+        self.position_masks: Dict[str, int] = {}
+        self.team_masks: Dict[str, int] = {}
+        for rank, index in enumerate(self.ranked):
+            position, team = players[index]["position"], players[index]["team"]
+            self.position_masks[position] = self.position_masks.get(position, 0) | (1 << rank)
+            self.team_masks[team] = self.team_masks.get(team, 0) | (1 << rank)
+
+    def mask_of(self, indexes: Iterable[int]) -> int:
+        mask = 0
+        for index in indexes:
+            mask |= 1 << self.rank_of[index]
+        return mask
+
+
+class NameIndex:
+    """
+    Lower-cased player names for search. Word prefixes ("mah" finds Patrick
+    Mahomes) come from a sorted word list by binary search; substrings from
+    one str.find scan over all names joined together.
+    """
+
+    def __init__(self, names: List[str]):
+        lowered = [name.lower() for name in names]
+        self.words = sorted((word, i) for i, name in enumerate(lowered) for word in name.split())
+        self.blob = "\n".join(lowered)
+        # Offset of each name in blob
+        self.starts = [0, *accumulate(len(name) + 1 for name in lowered[:-1])] if lowered else []
+
+    def prefix(self, text: str) -> Set[int]:
+        """Names where every term in text starts some word."""
+        matches: Optional[Set[int]] = None
+        for term in text.lower().split():
+            found = set()
+            k = bisect_left(self.words, (term,))
+            while k < len(self.words) and self.words[k][0].startswith(term):
+                found.add(self.words[k][1])
+                k += 1
+            matches = found if matches is None else matches & found
+        return matches or set()
+
+    def substring(self, text: str) -> Set[int]:
+        text = text.lower().strip()
+        matches = set()
+        if not text or "\n" in text:
+            return matches
+        position = self.blob.find(text)
+        while position != -1:
+            index = bisect_right(self.starts, position) - 1
+            matches.add(index)
+            # Carry on from the next name
+            next_start = self.starts[index + 1] if index + 1 < len(self.starts) else len(self.blob)
+            position = self.blob.find(text, next_start)
+        return matches
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Positions of the set bits in mask, lowest first."""
+    bits = bin(mask)[:1:-1]
+    position = bits.find("1")
+    while position != -1:
+        yield position
+        position = bits.find("1", position + 1)
+
+
+class PlayerCatalog:
+    """
+    In-process copy of the players table, already serialized the way the API
+    returns it. The catalog only changes at seed time, so it is loaded once
+    on first use and kept until invalidate().
+
+    body is the encoded GET /api/players response (body_gzip compressed),
+    and etag is a hash of it (etag_gzip tags the compressed body), so the
+    endpoint never re-serializes.
+    """
+
+    def __init__(self):
+        # Sorted by fantasy_pts desc, like get_all_players
+        self.players: List[dict] = []
+        self.ids: List[UUID] = []
+        self.by_id: Dict[UUID, dict] = {}
+        self.index_of: Dict[UUID, int] = {}
+        self.body = b""
+        self.body_gzip = b""
+        self.etag = ""
+        self.etag_gzip = ""
+        self.orders: Dict[str, SortOrder] = {}
+        self.names = NameIndex([])
+        # Catalog indexes at each position, best first
+        self.by_position: Dict[str, List[int]] = {}
+        # Bumped on every load so per-room indexes know to rebuild
+        self.version = 0
+        self.loaded = False
+
+    def load(self, players):
+        self.players = [PlayerResponse.model_validate(p).model_dump(mode='json') for p in players]
+        self.ids = [UUID(p["id"]) for p in self.players]
+        self.by_id = dict(zip(self.ids, self.players))
+        self.index_of = {player_id: i for i, player_id in enumerate(self.ids)}
+        self.body = orjson.dumps({"players": self.players})
+        self.body_gzip = gzip.compress(self.body, compresslevel=6)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.etag_gzip = f'"{digest}-gzip"'
+        self.orders = {key: SortOrder(self.players, key) for key in SORT_KEYS}
+        self.names = NameIndex([p["name"] for p in self.players])
+        self.by_position = {}
+        for i, p in enumerate(self.players):
+            self.by_position.setdefault(p["position"], []).append(i)
+        self.version += 1
+        self.loaded = True
+
+    def query(
+        self,
+        sort: str = "fantasy_pts",
+        position: Optional[str] = None,
+        team: Optional[str] = None,
+        search: Optional[str] = None,
+        match: str = "prefix",
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+        exclude: int = 0
+    ) -> List[int]:
+        """
+        Catalog indexes of matching players, best first by sort. after is the
+        catalog index of the last player on the previous page (keyset), and
+        exclude is a mask in the same sort order (e.g. drafted players).
+        """
+        order = self.orders[sort]
+        mask = order.all_mask & ~exclude
+        if position:
+            mask &= order.position_masks.get(position, 0)
+        if team:
+            mask &= order.team_masks.get(team, 0)
+        if search:
+            found = self.names.substring(search) if match == "substring" else self.names.prefix(search)
+            mask &= order.mask_of(found)
+        if after is not None:
+            mask &= ~((1 << (order.rank_of[after] + 1)) - 1)
+
+        indexes = []
+        for rank in iter_bits(mask):
+            if limit is not None and len(indexes) >= limit:
+                break
+            indexes.append(order.ranked[rank])
+        return indexes
+
+    def invalidate(self):
+        """Reload from the database on next use. Readers keep the old copy until then."""
+        self.loaded = False
+
+    def get(self, player_id: UUID) -> Optional[dict]:
+        return self.by_id.get(player_id)
+
+
+class AvailablePlayers:
+    """
+    One room's drafted players as a bitset per catalog sort order, so
+    "best available, optionally at one position" is a couple of big-int
+    operations plus walking the lowest set bits instead of a query.
+
+    A sort order's mask is built from drafted on first use and then kept up
+    to date by mark(). Everything is rebuilt if the catalog is reloaded.
+    """
+    __slots__ = ("drafted", "masks", "catalog_version")
+
+    def __init__(self, drafted: Set[UUID]):
+        # Shared with DraftRoomState.drafted
+        self.drafted = drafted
+        self.masks: Dict[str, int] = {}
+        self.catalog_version = 0
+
+    def mark(self, player_id: UUID):
+        """Record a new pick in every mask built so far (the caller adds it to drafted)."""
+        if not self.masks or self.catalog_version != catalog.version:
+            return
+        index = catalog.index_of.get(player_id)
+        if index is None:
+            return
+        for key, mask in self.masks.items():
+            self.masks[key] = mask | (1 << catalog.orders[key].rank_of[index])
+
+    def top(self, sort: str = "fantasy_pts", **filters) -> List[int]:
+        """Catalog indexes of undrafted players, best first by sort. Takes PlayerCatalog.query filters."""
+        return catalog.query(sort=sort, exclude=self._drafted_mask(sort), **filters)
+
+    def players(self, **kwargs) -> List[dict]:
+        """Like top(), as serialized players."""
+        return [catalog.players[i] for i in self.top(**kwargs)]
+
+    def _drafted_mask(self, sort: str) -> int:
+        if self.catalog_version != catalog.version:
+            self.masks.clear()
+            self.catalog_version = catalog.version
+        mask = self.masks.get(sort)
+        if mask is None:
+            rank_of = catalog.orders[sort].rank_of
+            mask = 0
+            for player_id in self.drafted:
+                index = catalog.index_of.get(player_id)
+                if index is not None:
+                    mask |= 1 << rank_of[index]
+            self.masks[sort] = mask
+        return mask
+
+
+catalog = PlayerCatalog()
+_load_lock = asyncio.Lock()
+
+
+async def get_catalog(db: Optional[AsyncSession] = None) -> PlayerCatalog:
+    """The loaded catalog, reading the players table on first use."""
+    if catalog.loaded:
+        return catalog
+
+    async with _load_lock:
+        if not catalog.loaded:
+            if db is None:
+                from db.database import async_session
+                async with async_session() as session:
+                    catalog.load(await get_all_players(session))
+            else:
+                catalog.load(await get_all_players(db))
+    return catalog
+
+
+async def reload_catalog(db: Optional[AsyncSession] = None) -> PlayerCatalog:
+    """Re-read the players table here and invalidate the copies held by other API processes."""
+    catalog.invalidate()
+    manager.publish_control("catalog_invalidate", {})
+    return await get_catalog(db)
+
+
+manager.on_control("catalog_invalidate", lambda data: catalog.invalidate())
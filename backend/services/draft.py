@@ -1,47 +1,47 @@
-from typing import Tuple
+from typing import List, Optional
 
 
-def get_current_drafter(pick_number: int, num_participants: int) -> int:
-    """
-    Snake draft: 1,2,3,4,4,3,2,1,1,2,3,4...
-    Returns draft_position (1-indexed)
-    """
-    if pick_number == 0:
-        return 0
-    
-    round_num = (pick_number - 1) // num_participants
-    position_in_round = (pick_number - 1) % num_participants
-    
-    if round_num % 2 == 0:
-        # Odd rounds: 1 -> N
-        return position_in_round + 1
-    else:
-        # Even rounds: N -> 1
-        return num_participants - position_in_round
+DRAFT_ORDERS = ("snake", "linear", "third_round_reversal", "custom")
 
 
-async def validate_pick(
-    room,
-    participant,
-    player_id,
-    is_player_drafted_func,
-    num_participants: int
-) -> Tuple[bool, str]:
+def build_pick_schedule(
+    draft_order: str,
+    num_participants: int,
+    total_rounds: int,
+    custom_order: Optional[List[int]] = None
+) -> List[int]:
     """
-    Returns (is_valid, error_message)
+    Draft position (1-indexed) making each pick; schedule[0] is pick #1.
+
+    snake:                1..N, N..1, 1..N, ...
+    linear:               1..N every round
+    third_round_reversal: like snake, but round 3 repeats round 2 (N..1)
+                          and rounds alternate again from there
+    custom:               custom_order as given, one entry per pick
+
+    Raises ValueError if the order is unknown or custom_order does not fit.
     """
-    # Check room is drafting
-    if room.status != "drafting":
-        return False, "Draft has not started"
+    total_picks = num_participants * total_rounds
     
-    # Check it's user's turn
-    current_drafter_position = get_current_drafter(room.current_pick + 1, num_participants)
-    if participant.draft_position != current_drafter_position:
-        return False, "Not your turn"
+    if draft_order == "custom":
+        if not custom_order or len(custom_order) != total_picks:
+            raise ValueError(f"Custom order must list {total_picks} picks")
+        if any(not 1 <= position <= num_participants for position in custom_order):
+            raise ValueError(f"Custom order positions must be between 1 and {num_participants}")
+        return list(custom_order)
     
-    # Check player is available
-    if await is_player_drafted_func(room.id, player_id):
-        return False, "Player already drafted"
+    if draft_order == "snake":
+        reversed_round = lambda round_num: round_num % 2 == 1
+    elif draft_order == "linear":
+        reversed_round = lambda round_num: False
+    elif draft_order == "third_round_reversal":
+        # 0-indexed rounds: 1 and 2 go N -> 1, then every other round
+        reversed_round = lambda round_num: round_num == 1 or (round_num >= 2 and round_num % 2 == 0)
+    else:
+        raise ValueError(f"Unknown draft order: {draft_order}")
     
-    return True, ""
-
+    forward = list(range(1, num_participants + 1))
+    schedule = []
+    for round_num in range(total_rounds):
+        schedule.extend(reversed(forward) if reversed_round(round_num) else forward)
+    return schedule
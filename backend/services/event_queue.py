@@ -0,0 +1,317 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from functools import partial
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+import asyncio
+import sqlite3
+import threading
+import time
+import uuid
+import boto3
+
+
+class QueuedMessage(NamedTuple):
+    receipt: str  # Valid for this delivery only
+    body: str
+    receive_count: int  # Deliveries so far, this one included
+
+
+class EventQueue(ABC):
+    """
+    Message queue between the event publisher (services/queue) and the
+    worker, with SQS semantics: received messages stay invisible for a
+    visibility timeout and come back unless deleted within it. Batches are
+    at most 10 messages, as with SQS.
+    """
+
+    @abstractmethod
+    async def send_batch(self, bodies: List[str]) -> List[int]:
+        """Enqueue the bodies. Returns the indexes of those that could not be sent."""
+
+    @abstractmethod
+    async def receive(self, max_messages: int, wait_time: float, visibility_timeout: float) -> List[QueuedMessage]:
+        """Up to max_messages, waiting at most wait_time seconds for the first one."""
+
+    @abstractmethod
+    async def delete_batch(self, receipts: List[str]):
+        ...
+
+    @abstractmethod
+    async def extend(self, receipt: str, visibility_timeout: float):
+        """Keep a received message invisible for visibility_timeout more seconds."""
+
+    def close(self):
+        pass
+
+
+class SQSQueue(EventQueue):
+    """Amazon SQS (LocalStack in development). The blocking boto3 client runs in the default executor."""
+
+    def __init__(self, endpoint_url: Optional[str], queue_url: str):
+        self.queue_url = queue_url
+        self.client = boto3.client(
+            'sqs',
+            endpoint_url=endpoint_url,
+            region_name='us-east-1',
+            aws_access_key_id='test',
+            aws_secret_access_key='test'
+        )
+
+    async def send_batch(self, bodies: List[str]) -> List[int]:
+        response = await self._call(
+            self.client.send_message_batch,
+            QueueUrl=self.queue_url,
+            Entries=[{"Id": str(i), "MessageBody": body} for i, body in enumerate(bodies)]
+        )
+        return [int(entry["Id"]) for entry in response.get("Failed", [])]
+
+    async def receive(self, max_messages: int, wait_time: float, visibility_timeout: float) -> List[QueuedMessage]:
+        response = await self._call(
+            self.client.receive_message,
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=max_messages,
+            WaitTimeSeconds=int(wait_time),
+            VisibilityTimeout=int(visibility_timeout),
+            AttributeNames=["ApproximateReceiveCount"]
+        )
+        return [
+            QueuedMessage(
+                message["ReceiptHandle"],
+                message["Body"],
+                int(message.get("Attributes", {}).get("ApproximateReceiveCount", 1))
+            )
+            for message in response.get("Messages", [])
+        ]
+
+    async def delete_batch(self, receipts: List[str]):
+        response = await self._call(
+            self.client.delete_message_batch,
+            QueueUrl=self.queue_url,
+            Entries=[{"Id": str(i), "ReceiptHandle": receipt} for i, receipt in enumerate(receipts)]
+        )
+        for failure in response.get("Failed", []):
+            print(f"Error deleting message: {failure.get('Message')}")
+
+    async def extend(self, receipt: str, visibility_timeout: float):
+        await self._call(
+            self.client.change_message_visibility,
+            QueueUrl=self.queue_url,
+            ReceiptHandle=receipt,
+            VisibilityTimeout=int(visibility_timeout)
+        )
+
+    @staticmethod
+    async def _call(method, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(None, partial(method, **kwargs))
+
+
+class InMemoryQueue(EventQueue):
+    """
+    Queue inside one process, for running the API and the worker together
+    (single-node deployments, benchmarks). Messages are lost on restart.
+    """
+
+    def __init__(self):
+        # [body, receive_count]
+        self._ready: Deque[list] = deque()
+        # receipt -> (message, visible again at)
+        self._in_flight: Dict[str, Tuple[list, float]] = {}
+        self._arrived = asyncio.Event()
+
+    async def send_batch(self, bodies: List[str]) -> List[int]:
+        self._ready.extend([body, 0] for body in bodies)
+        self._arrived.set()
+        return []
+
+    async def receive(self, max_messages: int, wait_time: float, visibility_timeout: float) -> List[QueuedMessage]:
+        deadline = time.monotonic() + wait_time
+        while True:
+            self._requeue_expired()
+            if self._ready:
+                break
+            now = time.monotonic()
+            if now >= deadline:
+                return []
+            # Wake for new messages, or when an in-flight one becomes visible again
+            next_visible = min((visible_at for _, visible_at in self._in_flight.values()), default=deadline)
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), min(deadline, next_visible) - now)
+            except asyncio.TimeoutError:
+                pass
+
+        visible_at = time.monotonic() + visibility_timeout
+        received = []
+        while self._ready and len(received) < max_messages:
+            message = self._ready.popleft()
+            message[1] += 1
+            receipt = uuid.uuid4().hex
+            self._in_flight[receipt] = (message, visible_at)
+            received.append(QueuedMessage(receipt, message[0], message[1]))
+        return received
+
+    async def delete_batch(self, receipts: List[str]):
+        for receipt in receipts:
+            self._in_flight.pop(receipt, None)
+
+    async def extend(self, receipt: str, visibility_timeout: float):
+        if receipt in self._in_flight:
+            message, _ = self._in_flight[receipt]
+            self._in_flight[receipt] = (message, time.monotonic() + visibility_timeout)
+            # A waiting receive may need to wake sooner
+            self._arrived.set()
+
+    def _requeue_expired(self):
+        now = time.monotonic()
+        expired = [receipt for receipt, (_, visible_at) in self._in_flight.items() if visible_at <= now]
+        for receipt in expired:
+            self._ready.append(self._in_flight.pop(receipt)[0])
+
+
+class SQLiteQueue(EventQueue):
+    """
+    Durable queue in a local SQLite file, for single-node deployments
+    without SQS. Processes on the same machine can share the file, and
+    several queues can live in one file under different table names. A
+    receipt names the message and its delivery, so a late delete or
+    extend from an earlier delivery does nothing.
+    """
+
+    # Receive checks for new messages this often while long-polling
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, path: str, table: str = "messages"):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._table = table
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                body TEXT NOT NULL,
+                receive_count INTEGER NOT NULL DEFAULT 0,
+                visible_at REAL NOT NULL
+            )
+        """)
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_visible_at ON {table} (visible_at)")
+
+    async def send_batch(self, bodies: List[str]) -> List[int]:
+        await self._run(self._send, bodies)
+        return []
+
+    async def receive(self, max_messages: int, wait_time: float, visibility_timeout: float) -> List[QueuedMessage]:
+        deadline = time.monotonic() + wait_time
+        while True:
+            received = await self._run(self._receive, max_messages, visibility_timeout)
+            if received or time.monotonic() >= deadline:
+                return received
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+    async def delete_batch(self, receipts: List[str]):
+        await self._run(self._delete, receipts)
+
+    async def extend(self, receipt: str, visibility_timeout: float):
+        message_id, receive_count = self._parse(receipt)
+        await self._run(
+            self._execute,
+            f"UPDATE {self._table} SET visible_at = ? WHERE id = ? AND receive_count = ?",
+            (time.time() + visibility_timeout, message_id, receive_count)
+        )
+
+    def close(self):
+        self._db.close()
+
+    def _send(self, bodies: List[str]):
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                f"INSERT INTO {self._table} (body, visible_at) VALUES (?, ?)", [(body, now) for body in bodies]
+            )
+            self._db.execute("COMMIT")
+
+    def _receive(self, max_messages: int, visibility_timeout: float) -> List[QueuedMessage]:
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two processes never claim the same rows
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    f"SELECT id, body, receive_count FROM {self._table} WHERE visible_at <= ? ORDER BY id LIMIT ?",
+                    (now, max_messages)
+                ).fetchall()
+                self._db.executemany(
+                    f"UPDATE {self._table} SET receive_count = receive_count + 1, visible_at = ? WHERE id = ?",
+                    [(now + visibility_timeout, row[0]) for row in rows]
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return [
+            QueuedMessage(f"{message_id}:{receive_count + 1}", body, receive_count + 1)
+            for message_id, body, receive_count in rows
+        ]
+
+    def _delete(self, receipts: List[str]):
+        with self._lock:
+            self._db.executemany(
+                f"DELETE FROM {self._table} WHERE id = ? AND receive_count = ?", [self._parse(r) for r in receipts]
+            )
+
+    def _execute(self, sql: str, params: tuple):
+        with self._lock:
+            self._db.execute(sql, params)
+
+    @staticmethod
+    def _parse(receipt: str) -> Tuple[int, int]:
+        message_id, receive_count = receipt.split(":")
+        return int(message_id), int(receive_count)
+
+    @staticmethod
+    async def _run(fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+def create_event_queue(kind: str, dead_letter: bool = False) -> EventQueue:
+    """
+    The draft event queue of the given kind, or its dead-letter queue. The
+    in-memory queue's dead letters go to the SQLite file at event_queue_path,
+    so they outlive the process and worker.replay can read them.
+    """
+    from config import settings
+    if kind == "sqs":
+        return SQSQueue(
+            settings.sqs_endpoint,
+            settings.sqs_dead_letter_queue_url if dead_letter else settings.sqs_queue_url
+        )
+    if kind == "memory":
+        if dead_letter:
+            return SQLiteQueue(settings.event_queue_path, "dead_letters")
+        return InMemoryQueue()
+    if kind == "sqlite":
+        return SQLiteQueue(settings.event_queue_path, "dead_letters" if dead_letter else "messages")
+    raise ValueError(f"Unknown event queue: {kind}")
+
+
+_event_queue: Optional[EventQueue] = None
+_dead_letter_queue: Optional[EventQueue] = None
+
+
+def get_event_queue() -> EventQueue:
+    """The process-wide queue chosen by EVENT_QUEUE, shared by the publisher and an in-process worker."""
+    global _event_queue
+    if _event_queue is None:
+        from config import settings
+        _event_queue = create_event_queue(settings.event_queue)
+    return _event_queue
+
+
+def get_dead_letter_queue() -> EventQueue:
+    """Where the worker moves events that kept failing (see worker/replay.py)."""
+    global _dead_letter_queue
+    if _dead_letter_queue is None:
+        from config import settings
+        _dead_letter_queue = create_event_queue(settings.event_queue, dead_letter=True)
+    return _dead_letter_queue
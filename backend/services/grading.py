@@ -0,0 +1,117 @@
+"""
+Post-draft team grades, computed by the worker once a room completes.
+
+Every team is graded at once from flat per-pick arrays: projected points
+of the best starting lineup (services/autopick STARTERS plus FLEX),
+strength at each position relative to the room, and value over ADP, the
+picks later than expected each player was taken (ADP here is the
+player's rank by fantasy_pts over the whole catalog).
+"""
+from typing import Dict, List, NamedTuple, Sequence
+from uuid import UUID
+import numpy as np
+from services.autopick import POSITIONS, STARTERS, FLEX_POSITIONS, FLEX_SLOTS
+
+# Weight of value over ADP next to lineup points in the grade score (both as z-scores)
+VALUE_WEIGHT = 0.25
+# Lowest grade score for each letter, best first; anything lower is a D
+GRADE_CUTOFFS = (
+    (1.25, "A+"),
+    (0.75, "A"),
+    (0.25, "B+"),
+    (-0.25, "B"),
+    (-0.75, "C+"),
+    (-1.25, "C"),
+)
+
+
+class GradedPick(NamedTuple):
+    participant_id: UUID
+    pick_number: int
+    position: str
+    fantasy_pts: float
+    adp: int  # Overall rank by fantasy_pts, 1 = best
+
+
+class TeamGrade(NamedTuple):
+    participant_id: UUID
+    projected_points: float
+    total_points: float
+    value_over_adp: float
+    positional_strength: Dict[str, float]
+    score: float
+    grade: str
+    rank: int
+
+
+def letter_grade(scores: np.ndarray) -> List[str]:
+    cutoffs = np.array([cutoff for cutoff, _ in GRADE_CUTOFFS])
+    letters = [letter for _, letter in GRADE_CUTOFFS] + ["D"]
+    # Number of cutoffs above each score is the index of its letter
+    return [letters[i] for i in (scores[:, np.newaxis] < cutoffs).sum(axis=1)]
+
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+
+
+def grade_teams(participant_ids: Sequence[UUID], picks: Sequence[GradedPick]) -> List[TeamGrade]:
+    """Grade every participant (teams without picks included) from the room's picks."""
+    num_teams = len(participant_ids)
+    team_of = {participant_id: t for t, participant_id in enumerate(participant_ids)}
+    codes = {position: code for code, position in enumerate(POSITIONS)}
+
+    team = np.array([team_of[p.participant_id] for p in picks], dtype=np.int64)
+    position = np.array([codes.get(p.position, -1) for p in picks], dtype=np.int64)
+    points = np.array([p.fantasy_pts for p in picks], dtype=np.float64)
+    value = np.array([p.pick_number - p.adp for p in picks], dtype=np.float64)
+
+    # Rank of each pick among its team's players at the same position, best first
+    order = np.lexsort((-points, position, team))
+    group = team[order] * (len(POSITIONS) + 1) + position[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(group)) + 1] if len(order) else np.zeros(0, dtype=np.int64)
+    depth = np.empty(len(order), dtype=np.int64)
+    depth[order] = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+
+    starter_slots = np.array([STARTERS[p] for p in POSITIONS] + [0])
+    starter = (position >= 0) & (depth < starter_slots[position])
+
+    # FLEX: the best RB/WR/TE left on each team after the starters
+    flex_eligible = ~starter & np.isin(position, [codes[p] for p in FLEX_POSITIONS])
+    flex = np.zeros(len(picks), dtype=bool)
+    candidates = np.flatnonzero(flex_eligible)
+    by_team = candidates[np.lexsort((-points[candidates], team[candidates]))]
+    flex_order = np.arange(len(by_team)) - np.searchsorted(team[by_team], team[by_team])
+    flex[by_team[flex_order < FLEX_SLOTS]] = True
+
+    lineup = starter | flex
+    projected = np.bincount(team, weights=points * lineup, minlength=num_teams)
+    total = np.bincount(team, weights=points, minlength=num_teams)
+    value_over_adp = np.bincount(team, weights=value, minlength=num_teams)
+
+    # Starter points per team and position, relative to the room average (100 = average)
+    strength = np.zeros((num_teams, len(POSITIONS)))
+    known = starter & (position >= 0)
+    np.add.at(strength, (team[known], position[known]), points[known])
+    average = strength.mean(axis=0)
+    strength = np.divide(strength * 100, average, out=np.zeros_like(strength), where=average > 0)
+
+    scores = _zscore(projected) + VALUE_WEIGHT * _zscore(value_over_adp)
+    grades = letter_grade(scores)
+    ranks = np.empty(num_teams, dtype=np.int64)
+    ranks[np.argsort(-scores, kind="stable")] = np.arange(1, num_teams + 1)
+
+    return [
+        TeamGrade(
+            participant_id=participant_id,
+            projected_points=round(float(projected[t]), 1),
+            total_points=round(float(total[t]), 1),
+            value_over_adp=round(float(value_over_adp[t]), 1),
+            positional_strength={p: round(float(strength[t, c]), 1) for c, p in enumerate(POSITIONS)},
+            score=round(float(scores[t]), 3),
+            grade=grades[t],
+            rank=int(ranks[t]),
+        )
+        for t, participant_id in enumerate(participant_ids)
+    ]
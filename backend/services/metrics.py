@@ -0,0 +1,10 @@
+def latency_percentiles(samples) -> dict:
+    """p50, p99 and max of durations in seconds, as milliseconds (zeros when there are none)."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "p50": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p99": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3),
+        "max": round(ordered[-1] * 1000, 3),
+    }
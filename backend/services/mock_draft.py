@@ -0,0 +1,315 @@
+"""
+Monte Carlo mock drafts.
+
+Simulates many drafts of one configuration at once: every step of the
+pick schedule is a handful of NumPy operations across all simulations,
+and batches of simulations run on a process pool. Simulated drafters use
+the auto-pick need weights (services/autopick.need_weights) on player
+values jittered per simulation, so drafts differ the way real ones do.
+The next-turn replacement term of the roster_aware strategy is left out;
+it would dominate the cost of every step.
+
+CLI (from backend/):
+    python -m services.mock_draft --teams 12 --rounds 15 --simulations 10000
+"""
+import argparse
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence
+from uuid import UUID
+import numpy as np
+from services.autopick import POSITIONS, OTHER_NEED, get_arrays, need_weights
+from services.catalog import PlayerCatalog
+
+# Standard deviation of the log-normal jitter on player values per simulation
+VALUE_NOISE = 0.08
+# Simulations per process pool task; keeps the per-step arrays cache-sized
+BATCH_SIZE = 1000
+MAX_SIMULATIONS = 5000
+# Players listed per slot in the summary
+ROSTER_PREVIEW = 20
+
+
+class MockDraftSetup(NamedTuple):
+    """Everything a worker needs, as compact arrays (pickled once per batch)."""
+    candidates: np.ndarray     # Catalog index of each simulated player
+    points: np.ndarray         # float32 fantasy_pts per candidate
+    positions: np.ndarray      # int8 POSITIONS code per candidate, -1 if other
+    schedule: np.ndarray       # int16 team slot for each remaining pick
+    picks_left: np.ndarray     # int16 picks the team still has at each remaining pick
+    roster_counts: np.ndarray  # int16 team x position counts before the first remaining pick
+    first_pick: int            # Pick number of schedule[0]
+
+
+class MockDraftTotals(NamedTuple):
+    simulations: int
+    pick_sum: np.ndarray       # Sum of the pick numbers each candidate went at
+    times_drafted: np.ndarray  # Simulations in which each candidate was drafted
+    team_counts: np.ndarray    # team x candidate: simulations the team drafted the candidate
+
+    def __add__(self, other: "MockDraftTotals") -> "MockDraftTotals":
+        return MockDraftTotals(
+            self.simulations + other.simulations,
+            self.pick_sum + other.pick_sum,
+            self.times_drafted + other.times_drafted,
+            self.team_counts + other.team_counts
+        )
+
+
+def build_setup(
+    catalog: PlayerCatalog,
+    pick_order: Sequence[int],
+    rosters: Sequence[Sequence[UUID]],
+    current_pick: int = 0
+) -> MockDraftSetup:
+    """
+    Simulate the picks after current_pick. pick_order holds the team slot
+    of every pick in the draft (DraftRoomState.pick_order) and rosters the
+    player ids each team has drafted so far.
+    """
+    arrays = get_arrays(catalog)
+    num_teams = len(rosters)
+    schedule = np.asarray(pick_order[current_pick:], dtype=np.int16)
+
+    available = np.ones(len(catalog.ids), dtype=bool)
+    roster_counts = np.zeros((num_teams, len(POSITIONS)), dtype=np.int16)
+    for slot, roster in enumerate(rosters):
+        for player_id in roster:
+            index = catalog.index_of.get(player_id)
+            if index is None:
+                continue
+            available[index] = False
+            if arrays.position[index] >= 0:
+                roster_counts[slot, arrays.position[index]] += 1
+
+    # Players outside the top of the board overall and at their position are never reached
+    remaining = np.flatnonzero(available)
+    keep = np.zeros(len(catalog.ids), dtype=bool)
+    keep[remaining[:math.ceil(len(schedule) * 1.5) + num_teams]] = True
+    for indexes in arrays.by_position:
+        keep[indexes[available[indexes]][:2 * num_teams]] = True
+    candidates = np.flatnonzero(keep)
+
+    # Every simulated draft removes one player per pick, so they all run out together
+    schedule = schedule[:len(candidates)]
+    picks_left = np.zeros(len(schedule), dtype=np.int16)
+    left_per_team = np.zeros(num_teams, dtype=np.int16)
+    for step in range(len(schedule) - 1, -1, -1):
+        left_per_team[schedule[step]] += 1
+        picks_left[step] = left_per_team[schedule[step]]
+
+    return MockDraftSetup(
+        candidates=candidates,
+        points=arrays.points[candidates].astype(np.float32),
+        positions=arrays.position[candidates],
+        schedule=schedule,
+        picks_left=picks_left,
+        roster_counts=roster_counts,
+        first_pick=current_pick + 1
+    )
+
+
+def simulate_batch(setup: MockDraftSetup, simulations: int, seed: int) -> MockDraftTotals:
+    """Run simulations drafts side by side; one vectorized step per pick."""
+    rng = np.random.default_rng(seed)
+    num_candidates = len(setup.candidates)
+    num_teams = len(setup.roster_counts)
+
+    values = setup.points * np.exp(
+        rng.normal(0.0, VALUE_NOISE, (simulations, num_candidates))
+    ).astype(np.float32)
+    counts = np.repeat(setup.roster_counts[np.newaxis], simulations, axis=0)
+    # Position code -1 reads the trailing OTHER_NEED column
+    position_column = np.where(setup.positions >= 0, setup.positions, len(POSITIONS))
+    other_need = np.full((simulations, 1), OTHER_NEED)
+    rows = np.arange(simulations)
+
+    pick_sum = np.zeros(num_candidates, dtype=np.float64)
+    times_drafted = np.zeros(num_candidates, dtype=np.int64)
+    team_counts = np.zeros((num_teams, num_candidates), dtype=np.int64)
+
+    for step, (team, picks_left) in enumerate(zip(setup.schedule, setup.picks_left)):
+        # The small floor keeps the best player in reach when every position is filled
+        need = np.hstack([need_weights(counts[:, team, :], int(picks_left)), other_need]).astype(np.float32) + 1e-3
+        chosen = (need[:, position_column] * values).argmax(axis=1)
+
+        # Drafted players score below everyone still available from then on
+        values[rows, chosen] = -1.0
+        chosen_positions = setup.positions[chosen]
+        known = chosen_positions >= 0
+        counts[rows[known], team, chosen_positions[known]] += 1
+
+        drafted = np.bincount(chosen, minlength=num_candidates)
+        pick_sum += drafted * (setup.first_pick + step)
+        times_drafted += drafted
+        team_counts[team] += drafted
+
+    return MockDraftTotals(simulations, pick_sum, times_drafted, team_counts)
+
+
+def _batches(simulations: int, seed: int):
+    for start in range(0, simulations, BATCH_SIZE):
+        yield min(BATCH_SIZE, simulations - start), seed + start
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        from config import settings
+        _pool = ProcessPoolExecutor(max_workers=workers or settings.mock_draft_workers or os.cpu_count())
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def run_mock_draft(setup: MockDraftSetup, simulations: int, seed: int = 0, workers: Optional[int] = None) -> MockDraftTotals:
+    """Blocking: run the simulations on the process pool and add up the batches."""
+    pool = get_pool(workers)
+    futures = [pool.submit(simulate_batch, setup, size, batch_seed) for size, batch_seed in _batches(simulations, seed)]
+    return sum((future.result() for future in futures[1:]), futures[0].result())
+
+
+async def run_mock_draft_async(setup: MockDraftSetup, simulations: int, seed: int = 0) -> MockDraftTotals:
+    """run_mock_draft without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(pool, simulate_batch, setup, size, batch_seed)
+        for size, batch_seed in _batches(simulations, seed)
+    ))
+    return sum(results[1:], results[0])
+
+
+def summarize(
+    catalog: PlayerCatalog,
+    setup: MockDraftSetup,
+    totals: MockDraftTotals,
+    team_names: List[str],
+    rosters: Sequence[Sequence[UUID]]
+) -> dict:
+    """Expected draft position per player and expected roster per draft slot."""
+    sims = totals.simulations
+    drafted = np.flatnonzero(totals.times_drafted)
+    expected_pick = totals.pick_sum[drafted] / totals.times_drafted[drafted]
+
+    players = []
+    for k in np.argsort(expected_pick, kind="stable"):
+        candidate = drafted[k]
+        player = catalog.players[setup.candidates[candidate]]
+        players.append({
+            "id": player["id"],
+            "name": player["name"],
+            "position": player["position"],
+            "expected_pick": round(float(expected_pick[k]), 2),
+            "drafted_pct": round(100.0 * totals.times_drafted[candidate] / sims, 1),
+        })
+
+    slots = []
+    for team, name in enumerate(team_names):
+        probability = totals.team_counts[team] / sims
+        kept = [catalog.by_id[pid] for pid in rosters[team] if pid in catalog.by_id]
+        expected_points = float(probability @ setup.points) + sum(p["fantasy_pts"] or 0 for p in kept)
+        likely = np.argsort(-probability, kind="stable")[:ROSTER_PREVIEW]
+        slots.append({
+            "draft_position": team + 1,
+            "user_name": name,
+            "expected_points": round(expected_points, 1),
+            "players": [
+                {"id": p["id"], "name": p["name"], "position": p["position"], "probability": 1.0}
+                for p in kept
+            ] + [
+                {
+                    "id": catalog.players[setup.candidates[c]]["id"],
+                    "name": catalog.players[setup.candidates[c]]["name"],
+                    "position": catalog.players[setup.candidates[c]]["position"],
+                    "probability": round(float(probability[c]), 3),
+                }
+                for c in likely if probability[c] > 0
+            ],
+        })
+
+    return {"simulations": sims, "players": players, "slots": slots}
+
+
+def _synthetic_catalog(size: int, seed: int) -> PlayerCatalog:
+    """Random players shaped like a real board, for running the CLI without a database."""
+    from uuid import uuid4
+    rng = np.random.default_rng(seed)
+    weights = {"QB": 3, "RB": 6, "WR": 7, "TE": 3, "K": 2, "DEF": 2}
+    positions = rng.choice(list(weights), size=size, p=np.array(list(weights.values())) / sum(weights.values()))
+    players = []
+    ranks = {}
+    for i, position in enumerate(positions):
+        # Points fall off steeply from the top of each position, like a real board
+        rank = ranks[position] = ranks.get(position, -1) + 1
+        if position in ("K", "DEF"):
+            points = 90 + 80 * np.exp(-rank / 15)
+        else:
+            points = 30 + 320 * np.exp(-rank / (weights[position] * 8)) * rng.uniform(0.9, 1.1)
+        players.append({
+            "id": uuid4(), "name": f"Player {i}", "team": "FA", "position": str(position),
+            "fantasy_pts": round(float(points), 1),
+            "pass_yds": None, "pass_td": None, "rush_yds": None, "rush_td": None,
+            "rec_yds": None, "rec_td": None, "fg_made": None, "xp_made": None,
+            "sacks": None, "ints": None, "image_url": None,
+        })
+    players.sort(key=lambda p: p["fantasy_pts"], reverse=True)
+    synthetic = PlayerCatalog()
+    synthetic.load(players)
+    return synthetic
+
+
+async def _load_catalog() -> PlayerCatalog:
+    from services.catalog import get_catalog
+    return await get_catalog()
+
+
+def main():
+    from services.draft import DRAFT_ORDERS, build_pick_schedule
+
+    parser = argparse.ArgumentParser(description="Monte Carlo mock drafts over the player catalog")
+    parser.add_argument("--teams", type=int, default=12)
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--order", choices=DRAFT_ORDERS[:3], default="snake")
+    parser.add_argument("--simulations", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--synthetic-players", type=int, default=0,
+                        help="Use N random players instead of the database catalog")
+    parser.add_argument("--top", type=int, default=24, help="Players to list")
+    args = parser.parse_args()
+
+    catalog = _synthetic_catalog(args.synthetic_players, args.seed) if args.synthetic_players else asyncio.run(_load_catalog())
+    pick_order = [position - 1 for position in build_pick_schedule(args.order, args.teams, args.rounds)]
+    rosters = [[] for _ in range(args.teams)]
+
+    started = time.perf_counter()
+    setup = build_setup(catalog, pick_order, rosters)
+    totals = run_mock_draft(setup, args.simulations, args.seed, args.workers)
+    elapsed = time.perf_counter() - started
+    shutdown_pool()
+
+    summary = summarize(catalog, setup, totals, [f"Team {i + 1}" for i in range(args.teams)], rosters)
+    print(f"{args.simulations} drafts, {args.teams} teams x {args.rounds} rounds ({args.order}), "
+          f"{len(setup.candidates)} candidate players: {elapsed:.2f} s")
+    print("\nExpected draft position:")
+    for player in summary["players"][:args.top]:
+        print(f"  {player['expected_pick']:7.2f}  {player['name']:<28} {player['position']:<4} {player['drafted_pct']:5.1f}%")
+    print("\nExpected points by draft slot:")
+    for slot in summary["slots"]:
+        print(f"  #{slot['draft_position']:<3} {slot['expected_points']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+from db.database import async_session
+from db.queries import replace_queues
+
+MAX_QUEUE_LENGTH = 100
+
+
+class PickQueues:
+    """
+    Every participant's ranked list of target players in one room, indexed
+    like DraftRoomState.participants. queued_by maps a player to the slots
+    queuing them, so a pick removes the player from each queue holding
+    them without scanning any queue.
+    """
+    __slots__ = ("queues", "queued_by")
+
+    def __init__(self, num_participants: int):
+        self.queues: List["OrderedDict[UUID, None]"] = [OrderedDict() for _ in range(num_participants)]
+        self.queued_by: Dict[UUID, Set[int]] = {}
+
+    def get(self, slot: int) -> List[UUID]:
+        return list(self.queues[slot])
+
+    def first(self, slot: int) -> Optional[UUID]:
+        return next(iter(self.queues[slot]), None)
+
+    def set(self, slot: int, player_ids: List[UUID]):
+        for player_id in self.queues[slot]:
+            slots = self.queued_by[player_id]
+            slots.discard(slot)
+            if not slots:
+                del self.queued_by[player_id]
+        self.queues[slot] = OrderedDict.fromkeys(player_ids)
+        for player_id in player_ids:
+            self.queued_by.setdefault(player_id, set()).add(slot)
+
+    def prune(self, player_id: UUID) -> Set[int]:
+        """Drop a drafted player from every queue. Returns the slots whose queue changed."""
+        slots = self.queued_by.pop(player_id, set())
+        for slot in slots:
+            del self.queues[slot][player_id]
+        return slots
+
+
+class QueueWriter:
+    """
+    Persists queue changes lazily. Each participant's latest queue is kept
+    until the next flush, FLUSH_DELAY seconds after the first change, so a
+    user reordering their queue quickly costs one write. Pruning after
+    picks is not written at all; drafted players are skipped on load.
+    """
+
+    FLUSH_DELAY = 2.0
+
+    def __init__(self):
+        # participant_id -> (room_id, player_ids)
+        self._pending: Dict[UUID, Tuple[UUID, List[UUID]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def submit(self, room_id: UUID, participant_id: UUID, player_ids: List[UUID]):
+        self._pending[participant_id] = (room_id, player_ids)
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_later())
+
+    def pending_for(self, room_id: UUID) -> Dict[UUID, List[UUID]]:
+        """Queues of a room's participants not written yet, to lay over what the database has."""
+        return {
+            participant_id: player_ids
+            for participant_id, (pending_room, player_ids) in self._pending.items()
+            if pending_room == room_id
+        }
+
+    async def flush(self):
+        pending, self._pending = self._pending, {}
+        by_room: Dict[UUID, Dict[UUID, List[UUID]]] = {}
+        for participant_id, (room_id, player_ids) in pending.items():
+            by_room.setdefault(room_id, {})[participant_id] = player_ids
+
+        for room_id, queues in by_room.items():
+            try:
+                async with async_session() as db:
+                    await replace_queues(db, room_id, queues)
+                    await db.commit()
+                self.written += len(queues)
+            except Exception as e:
+                print(f"Error persisting pick queues for room {room_id}: {e}")
+                # Keep them for the next flush unless they were replaced meanwhile
+                for participant_id, player_ids in queues.items():
+                    self._pending.setdefault(participant_id, (room_id, player_ids))
+
+    async def stop(self):
+        """Write everything still pending (shutdown)."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.FLUSH_DELAY)
+        # Changes made while flushing schedule the next flush themselves
+        self._task = None
+        await self.flush()
+        if self._pending and self._task is None:
+            self._task = asyncio.create_task(self._flush_later())
@@ -1,40 +1,122 @@
-import boto3
+import asyncio
 import json
 from datetime import datetime
-from config import settings
-
-
-sqs_client = None
-
-
-def get_sqs_client():
-    global sqs_client
-    if sqs_client is None:
-        sqs_client = boto3.client(
-            'sqs',
-            endpoint_url=settings.sqs_endpoint,
-            region_name='us-east-1',
-            aws_access_key_id='test',
-            aws_secret_access_key='test'
-        )
-    return sqs_client
-
-
-async def send_draft_complete_event(room_id: str):
-    """Send draft_complete event to SQS queue."""
-    try:
-        client = get_sqs_client()
-        message = {
-            "event": "draft_complete",
-            "room_id": room_id,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        client.send_message(
-            QueueUrl=settings.sqs_queue_url,
-            MessageBody=json.dumps(message)
-        )
-        print(f"Sent draft_complete event for room {room_id} to SQS")
-    except Exception as e:
-        print(f"Error sending to SQS: {e}")
+from typing import Optional
+from uuid import UUID, uuid4
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from db.database import async_session
+from db.queries import add_outbox_event, claim_outbox_events, delete_outbox_events, retry_outbox_event
+from services.event_queue import EventQueue, get_event_queue
 
+
+def enqueue_event(db: AsyncSession, event: str, room_id: UUID, **fields):
+    """
+    Stage a draft event (draft_started, pick_made, draft_complete) in the
+    outbox. It goes out with the caller's commit, or not at all; call
+    event_publisher.wake() after committing to send it straight away.
+    """
+    event_id = uuid4()
+    add_outbox_event(db, event_id, event, {
+        # Stays the same across redeliveries; the worker's idempotency key
+        "event_id": str(event_id),
+        "event": event,
+        "room_id": str(room_id),
+        "timestamp": datetime.now().isoformat(),
+        **fields
+    })
+
+
+class EventPublisher:
+    """
+    Relays outbox events to the event queue (services/event_queue) in the
+    background.
+
+    Events are claimed in batches of up to BATCH_SIZE (the SendMessageBatch
+    limit) and sent in one call; the SQS client runs in a worker thread, so
+    the event loop never waits on SQS. Sent events are deleted; failed ones
+    are retried with exponential backoff. Besides being woken after commits, the publisher polls every
+    POLL_INTERVAL seconds for retries and events other processes left behind.
+    """
+
+    BATCH_SIZE = 10
+    POLL_INTERVAL = 5.0
+    RETRY_DELAY = 1.0
+    MAX_RETRY_DELAY = 300.0
+
+    def __init__(
+        self,
+        queue: Optional[EventQueue] = None,
+        session_factory: async_sessionmaker = async_session
+    ):
+        # Defaults to the queue configured by EVENT_QUEUE, resolved on first use
+        self._queue = queue
+        self._session_factory = session_factory
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.failed = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop publishing; unsent events stay in the outbox for the next start."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        self._wake.set()
+
+    def stats(self) -> dict:
+        return {"published": self.published, "failed_sends": self.failed}
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                # Keep going while batches come back full and sent
+                while await self.publish_batch() == self.BATCH_SIZE:
+                    pass
+            except Exception as e:
+                print(f"Error publishing draft events: {e}")
+
+    async def publish_batch(self) -> int:
+        """Send one batch of due events. Returns how many were sent."""
+        if self._queue is None:
+            self._queue = get_event_queue()
+        async with self._session_factory() as db:
+            events = await claim_outbox_events(db, self.BATCH_SIZE)
+            if not events:
+                return 0
+
+            try:
+                failed = set(await self._queue.send_batch([json.dumps(event.payload) for event in events]))
+            except Exception as e:
+                print(f"Error sending draft events: {e}")
+                failed = set(range(len(events)))
+
+            sent = [event.id for i, event in enumerate(events) if i not in failed]
+            await delete_outbox_events(db, sent)
+            for i in failed:
+                attempts = events[i].attempts or 0
+                retry_outbox_event(events[i], min(self.MAX_RETRY_DELAY, self.RETRY_DELAY * 2 ** attempts))
+            await db.commit()
+
+        self.published += len(sent)
+        self.failed += len(failed)
+        if sent:
+            print(f"Sent {len(sent)} draft event(s)")
+        return len(sent)
+
+
+event_publisher = EventPublisher()
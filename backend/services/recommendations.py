@@ -0,0 +1,102 @@
+from typing import Callable, Dict, List, Optional, Sequence, Set
+from uuid import UUID
+from services.catalog import catalog
+
+RECOMMENDATION_SIZE = 5
+
+
+class TopK:
+    """
+    The best k undrafted entries of a ranked list of catalog indexes.
+    Drafting one of them refills from a cursor that only moves forward,
+    so keeping the list current costs O(k) per pick, never a re-sort.
+    """
+    __slots__ = ("ranked", "k", "top", "cursor")
+
+    def __init__(self, ranked: Sequence[int], k: int, is_drafted: Callable[[int], bool]):
+        self.ranked = ranked
+        self.k = k
+        self.top: List[int] = []
+        self.cursor = 0
+        self._refill(is_drafted)
+
+    def remove(self, index: int, is_drafted: Callable[[int], bool]):
+        if index in self.top:
+            self.top.remove(index)
+            self._refill(is_drafted)
+
+    def _refill(self, is_drafted: Callable[[int], bool]):
+        while len(self.top) < self.k and self.cursor < len(self.ranked):
+            index = self.ranked[self.cursor]
+            self.cursor += 1
+            if not is_drafted(index):
+                self.top.append(index)
+
+
+class RoomRecommendations:
+    """
+    Best available players overall and per position for one room, plus how
+    scarce each position is getting, kept current pick by pick. Built on
+    first use and rebuilt if the catalog is reloaded.
+    """
+    __slots__ = ("drafted", "overall", "by_position", "remaining", "catalog_version")
+
+    def __init__(self, drafted: Set[UUID]):
+        # Shared with DraftRoomState.drafted
+        self.drafted = drafted
+        self.overall: Optional[TopK] = None
+        self.by_position: Dict[str, TopK] = {}
+        # Undrafted players left per position
+        self.remaining: Dict[str, int] = {}
+        self.catalog_version = 0
+
+    def mark(self, player_id: UUID):
+        """Account for a new pick (the caller adds it to drafted)."""
+        if self.overall is None or self.catalog_version != catalog.version:
+            return
+        index = catalog.index_of.get(player_id)
+        if index is None:
+            return
+        position = catalog.players[index]["position"]
+        self.overall.remove(index, self._is_drafted)
+        self.by_position[position].remove(index, self._is_drafted)
+        self.remaining[position] -= 1
+
+    def payload(self) -> dict:
+        """
+        Compact recommendations message: player ids best first, and per
+        position the players left and the fantasy_pts drop from the best
+        available to the k-th (how much waiting a round costs).
+        """
+        if self.overall is None or self.catalog_version != catalog.version:
+            self._build()
+        points = lambda index: catalog.players[index]["fantasy_pts"] or 0
+        return {
+            "overall": [str(catalog.ids[i]) for i in self.overall.top],
+            "by_position": {
+                position: [str(catalog.ids[i]) for i in top.top]
+                for position, top in self.by_position.items()
+            },
+            "scarcity": {
+                position: {
+                    "remaining": self.remaining[position],
+                    "dropoff": round(points(top.top[0]) - points(top.top[-1]), 1) if top.top else 0.0
+                }
+                for position, top in self.by_position.items()
+            },
+        }
+
+    def _is_drafted(self, index: int) -> bool:
+        return catalog.ids[index] in self.drafted
+
+    def _build(self):
+        self.catalog_version = catalog.version
+        self.overall = TopK(range(len(catalog.ids)), RECOMMENDATION_SIZE, self._is_drafted)
+        self.by_position = {
+            position: TopK(ranked, RECOMMENDATION_SIZE, self._is_drafted)
+            for position, ranked in catalog.by_position.items()
+        }
+        self.remaining = {
+            position: sum(1 for i in ranked if not self._is_drafted(i))
+            for position, ranked in catalog.by_position.items()
+        }
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict
+from uuid import UUID
+from services.metrics import latency_percentiles
+
+
+class CommandStats:
+    """Count plus recent queue-wait and service times for one command type."""
+    __slots__ = ("count", "failed", "wait", "service")
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.failed = 0
+        self.wait: Deque[float] = deque(maxlen=window)
+        self.service: Deque[float] = deque(maxlen=window)
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "failed": self.failed,
+            "wait_ms": latency_percentiles(self.wait),
+            "service_ms": latency_percentiles(self.service),
+        }
+
+
+class RoomActor:
+    """Single consumer that runs one room's mutating commands strictly in arrival order."""
+
+    def __init__(self, key: str, registry: "RoomActors"):
+        self.key = key
+        self.registry = registry
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            while True:
+                try:
+                    name, command, future, enqueued_at = await asyncio.wait_for(
+                        self.queue.get(), self.registry.idle_timeout
+                    )
+                except asyncio.TimeoutError:
+                    if self.queue.empty():
+                        # Nothing can be submitted between this check and removal (no await)
+                        return
+                    continue
+
+                stats = self.registry.stats_for(name)
+                started = time.perf_counter()
+                stats.wait.append(started - enqueued_at)
+                try:
+                    result = await command()
+                    if not future.done():
+                        future.set_result(result)
+                except BaseException as e:
+                    stats.failed += 1
+                    if not future.done():
+                        future.set_exception(e)
+                    if not isinstance(e, Exception):
+                        raise  # Cancelled or interrupted: this actor stops
+                finally:
+                    stats.count += 1
+                    stats.service.append(time.perf_counter() - started)
+        finally:
+            # However the loop ended, the next submit gets a fresh actor and nobody waits on this one
+            self.registry._retire(self)
+            while not self.queue.empty():
+                _, _, future, _ = self.queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError(f"Command queue for room {self.key} stopped"))
+
+
+class RoomActors:
+    """
+    Serializes every state-changing command for a room (pick, auto-pick,
+    start, join) through that room's RoomActor, so two of them never
+    interleave and race on the same pick number. Actors are created on
+    demand and retire after idle_timeout seconds without work.
+    """
+
+    def __init__(self, idle_timeout: float = 60.0):
+        self.idle_timeout = idle_timeout
+        self._actors: Dict[str, RoomActor] = {}
+        self._stats: Dict[str, CommandStats] = {}
+
+    async def submit(self, room_id: UUID, name: str, command: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Queue command() on the room's actor and wait for its result.
+        Never call from inside another command for the same room; it would wait on itself.
+        """
+        key = str(room_id)
+        actor = self._actors.get(key)
+        if actor is None:
+            actor = self._actors[key] = RoomActor(key, self)
+
+        future = asyncio.get_running_loop().create_future()
+        actor.queue.put_nowait((name, command, future, time.perf_counter()))
+        return await future
+
+    def stats_for(self, name: str) -> CommandStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = CommandStats()
+        return stats
+
+    def stats(self) -> dict:
+        depths = [actor.queue.qsize() for actor in self._actors.values()]
+        return {
+            "rooms": len(depths),
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "commands": {name: stats.summary() for name, stats in self._stats.items()},
+        }
+
+    def _retire(self, actor: RoomActor):
+        if self._actors.get(actor.key) is actor:
+            del self._actors[actor.key]
+
+
+room_actors = RoomActors()
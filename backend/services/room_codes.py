@@ -0,0 +1,117 @@
+"""
+Room codes: four letters, allocated in constant time however many rooms exist.
+
+The n-th fresh code is code_for_index(n), where n comes from the
+room_code_seq Postgres sequence and the index is mapped through an affine
+permutation of all 26^4 codes. The permutation is a bijection, so the
+sequence never repeats a code, and consecutive rooms still get unrelated
+codes. Codes of rooms completed ROOM_CODE_GRACE_HOURS ago, or left waiting
+for ROOM_CODE_WAITING_EXPIRY_HOURS, are reclaimed into a free list by the
+CodeReclaimer and handed out again before any fresh ones.
+"""
+import asyncio
+import string
+from datetime import timedelta
+from typing import Optional, Tuple
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from db.database import async_session
+from db.queries import claim_room_code, insert_room, release_room_codes
+
+ALPHABET = string.ascii_uppercase
+CODE_LENGTH = 4
+CODE_SPACE = len(ALPHABET) ** CODE_LENGTH
+# code index = (MULTIPLIER * n + OFFSET) mod CODE_SPACE; MULTIPLIER must be coprime with 2^4 * 13^4
+MULTIPLIER = 180511
+OFFSET = 91331
+
+
+def code_for_index(index: int) -> str:
+    n = (MULTIPLIER * index + OFFSET) % CODE_SPACE
+    letters = []
+    for _ in range(CODE_LENGTH):
+        n, letter = divmod(n, len(ALPHABET))
+        letters.append(ALPHABET[letter])
+    return ''.join(reversed(letters))
+
+
+async def allocate_room_code(db: AsyncSession) -> Optional[str]:
+    """A code no open room was given by the allocator, or None if every code is in use."""
+    code, index = await claim_room_code(db)
+    if code is not None:
+        return code
+    if index is not None and index < CODE_SPACE:
+        return code_for_index(index)
+    return None
+
+
+async def create_room_with_code(db: AsyncSession, values: dict) -> Optional[Tuple[UUID, str]]:
+    """
+    Insert a draft room under a newly allocated code. Returns (room_id, code),
+    or None when no code is free. The caller commits.
+    """
+    while True:
+        code = await allocate_room_code(db)
+        if code is None:
+            return None
+        room_id = await insert_room(db, code, values)
+        if room_id is not None:
+            return room_id, code
+        # Held by a room whose random code predates the allocator; the next one will do
+
+
+class CodeReclaimer:
+    """
+    Releases the codes of finished and abandoned rooms in the background,
+    BATCH_SIZE rooms per transaction every INTERVAL seconds. Released rooms
+    keep everything but their code, so results stay reachable by room id.
+    Several API processes can run one; they skip each other's rows.
+    """
+
+    INTERVAL = 300.0
+    BATCH_SIZE = 500
+
+    def __init__(self, session_factory: async_sessionmaker = async_session):
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self.released = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                while await self.reclaim_batch() == self.BATCH_SIZE:
+                    pass
+            except Exception as e:
+                print(f"Error reclaiming room codes: {e}")
+            await asyncio.sleep(self.INTERVAL)
+
+    async def reclaim_batch(self) -> int:
+        from config import settings
+        async with self._session_factory() as db:
+            released = await release_room_codes(
+                db,
+                timedelta(hours=settings.room_code_grace_hours),
+                timedelta(hours=settings.room_code_waiting_expiry_hours),
+                self.BATCH_SIZE
+            )
+            await db.commit()
+        if released:
+            self.released += released
+            print(f"Reclaimed {released} room code(s)")
+        return released
+
+
+code_reclaimer = CodeReclaimer()
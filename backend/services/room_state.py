@@ -0,0 +1,484 @@
+import asyncio
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Set
+from uuid import UUID
+from db.database import async_session
+from db.queries import (
+    get_room, get_participants_by_room, get_pick_rows, get_queue_rows,
+    commit_pick as commit_pick_row, PickCommitStatus
+)
+from services.catalog import AvailablePlayers, catalog
+from services.pick_queue import PickQueues, QueueWriter, MAX_QUEUE_LENGTH
+from services.recommendations import RoomRecommendations
+from services.draft import build_pick_schedule
+from services.queue import enqueue_event, event_publisher
+from websocket.manager import manager
+
+
+class PickError(Exception):
+    """A pick that is not allowed; the message is sent back to the user."""
+
+
+class ParticipantSlot:
+    __slots__ = ("id", "user_name", "draft_position", "is_host")
+
+    def __init__(self, id: UUID, user_name: str, draft_position: int, is_host: bool):
+        self.id = id
+        self.user_name = user_name
+        self.draft_position = draft_position
+        self.is_host = is_host
+
+
+class PickRecord(NamedTuple):
+    pick_number: int
+    slot: int  # index into DraftRoomState.participants
+    player_id: UUID
+    picked_at: datetime
+
+
+class AppliedPick(NamedTuple):
+    pick_number: int
+    participant: ParticipantSlot
+    player_id: UUID
+    next_participant: Optional[ParticipantSlot]
+    completed: bool
+
+
+class DraftRoomState:
+    """
+    Authoritative in-memory state of an active draft room.
+
+    Picks are validated and applied here without touching the database;
+    the resulting rows are persisted afterwards by the write-behind queue.
+    pick_order[i] is the index into participants of whoever makes pick i + 1
+    (built once from the room's draft order; empty until the draft starts),
+    picks lists every pick made so far, and rosters[j] holds the player ids
+    drafted by participants[j].
+    available answers best-available queries against the player catalog,
+    recommendations keeps the top picks per position current, and queues
+    holds each participant's pre-ranked targets.
+    """
+    __slots__ = (
+        "room_id", "name", "code", "status", "current_pick", "total_rounds", "turn_time_sec",
+        "draft_order", "participants", "slot_by_name", "pick_order", "picks", "drafted", "rosters", "available",
+        "autopick_strategy", "queues", "recommendations"
+    )
+
+    def __init__(self, room, participants, pick_rows, queue_rows=()):
+        self.room_id: UUID = room.id
+        self.name: str = room.name
+        self.code: Optional[str] = room.code
+        self.status: str = room.status
+        self.current_pick: int = room.current_pick or 0
+        self.total_rounds: int = room.total_rounds
+        self.turn_time_sec: int = room.turn_time_sec
+        self.draft_order: str = room.draft_order or "snake"
+        self.autopick_strategy: Optional[str] = room.autopick_strategy
+        self.participants: List[ParticipantSlot] = [
+            ParticipantSlot(p.id, p.user_name, p.draft_position, p.is_host)
+            for p in sorted(participants, key=lambda p: p.draft_position)
+        ]
+        self.slot_by_name: Dict[str, int] = {p.user_name: i for i, p in enumerate(self.participants)}
+        self.pick_order = self._build_pick_order(room) if self.status != "waiting" else array("H")
+        self.picks: List[PickRecord] = []
+        self.drafted: Set[UUID] = set()
+        self.rosters: List[List[UUID]] = [[] for _ in self.participants]
+
+        index_by_id = {p.id: i for i, p in enumerate(self.participants)}
+        for pick_number, participant_id, player_id, picked_at in pick_rows:
+            slot = index_by_id[participant_id]
+            self.picks.append(PickRecord(pick_number, slot, player_id, picked_at))
+            self.drafted.add(player_id)
+            self.rosters[slot].append(player_id)
+        self.available = AvailablePlayers(self.drafted)
+        self.recommendations = RoomRecommendations(self.drafted)
+
+        self.queues = PickQueues(len(self.participants))
+        queued: Dict[int, List[UUID]] = {}
+        for participant_id, player_id in queue_rows:
+            if player_id not in self.drafted and participant_id in index_by_id:
+                queued.setdefault(index_by_id[participant_id], []).append(player_id)
+        for slot, player_ids in queued.items():
+            self.queues.set(slot, player_ids)
+
+    def _build_pick_order(self, room) -> array:
+        index_by_position = {p.draft_position: i for i, p in enumerate(self.participants)}
+        schedule = build_pick_schedule(
+            self.draft_order, len(self.participants), self.total_rounds, room.custom_order
+        )
+        return array("H", (index_by_position[position] for position in schedule))
+
+    @property
+    def total_picks(self) -> int:
+        return len(self.pick_order)
+
+    def drafter_for(self, pick_number: int) -> Optional[ParticipantSlot]:
+        if 1 <= pick_number <= len(self.pick_order):
+            return self.participants[self.pick_order[pick_number - 1]]
+        return None
+
+    def current_drafter(self) -> Optional[ParticipantSlot]:
+        if self.status != "drafting":
+            return None
+        return self.drafter_for(self.current_pick + 1)
+
+    def participant(self, user_name: str) -> Optional[ParticipantSlot]:
+        index = self.slot_by_name.get(user_name)
+        return self.participants[index] if index is not None else None
+
+    def check_pick(self, user_name: str, player_id: UUID) -> ParticipantSlot:
+        """Raise PickError unless user_name may draft player_id right now."""
+        participant = self.participant(user_name)
+        if participant is None:
+            raise PickError("Participant not found")
+        if self.status != "drafting":
+            raise PickError("Draft has not started")
+        if self.current_drafter() is not participant:
+            raise PickError("Not your turn")
+        if player_id in self.drafted:
+            raise PickError("Player already drafted")
+        return participant
+
+    def apply_pick(self, user_name: str, player_id: UUID) -> AppliedPick:
+        participant = self.check_pick(user_name, player_id)
+
+        pick_number = self.current_pick + 1
+        self.current_pick = pick_number
+        self.drafted.add(player_id)
+        self.available.mark(player_id)
+        self.recommendations.mark(player_id)
+        self.queues.prune(player_id)
+        slot = self.slot_by_name[user_name]
+        # picked_at is stored in UTC, like the database's now()
+        self.picks.append(PickRecord(pick_number, slot, player_id, datetime.utcnow()))
+        self.rosters[slot].append(player_id)
+
+        completed = pick_number >= self.total_picks
+        if completed:
+            self.status = "completed"
+
+        return AppliedPick(
+            pick_number,
+            participant,
+            player_id,
+            None if completed else self.drafter_for(pick_number + 1),
+            completed
+        )
+
+
+class PendingPick(NamedTuple):
+    room_id: UUID
+    participant_id: UUID
+    player_id: UUID
+    pick_number: int
+    completed: bool
+
+
+class WriteBehindQueue:
+    """
+    Persists applied picks off the pick path, in order per room.
+
+    Each room with pending writes has one drain task, and each write is a
+    single compare-and-swap statement (db.queries.commit_pick) committed
+    together with its outbox events (pick_made, and draft_complete after
+    the final pick, so the worker only hears of stored picks). A CAS
+    conflict, or a write that still fails after retries, means memory and
+    the database disagree (e.g. another process won the same pick), so the
+    rest of the room's queue is dropped and on_failed resyncs the room.
+    on_completed is called once the final pick of a draft is stored.
+    """
+
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, on_failed: Callable[[UUID], None], on_completed: Callable[[UUID], None]):
+        self._on_failed = on_failed
+        self._on_completed = on_completed
+        self._queues: Dict[str, Deque[PendingPick]] = {}
+        self._drains: Dict[str, asyncio.Task] = {}
+        self.persisted = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def has_pending(self, room_id: UUID) -> bool:
+        return str(room_id) in self._queues
+
+    def submit(self, write: PendingPick):
+        key = str(write.room_id)
+        self._queues.setdefault(key, deque()).append(write)
+        if key not in self._drains:
+            self._drains[key] = asyncio.create_task(self._drain(key))
+
+    async def flush(self, room_id: UUID):
+        """Wait until everything submitted for the room so far is persisted."""
+        drain = self._drains.get(str(room_id))
+        if drain:
+            await asyncio.shield(drain)
+
+    async def _drain(self, key: str):
+        queue = self._queues[key]
+        try:
+            while queue:
+                write = queue[0]
+                if not await self._persist(write):
+                    self.failed += len(queue)
+                    queue.clear()
+                    self._on_failed(write.room_id)
+                    break
+                queue.popleft()
+                self.persisted += 1
+                event_publisher.wake()
+                if write.completed:
+                    self._on_completed(write.room_id)
+        finally:
+            del self._queues[key]
+            del self._drains[key]
+
+    async def _persist(self, write: PendingPick) -> bool:
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            try:
+                async with async_session() as db:
+                    result = await commit_pick_row(
+                        db,
+                        write.room_id,
+                        write.participant_id,
+                        write.player_id,
+                        expected_pick=write.pick_number - 1
+                    )
+                    if result.status == PickCommitStatus.COMMITTED:
+                        enqueue_event(
+                            db, "pick_made", write.room_id,
+                            pick_number=write.pick_number,
+                            participant_id=str(write.participant_id),
+                            player_id=str(write.player_id)
+                        )
+                        if result.room_status == "completed":
+                            enqueue_event(db, "draft_complete", write.room_id)
+                    await db.commit()
+            except Exception as e:
+                print(f"Error persisting pick {write.pick_number} in room {write.room_id} (attempt {attempt}): {e}")
+                await asyncio.sleep(0.1 * 2 ** attempt)
+                continue
+
+            if result.status != PickCommitStatus.COMMITTED:
+                print(f"Pick {write.pick_number} in room {write.room_id} rejected by the database: {result.status.value}")
+                return False
+            return True
+        return False
+
+
+class RoomStateRegistry:
+    """
+    DraftRoomState per active room, rebuilt from the database on first use (cold start).
+
+    A room's state is dropped everywhere once its final pick is stored, and
+    here after idle_timeout seconds without use, connected sockets, a running
+    pick clock or pending writes. A sweep checks every idle_timeout seconds.
+    """
+
+    def __init__(self, idle_timeout: float = 60.0):
+        self.idle_timeout = idle_timeout
+        self._states: Dict[str, DraftRoomState] = {}
+        self._last_used: Dict[str, float] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.writes = WriteBehindQueue(on_failed=self._on_write_failed, on_completed=self.invalidate)
+        self.queue_writes = QueueWriter()
+        self._resyncs: Dict[str, asyncio.Task] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self.expired = 0
+
+    async def get(self, room_id: UUID) -> Optional[DraftRoomState]:
+        key = str(room_id)
+        state = self._states.get(key)
+        if state is not None:
+            self._last_used[key] = time.monotonic()
+            return state
+
+        # Concurrent callers share one load
+        loading = self._loading.get(key)
+        if loading is None:
+            loading = self._loading[key] = asyncio.ensure_future(self._load(room_id))
+            loading.add_done_callback(lambda _: self._loading.pop(key, None))
+        return await asyncio.shield(loading)
+
+    def peek(self, room_id: UUID) -> Optional[DraftRoomState]:
+        return self._states.get(str(room_id))
+
+    def evict(self, room_id: UUID):
+        self._states.pop(str(room_id), None)
+        self._last_used.pop(str(room_id), None)
+
+    def invalidate(self, room_id: UUID):
+        """Drop the cached state here and in other processes after a direct database change (join)."""
+        self.evict(room_id)
+        manager.publish_control("room_state_evict", {"room": str(room_id)})
+
+    async def reload(self, room_id: UUID) -> Optional[DraftRoomState]:
+        """Invalidate and load the state again straight away (draft start)."""
+        await self.writes.flush(room_id)
+        self.invalidate(room_id)
+        return await self.get(room_id)
+
+    def _on_write_failed(self, room_id: UUID):
+        """Clients were told about a pick the database never stored; put everyone back on the stored state."""
+        from websocket.handlers import resync_room
+
+        key = str(room_id)
+        if key not in self._resyncs:
+            task = self._resyncs[key] = asyncio.create_task(resync_room(room_id))
+            task.add_done_callback(lambda _: self._resyncs.pop(key, None))
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self._states),
+            "expired": self.expired,
+            "pending_writes": self.writes.pending,
+            "persisted": self.writes.persisted,
+            "failed_writes": self.writes.failed,
+            "pending_queue_writes": self.queue_writes.pending,
+        }
+
+    async def refresh(self, room_id: UUID) -> Optional[DraftRoomState]:
+        """
+        Replace the state with a fresh load, here and (by eviction) in other
+        processes. Raises if the database can't be read, leaving the cached
+        state as it was.
+        """
+        state = await self._read(room_id)
+        manager.publish_control("room_state_evict", {"room": str(room_id)})
+        if state is None:
+            self.evict(room_id)
+        else:
+            self._store(room_id, state)
+        return state
+
+    async def _load(self, room_id: UUID) -> Optional[DraftRoomState]:
+        state = await self._read(room_id)
+        if state is not None:
+            self._store(room_id, state)
+        return state
+
+    def _store(self, room_id: UUID, state: DraftRoomState):
+        self._states[str(room_id)] = state
+        self._last_used[str(room_id)] = time.monotonic()
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def _read(self, room_id: UUID) -> Optional[DraftRoomState]:
+        await self.writes.flush(room_id)
+        async with async_session() as db:
+            room = await get_room(db, room_id)
+            if not room:
+                return None
+            participants = await get_participants_by_room(db, room_id)
+            pick_rows = await get_pick_rows(db, room_id)
+            queue_rows = await get_queue_rows(db, room_id)
+        # Queue changes not written yet win over the stored rows
+        pending = self.queue_writes.pending_for(room_id)
+        if pending:
+            queue_rows = [row for row in queue_rows if row[0] not in pending]
+            queue_rows += [(pid, player_id) for pid, player_ids in pending.items() for player_id in player_ids]
+        return DraftRoomState(room, participants, pick_rows, queue_rows)
+
+    async def stop(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    async def _sweep(self):
+        from services.timer import timer_scheduler
+
+        while True:
+            await asyncio.sleep(self.idle_timeout)
+            cutoff = time.monotonic() - self.idle_timeout
+            for key, last_used in list(self._last_used.items()):
+                if (
+                    last_used < cutoff
+                    and not manager.active_connections.get(key)
+                    and timer_scheduler.get(key) is None
+                    and not self.writes.has_pending(key)
+                ):
+                    self.evict(key)
+                    self.expired += 1
+
+    def _apply_remote_pick(self, data: dict):
+        """Another process applied a pick; follow along or drop our copy if we are out of step."""
+        state = self._states.get(data["room"])
+        if state is None:
+            return
+        try:
+            if data["pick_number"] != state.current_pick + 1:
+                raise PickError("Out of sequence")
+            state.apply_pick(data["user_name"], UUID(data["player_id"]))
+        except PickError:
+            self.evict(data["room"])
+
+    def _apply_remote_queue(self, data: dict):
+        state = self._states.get(data["room"])
+        if state is None or data["user_name"] not in state.slot_by_name:
+            return
+        player_ids = [UUID(pid) for pid in data["player_ids"]]
+        state.queues.set(
+            state.slot_by_name[data["user_name"]],
+            [pid for pid in player_ids if pid not in state.drafted]
+        )
+
+
+room_states = RoomStateRegistry()
+
+# Keep copies held by other API processes in step
+manager.on_control("room_pick_applied", room_states._apply_remote_pick)
+manager.on_control("room_state_evict", lambda data: room_states.evict(data["room"]))
+manager.on_control("room_queue_set", room_states._apply_remote_queue)
+
+
+def commit_pick(state: DraftRoomState, user_name: str, player_id: UUID) -> AppliedPick:
+    """Apply a pick in memory and queue it for persistence. Raises PickError if it is not allowed."""
+    applied = state.apply_pick(user_name, player_id)
+    room_states.writes.submit(PendingPick(
+        state.room_id,
+        applied.participant.id,
+        player_id,
+        applied.pick_number,
+        applied.completed
+    ))
+    manager.publish_control("room_pick_applied", {
+        "room": str(state.room_id),
+        "pick_number": applied.pick_number,
+        "user_name": user_name,
+        "player_id": str(player_id),
+    })
+    return applied
+
+
+def set_pick_queue(state: DraftRoomState, user_name: str, player_ids: List[UUID]) -> List[UUID]:
+    """
+    Replace a participant's pick queue. Duplicates and already drafted
+    players are dropped; unknown players raise PickError. Returns the queue.
+    """
+    participant = state.participant(user_name)
+    if participant is None:
+        raise PickError("Participant not found")
+    if len(player_ids) > MAX_QUEUE_LENGTH:
+        raise PickError(f"Queue can hold at most {MAX_QUEUE_LENGTH} players")
+    if any(player_id not in catalog.by_id for player_id in player_ids):
+        raise PickError("Player not found")
+
+    queue = [pid for pid in dict.fromkeys(player_ids) if pid not in state.drafted]
+    state.queues.set(state.slot_by_name[user_name], queue)
+    room_states.queue_writes.submit(state.room_id, participant.id, queue)
+    manager.publish_control("room_queue_set", {
+        "room": str(state.room_id),
+        "user_name": user_name,
+        "player_ids": [str(pid) for pid in queue],
+    })
+    return queue
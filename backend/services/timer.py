@@ -1,100 +1,263 @@
 import asyncio
-from typing import Dict, Optional
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set
 from uuid import UUID
-from websocket.manager import manager
-from db.queries import get_room, get_available_players
-from db.database import async_session
-from services.draft import get_current_drafter
+from websocket.manager import manager, CAP_DEADLINE_CLOCK
+from services.autopick import choose_auto_pick
+from services.catalog import get_catalog
+from services.metrics import latency_percentiles
+from services.room_state import room_states
+from services.room_actor import room_actors
 
 
-# Track active timers: room_id -> asyncio.Task
-active_timers: Dict[str, asyncio.Task] = {}
+# Seconds-left values that deadline-clock clients still get a timer_tick for.
+# Expiry (0) is always sent; every other second only goes to legacy clients.
+RESYNC_TICKS = frozenset({10, 5})
 
 
-async def run_pick_timer(room_id: UUID, pick_number: int, seconds: int):
+class PickTimer:
+    """Clock for a single pick: counts down in one-second ticks, then expires."""
+    __slots__ = ("room_id", "pick_number", "deadline", "deadline_ms", "remaining")
+
+    def __init__(self, room_id: UUID, pick_number: int, deadline: float, seconds: int):
+        self.room_id = room_id
+        self.pick_number = pick_number
+        self.deadline = deadline  # time.monotonic() value
+        self.deadline_ms = int((time.time() + seconds) * 1000)  # wall clock, sent to clients
+        self.remaining = seconds  # next tick to send; 0 means the next event is expiry
+
+    @property
+    def next_fire_at(self) -> float:
+        return self.deadline - self.remaining
+
+    def clock_fields(self) -> dict:
+        """Absolute deadline plus the server's current time so clients can correct for clock offset."""
+        return {
+            "deadline_ms": self.deadline_ms,
+            "server_time_ms": int(time.time() * 1000)
+        }
+
+
+class TimerScheduler:
     """
-    Countdown timer for current pick.
-    Auto-picks if timer expires.
+    Process-wide pick clock.
+
+    Every room with a pick on the clock has one PickTimer, and the timers sit
+    in a heap keyed by their next monotonic fire time. A single task sleeps
+    until the earliest entry instead of every room polling the database once
+    a second. Cancelled or replaced timers are dropped lazily when they reach
+    the top of the heap.
     """
-    room_id_str = str(room_id)
-    
-    # Cancel existing timer for this room
-    if room_id_str in active_timers:
-        active_timers[room_id_str].cancel()
-    
-    for remaining in range(seconds, 0, -1):
-        # Check if pick was already made
-        async with async_session() as db:
-            room = await get_room(db, room_id)
-            if not room or room.current_pick != pick_number:
-                if room_id_str in active_timers:
-                    del active_timers[room_id_str]
-                return  # Pick was made, stop timer
-        
-        await manager.broadcast(room_id_str, {
+
+    def __init__(self, lateness_window: int = 1000):
+        self._heap: List[tuple] = []
+        self._timers: Dict[str, PickTimer] = {}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._callbacks: Set[asyncio.Task] = set()
+        self.lateness = deque(maxlen=lateness_window)
+        self.fired = 0
+        self.expired = 0
+
+    def start(self, room_id: UUID, pick_number: int, seconds: int) -> PickTimer:
+        """Put a pick on the clock, replacing any timer the room already has."""
+        self._ensure_running()
+        timer = PickTimer(room_id, pick_number, time.monotonic() + seconds, seconds)
+        self._timers[str(room_id)] = timer
+        self._push(timer)
+        return timer
+
+    def cancel(self, room_id: UUID) -> bool:
+        return self._timers.pop(str(room_id), None) is not None
+
+    def get(self, room_id: UUID) -> Optional[PickTimer]:
+        return self._timers.get(str(room_id))
+
+    @property
+    def pending(self) -> int:
+        return len(self._timers)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "fired": self.fired,
+            "expired": self.expired,
+            "lateness_ms": latency_percentiles(self.lateness),
+        }
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._heap.clear()
+        self._timers.clear()
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def _push(self, timer: PickTimer):
+        entry = (timer.next_fire_at, next(self._seq), timer)
+        heapq.heappush(self._heap, entry)
+        # Only an entry that became the new head can shorten the sleep
+        if self._heap[0] is entry:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            fire_at, _, timer = self._heap[0]
+            delay = fire_at - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            if self._timers.get(str(timer.room_id)) is not timer:
+                continue  # Cancelled by the pick path or replaced by a newer timer
+
+            self.lateness.append(-delay)
+            self.fired += 1
+
+            if timer.remaining > 0:
+                self._spawn(self._on_tick(timer, timer.remaining))
+                timer.remaining -= 1
+                self._push(timer)
+            else:
+                del self._timers[str(timer.room_id)]
+                self.expired += 1
+                self._spawn(self._on_expire(timer))
+
+    def _spawn(self, coro):
+        # Callbacks run as their own tasks so a slow broadcast or auto-pick
+        # never delays the clock for other rooms
+        task = asyncio.create_task(coro)
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
+
+    async def _on_tick(self, timer: PickTimer, seconds_left: int):
+        room_id_str = str(timer.room_id)
+        message = {
+            "event": "timer_tick",
+            "seconds_left": seconds_left,
+            **timer.clock_fields()
+        }
+        if seconds_left in RESYNC_TICKS:
+            await manager.broadcast(room_id_str, message)
+        elif manager.has_connections_without(room_id_str, CAP_DEADLINE_CLOCK):
+            await manager.broadcast(room_id_str, message, skip_capability=CAP_DEADLINE_CLOCK)
+
+    async def _on_expire(self, timer: PickTimer):
+        await manager.broadcast(str(timer.room_id), {
             "event": "timer_tick",
-            "seconds_left": remaining
+            "seconds_left": 0,
+            **timer.clock_fields()
         })
-        await asyncio.sleep(1)
-    
-    # Timer expired - auto pick best available
-    if room_id_str in active_timers:
-        del active_timers[room_id_str]
-    
-    await auto_pick(room_id)
+        try:
+            await room_actors.submit(
+                timer.room_id, "auto_pick", lambda: auto_pick(timer.room_id, timer.pick_number)
+            )
+        except Exception as e:
+            print(f"Error auto-picking for room {timer.room_id}: {e}")
 
 
-async def auto_pick(room_id: UUID):
+timer_scheduler = TimerScheduler()
+
+
+def _on_remote_cancel(data: dict):
+    """
+    Another process put pick_number on the clock. Whichever process made the
+    latest pick owns the room's clock, so drop ours unless it is for a later
+    pick. Two processes starting the same pick keep only the higher process
+    id's timer, instead of cancelling each other's and leaving none.
+    """
+    timer = timer_scheduler.get(data["room"])
+    if timer is None:
+        return
+    if (timer.pick_number, manager.process_id) > (data["pick_number"], data["process"]):
+        return
+    timer_scheduler.cancel(data["room"])
+
+
+manager.on_control("timer_cancel", _on_remote_cancel)
+
+
+async def auto_pick(room_id: UUID, pick_number: Optional[int] = None):
     """
     Auto-pick the highest rated available player for the current drafter.
+    If pick_number is given, do nothing unless that pick is still on the clock.
     """
     from websocket.handlers import handle_pick
-    
-    async with async_session() as db:
-        room = await get_room(db, room_id)
-        if not room or room.status != "drafting":
-            return
-        
-        from db.queries import get_participants_by_room, get_available_players
-        participants = await get_participants_by_room(db, room_id)
-        num_participants = len(participants)
-        
-        current_drafter_position = get_current_drafter(room.current_pick + 1, num_participants)
-        current_participant = next(
-            (p for p in participants if p.draft_position == current_drafter_position),
-            None
-        )
-        
-        if not current_participant:
-            return
-        
-        # Get best available player
-        available = await get_available_players(db, room_id)
-        if not available:
+
+    state = await room_states.get(room_id)
+    if not state or state.status != "drafting":
+        return
+
+    if pick_number is not None and state.current_pick + 1 != pick_number:
+        return  # Pick was already made
+
+    current_participant = state.current_drafter()
+    if not current_participant:
+        return
+
+    # The drafter's queued targets come first (drafted ones are already pruned)
+    player_id = state.queues.first(state.slot_by_name[current_participant.user_name])
+    if player_id is None or player_id in state.drafted:
+        # Otherwise the room's auto-pick strategy scores what is left against the drafter's roster
+        catalog = await get_catalog()
+        choice = choose_auto_pick(state, catalog)
+        if choice is None:
             return
-        
-        best_player = available[0]  # Already sorted by fantasy_pts desc
-        
-        # Use the pick handler with current session
-        await handle_pick(
-            room_id,
-            current_participant.user_name,
-            str(best_player.id),
-            db
-        )
-
-
-def cancel_timer(room_id: UUID):
-    """Cancel the active timer for a room."""
-    room_id_str = str(room_id)
-    if room_id_str in active_timers:
-        active_timers[room_id_str].cancel()
-        del active_timers[room_id_str]
-
-
-def start_timer(room_id: UUID, pick_number: int, seconds: int):
-    """Start a new timer for a room."""
-    room_id_str = str(room_id)
-    task = asyncio.create_task(run_pick_timer(room_id, pick_number, seconds))
-    active_timers[room_id_str] = task
+        player_id = catalog.ids[choice]
+
+    await handle_pick(room_id, current_participant.user_name, str(player_id))
+
+
+def cancel_timer(room_id: UUID, pick_number: int):
+    """Cancel the room's timer here, and in other processes any timer for a pick before pick_number."""
+    timer_scheduler.cancel(room_id)
+    _publish_cancel(room_id, pick_number)
+
+
+def start_timer(room_id: UUID, pick_number: int, seconds: int) -> dict:
+    """Start a new timer for a room. Returns the clock fields for the turn announcement."""
+    _publish_cancel(room_id, pick_number)
+    return timer_scheduler.start(room_id, pick_number, seconds).clock_fields()
+
+
+def _publish_cancel(room_id: UUID, pick_number: int):
+    manager.publish_control("timer_cancel", {
+        "room": str(room_id),
+        "pick_number": pick_number,
+        "process": manager.process_id
+    })
+
+
+def get_clock_fields(room_id: UUID, pick_number: int) -> dict:
+    """Clock fields for the pick currently on the clock, or {} if it has no timer."""
+    timer = timer_scheduler.get(room_id)
+    if timer is None or timer.pick_number != pick_number:
+        return {}
+    return timer.clock_fields()
+
 
+def get_timer_stats() -> dict:
+    """Pending timer count and how late timer events fire."""
+    return timer_scheduler.stats()
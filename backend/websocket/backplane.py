@@ -0,0 +1,229 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+import asyncio
+import orjson
+
+
+class Backplane(ABC):
+    """
+    Pub/sub transport that carries room events between API processes.
+
+    ConnectionManager delivers every event to its own sockets directly and
+    publishes it here once. Each other process receives it and delivers it
+    to the sockets it holds. publish() never blocks the caller.
+
+    Envelopes marked "sequence" are numbered by the backplane instead: it
+    sets "seq" to one more than the room's last number (and at least
+    "after" + 1) and delivers them to every process, the publisher
+    included, in seq order. Events from different processes then never
+    share a seq.
+    """
+
+    @abstractmethod
+    async def start(self, on_message: Callable[[dict], None]):
+        ...
+
+    @abstractmethod
+    def publish(self, envelope: dict):
+        ...
+
+    @abstractmethod
+    def has_peers(self) -> bool:
+        """Whether other processes may hold sockets for the same rooms."""
+
+    async def stop(self):
+        pass
+
+
+class InMemoryHub:
+    """Stands in for the network between InMemoryBackplanes in one process (tests, single worker)."""
+
+    def __init__(self):
+        self.members: List["InMemoryBackplane"] = []
+        # room -> last seq handed out
+        self.seqs: Dict[str, int] = {}
+
+
+class InMemoryBackplane(Backplane):
+    def __init__(self, hub: Optional[InMemoryHub] = None):
+        self.hub = hub or InMemoryHub()
+        self._on_message: Optional[Callable[[dict], None]] = None
+
+    async def start(self, on_message: Callable[[dict], None]):
+        self._on_message = on_message
+        self.hub.members.append(self)
+
+    def publish(self, envelope: dict):
+        loop = asyncio.get_running_loop()
+        sequenced = envelope.get("sequence", False)
+        if sequenced:
+            room = envelope["room"]
+            seq = self.hub.seqs[room] = max(self.hub.seqs.get(room, 0), envelope.get("after", 0)) + 1
+            envelope = {**envelope, "seq": seq}
+        for member in self.hub.members:
+            if (sequenced or member is not self) and member._on_message:
+                # Deliver on a later loop iteration, like a real transport would
+                loop.call_soon(member._on_message, envelope)
+
+    def has_peers(self) -> bool:
+        return len(self.hub.members) > 1
+
+    async def stop(self):
+        if self in self.hub.members:
+            self.hub.members.remove(self)
+        self._on_message = None
+
+
+class PostgresBackplane(Backplane):
+    """
+    LISTEN/NOTIFY on the database we already run.
+
+    NOTIFY payloads are capped at 8000 bytes, so larger envelopes (e.g.
+    draft_complete with every roster) are written to an unlogged spill
+    table and the notification only carries the row id. Notifications are
+    handled in arrival order, including spilled ones.
+
+    A sequenced envelope reaches no socket, not even ours, until its NOTIFY
+    goes through, so a failed one is retried (with backoff, holding back
+    everything queued after it) until it is sent. Other envelopes are
+    dropped after a failure.
+    """
+
+    MAX_NOTIFY_BYTES = 7900
+    SPILL_RETENTION = "1 minute"
+    MAX_RETRY_DELAY = 5.0
+    STOP_TIMEOUT = 2.0
+    # Numbers a sequenced envelope and notifies in one statement. The room's
+    # row stays locked until the statement commits, and notifications are
+    # delivered in commit order, so every listener sees seqs in order. The
+    # JSON object text in $2 gets "seq" spliced in as its first key.
+    SEQUENCED_NOTIFY = (
+        "WITH next AS ("
+        " INSERT INTO ws_room_seq (room, seq) VALUES ($3, $4 + 1)"
+        " ON CONFLICT (room) DO UPDATE SET seq = GREATEST(ws_room_seq.seq, $4) + 1"
+        " RETURNING seq)"
+        " SELECT pg_notify($1, '{\"seq\":' || next.seq || ',' || substr($2, 2)) FROM next"
+    )
+
+    def __init__(self, dsn: str, channel: str = "draft_room_events"):
+        self.dsn = dsn
+        self.channel = channel
+        self._on_message: Optional[Callable[[dict], None]] = None
+        self._listen_conn = None
+        self._pool = None
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._spilled = 0
+
+    async def start(self, on_message: Callable[[dict], None]):
+        import asyncpg
+
+        self._on_message = on_message
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=2)
+        await self._pool.execute(
+            "CREATE UNLOGGED TABLE IF NOT EXISTS ws_backplane_spill ("
+            " id BIGSERIAL PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " created_at TIMESTAMP NOT NULL DEFAULT now())"
+        )
+        # Logged, so numbers never go backwards after a crash
+        await self._pool.execute(
+            "CREATE TABLE IF NOT EXISTS ws_room_seq ("
+            " room TEXT PRIMARY KEY,"
+            " seq BIGINT NOT NULL)"
+        )
+        self._listen_conn = await asyncpg.connect(self.dsn)
+        await self._listen_conn.add_listener(self.channel, self._notified)
+        self._tasks = [
+            asyncio.create_task(self._publish_loop()),
+            asyncio.create_task(self._receive_loop()),
+        ]
+        print(f"[WS] Backplane listening on Postgres channel '{self.channel}'")
+
+    def publish(self, envelope: dict):
+        self._outbox.put_nowait(envelope)
+
+    def has_peers(self) -> bool:
+        return True
+
+    async def stop(self):
+        # Send what is already queued (e.g. our goodbye) first
+        try:
+            await asyncio.wait_for(self._outbox.join(), self.STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        for task in self._tasks:
+            task.cancel()
+        if self._listen_conn:
+            await self._listen_conn.close()
+        if self._pool:
+            await self._pool.close()
+
+    def _notified(self, connection, pid, channel, payload):
+        self._inbox.put_nowait(payload)
+
+    async def _publish_loop(self):
+        while True:
+            envelope = await self._outbox.get()
+            delay = 0.1
+            while True:
+                try:
+                    await self._send(envelope)
+                    break
+                except Exception as e:
+                    print(f"[WS] Backplane publish failed: {e}")
+                    if not envelope.get("sequence"):
+                        await asyncio.sleep(1)
+                        break
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.MAX_RETRY_DELAY)
+            self._outbox.task_done()
+
+    async def _send(self, envelope: dict):
+        data = orjson.dumps(envelope).decode()
+        if len(data.encode()) > self.MAX_NOTIFY_BYTES:
+            spill_id = await self._pool.fetchval(
+                "INSERT INTO ws_backplane_spill (payload) VALUES ($1) RETURNING id", data
+            )
+            data = orjson.dumps({"spill_id": spill_id}).decode()
+            self._spilled += 1
+            if self._spilled % 100 == 0:
+                await self._pool.execute(
+                    "DELETE FROM ws_backplane_spill"
+                    f" WHERE created_at < now() - interval '{self.SPILL_RETENTION}'"
+                )
+        if envelope.get("sequence"):
+            await self._pool.execute(
+                self.SEQUENCED_NOTIFY, self.channel, data, envelope["room"], envelope.get("after", 0)
+            )
+        else:
+            await self._pool.execute("SELECT pg_notify($1, $2)", self.channel, data)
+
+    async def _receive_loop(self):
+        while True:
+            payload = await self._inbox.get()
+            try:
+                envelope = orjson.loads(payload)
+                if "spill_id" in envelope:
+                    spilled = await self._pool.fetchval(
+                        "SELECT payload FROM ws_backplane_spill WHERE id = $1", envelope["spill_id"]
+                    )
+                    if spilled is None:
+                        continue
+                    seq = envelope.get("seq")
+                    envelope = orjson.loads(spilled)
+                    if seq is not None:
+                        envelope["seq"] = seq
+                self._on_message(envelope)
+            except Exception as e:
+                print(f"[WS] Backplane receive failed: {e}")
+
+
+def create_backplane(kind: str, database_url: str) -> Backplane:
+    if kind == "postgres":
+        # asyncpg takes a plain postgresql:// DSN, not the SQLAlchemy dialect URL
+        return PostgresBackplane(database_url.replace("postgresql+asyncpg://", "postgresql://"))
+    if kind == "memory":
+        return InMemoryBackplane()
+    raise ValueError(f"Unknown WebSocket backplane: {kind}")
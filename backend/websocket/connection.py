@@ -0,0 +1,140 @@
+from typing import Callable, Deque, Dict, FrozenSet, List, Optional
+from collections import deque
+from fastapi import WebSocket
+import asyncio
+import time
+
+
+# Close code telling the client it fell too far behind and must reconnect for a full sync
+RESYNC_REQUIRED_CLOSE_CODE = 4001
+
+
+class OutboundConnection:
+    """
+    A client socket with its own bounded outbound queue and writer task.
+
+    Producers (broadcasts, personal messages) only enqueue pre-encoded
+    payloads and never wait on the socket. Messages with a coalesce key
+    supersede any queued message with the same key, so a slow client gets
+    the latest timer_tick / participant snapshot instead of a backlog.
+    A client that stays over max_pending for longer than overflow_grace_sec
+    (or reaches the hard cap of 4x max_pending) is closed with
+    RESYNC_REQUIRED_CLOSE_CODE.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        room_id: str,
+        user_name: str,
+        capabilities: FrozenSet[str],
+        max_pending: int,
+        overflow_grace_sec: float,
+        send_timeout: float,
+        on_closed: Callable[["OutboundConnection"], None]
+    ):
+        self.websocket = websocket
+        self.room_id = room_id
+        self.user_name = user_name
+        self.capabilities = capabilities
+        self.max_pending = max_pending
+        self.overflow_grace_sec = overflow_grace_sec
+        self.send_timeout = send_timeout
+        self._on_closed = on_closed
+        # Entries are [coalesce_key, payload]; a superseded entry has its payload set to None
+        self._queue: Deque[List] = deque()
+        self._latest: Dict[str, List] = {}
+        self._pending = 0
+        self._over_limit_since: Optional[float] = None
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self.closed = False
+        self.sent = 0
+        self.coalesced = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, payload: str, coalesce_key: Optional[str] = None):
+        if self.closed:
+            return
+
+        if coalesce_key is not None:
+            superseded = self._latest.get(coalesce_key)
+            if superseded is not None and superseded[1] is not None:
+                superseded[1] = None
+                self._pending -= 1
+                self.coalesced += 1
+
+        entry = [coalesce_key, payload]
+        self._queue.append(entry)
+        if coalesce_key is not None:
+            self._latest[coalesce_key] = entry
+        self._pending += 1
+        self._ready.set()
+
+        self._check_backpressure()
+
+    def close(self, code: int = 1000, reason: str = ""):
+        """Stop the writer and close the socket in the background."""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._latest.clear()
+        self._pending = 0
+        if self._writer and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        if code != 1000:
+            asyncio.create_task(self._close_socket(code, reason))
+        self._on_closed(self)
+
+    def _check_backpressure(self):
+        if self._pending <= self.max_pending:
+            self._over_limit_since = None
+            return
+
+        now = time.monotonic()
+        if self._over_limit_since is None:
+            self._over_limit_since = now
+
+        if self._pending >= self.max_pending * 4 or now - self._over_limit_since > self.overflow_grace_sec:
+            print(f"[WS] {self.user_name} in room {self.room_id} is {self._pending} message(s) behind, requiring resync")
+            self.close(RESYNC_REQUIRED_CLOSE_CODE, "Resync required")
+
+    async def _write_loop(self):
+        while not self.closed:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            coalesce_key, payload = entry = self._queue.popleft()
+            if coalesce_key is not None and self._latest.get(coalesce_key) is entry:
+                del self._latest[coalesce_key]
+            if payload is None:
+                continue  # Superseded by a newer message with the same key
+            self._pending -= 1
+
+            try:
+                await asyncio.wait_for(self.websocket.send_text(payload), self.send_timeout)
+                self.sent += 1
+            except asyncio.TimeoutError:
+                print(f"[WS] Send to {self.user_name} timed out after {self.send_timeout}s, requiring resync")
+                self.close(RESYNC_REQUIRED_CLOSE_CODE, "Resync required")
+            except Exception as e:
+                print(f"[WS] Error sending to {self.user_name}: {e}")
+                self.close()
+
+            if self._pending <= self.max_pending:
+                self._over_limit_since = None
+
+    async def _close_socket(self, code: int, reason: str):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code, reason=reason), self.send_timeout)
+        except Exception:
+            pass
@@ -1,23 +1,24 @@
+import asyncio
 from uuid import UUID
-from sqlalchemy.ext.asyncio import AsyncSession
-from db.queries import (
-    get_room, get_participant, get_participants_by_room,
-    get_player, is_player_drafted, get_available_players, get_picks_by_room
-)
-from db.models import Pick
-from services.draft import validate_pick, get_current_drafter
-from services.timer import cancel_timer, start_timer
+from services.catalog import catalog, get_catalog
+from services.room_state import room_states, commit_pick, set_pick_queue, DraftRoomState, PickError
+from services.timer import timer_scheduler, cancel_timer, start_timer, get_clock_fields
 from websocket.manager import manager
-from api.players import PlayerResponse
+
+# Backoff between attempts to reload a room after a failed pick write
+RESYNC_RETRY_DELAY = 0.5
+MAX_RESYNC_RETRY_DELAY = 30.0
 
 
 async def handle_pick(
     room_id: UUID,
     user_name: str,
-    player_id_str: str,
-    db: AsyncSession
+    player_id_str: str
 ):
-    """Handle a pick action from a user."""
+    """
+    Handle a pick action from a user.
+    Validated and applied against the in-memory room state; the database write happens behind it.
+    """
     try:
         player_id = UUID(player_id_str)
     except ValueError:
@@ -28,8 +29,8 @@ async def handle_pick(
         )
         return
     
-    room = await get_room(db, room_id)
-    if not room:
+    state = await room_states.get(room_id)
+    if not state:
         await manager.send_to_user(
             str(room_id),
             user_name,
@@ -37,16 +38,8 @@ async def handle_pick(
         )
         return
     
-    participant = await get_participant(db, room_id, user_name)
-    if not participant:
-        await manager.send_to_user(
-            str(room_id),
-            user_name,
-            {"event": "error", "message": "Participant not found"}
-        )
-        return
-    
-    player = await get_player(db, player_id)
+    catalog = await get_catalog()
+    player = catalog.get(player_id)
     if not player:
         await manager.send_to_user(
             str(room_id),
@@ -55,57 +48,27 @@ async def handle_pick(
         )
         return
     
-    participants = await get_participants_by_room(db, room_id)
-    num_participants = len(participants)
-    
-    # Validate pick
-    async def check_drafted(rid, pid):
-        return await is_player_drafted(db, rid, pid)
-    
-    is_valid, error_msg = await validate_pick(
-        room,
-        participant,
-        player_id,
-        check_drafted,
-        num_participants
-    )
-    
-    if not is_valid:
+    # Validate and apply pick
+    try:
+        applied = commit_pick(state, user_name, player_id)
+    except PickError as e:
         await manager.send_to_user(
             str(room_id),
             user_name,
-            {"event": "error", "message": error_msg}
+            {"event": "error", "message": str(e)}
         )
         return
     
     # Cancel existing timer
-    cancel_timer(room_id)
-    
-    # Create pick
-    pick_number = room.current_pick + 1
-    pick = Pick(
-        room_id=room_id,
-        participant_id=participant.id,
-        player_id=player_id,
-        pick_number=pick_number
-    )
-    db.add(pick)
-    
-    # Update room
-    room.current_pick = pick_number
+    cancel_timer(room_id, applied.pick_number + 1)
     
     # Check if draft is complete
-    total_picks = room.total_rounds * num_participants
-    if pick_number >= total_picks:
-        room.status = "completed"
-        await db.commit()
-        
+    if applied.completed:
         # Broadcast draft complete
-        from db.queries import get_teams_by_room
-        teams = await get_teams_by_room(db, room_id)
         teams_data = {
-            user_name: [PlayerResponse.model_validate(p).model_dump(mode='json') for p in players]
-            for user_name, players in teams.items()
+            participant.user_name: [catalog.get(pid) for pid in roster]
+            for participant, roster in zip(state.participants, state.rosters)
+            if roster
         }
         
         await manager.broadcast(str(room_id), {
@@ -113,84 +76,175 @@ async def handle_pick(
             "teams": teams_data
         })
         
-        # Send to SQS queue
-        from services.queue import send_draft_complete_event
-        await send_draft_complete_event(str(room_id))
-        
         return
     
-    await db.commit()
-    
     # Determine next turn
-    next_pick_number = pick_number + 1
-    next_drafter_position = get_current_drafter(next_pick_number, num_participants)
-    next_participant = next(
-        (p for p in participants if p.draft_position == next_drafter_position),
-        None
-    )
-    next_turn = next_participant.user_name if next_participant else None
+    next_pick_number = applied.pick_number + 1
+    next_turn = applied.next_participant.user_name if applied.next_participant else None
+    
+    # Start timer for next pick so the announcement can carry its deadline
+    clock = {}
+    if next_turn:
+        clock = start_timer(room_id, next_pick_number, state.turn_time_sec)
     
     # Broadcast pick made
     await manager.broadcast(str(room_id), {
         "event": "pick_made",
         "user": user_name,
-        "player": PlayerResponse.model_validate(player).model_dump(mode='json'),
-        "pick_number": pick_number,
-        "next_turn": next_turn
+        "player": player,
+        "pick_number": applied.pick_number,
+        "next_turn": next_turn,
+        "recommendations": state.recommendations.payload(),
+        **clock
     })
+
+
+async def handle_queue_set(
+    room_id: UUID,
+    user_name: str,
+    player_id_strs: list
+):
+    """
+    Replace a user's pick queue (ranked targets auto-pick takes first).
+    Every connection of that user gets the resulting queue back.
+    """
+    try:
+        player_ids = [UUID(pid) for pid in player_id_strs]
+    except (ValueError, TypeError, AttributeError):
+        await manager.send_to_user(
+            str(room_id),
+            user_name,
+            {"event": "error", "message": "Invalid player ID"}
+        )
+        return
     
-    # Start timer for next pick
-    if next_turn:
-        start_timer(room_id, next_pick_number, room.turn_time_sec)
+    state = await room_states.get(room_id)
+    if not state:
+        await manager.send_to_user(
+            str(room_id),
+            user_name,
+            {"event": "error", "message": "Room not found"}
+        )
+        return
+    
+    await get_catalog()
+    try:
+        queue = set_pick_queue(state, user_name, player_ids)
+    except PickError as e:
+        await manager.send_to_user(
+            str(room_id),
+            user_name,
+            {"event": "error", "message": str(e)}
+        )
+        return
+    
+    await manager.send_to_user(str(room_id), user_name, queue_message(queue))
+
 
+def queue_message(queue) -> dict:
+    return {"event": "queue_updated", "player_ids": [str(pid) for pid in queue]}
 
-async def send_sync_message(room_id: UUID, db: AsyncSession):
-    """Send full sync message to a user when they connect."""
-    room = await get_room(db, room_id)
-    if not room:
-        return None
+
+def build_sync_message(state: DraftRoomState) -> dict:
+    """
+    Full sync for a connecting user, built from the room's in-memory state.
     
-    participants = await get_participants_by_room(db, room_id)
-    picks = await get_picks_by_room(db, room_id)
-    available = await get_available_players(db, room_id)
+    Synchronous on purpose: call it right after connect(), before any await,
+    so the seq, picks and available players all describe the same moment and
+    live events queue behind it. The player catalog must already be loaded.
+    """
+    room_id = str(state.room_id)
     
     participants_data = [
         {
             "id": str(p.id),
             "user_name": p.user_name,
             "draft_position": p.draft_position,
-            "is_host": p.is_host
+            "is_host": p.is_host,
+            # Live presence; later changes arrive as presence events
+            "is_connected": manager.presence.devices(room_id, p.user_name) > 0,
+            "devices": manager.presence.devices(room_id, p.user_name)
         }
-        for p in participants
+        for p in state.participants
     ]
     
     picks_data = [
         {
             "pick_number": p.pick_number,
-            "user_name": p.participant.user_name,
-            "player": PlayerResponse.model_validate(p.player).model_dump(mode='json'),
+            "user_name": state.participants[p.slot].user_name,
+            "player": catalog.get(p.player_id),
             "picked_at": p.picked_at.isoformat()
         }
-        for p in picks
+        for p in state.picks
     ]
     
-    available_data = [PlayerResponse.model_validate(p).model_dump(mode='json') for p in available]
-    
     room_data = {
-        "id": str(room.id),
-        "name": room.name,
-        "code": room.code,
-        "status": room.status,
-        "current_pick": room.current_pick,
-        "total_rounds": room.total_rounds,
-        "turn_time_sec": room.turn_time_sec
+        "id": room_id,
+        "name": state.name,
+        "code": state.code,
+        "status": state.status,
+        "current_pick": state.current_pick,
+        "total_rounds": state.total_rounds,
+        "turn_time_sec": state.turn_time_sec,
+        "draft_order": state.draft_order
     }
     
     return {
         "event": "sync",
+        "seq": manager.last_seq(room_id),
         "room": room_data,
         "participants": participants_data,
         "picks": picks_data,
-        "available_players": available_data
+        "available_players": state.available.players(),
+        "recommendations": state.recommendations.payload(),
+        **get_clock_fields(state.room_id, state.current_pick + 1)
     }
 
+
+async def resync_room(room_id: UUID):
+    """
+    Bring a room back in line with the database after a pick failed to
+    persist (a CAS conflict or repeated errors). Clients already saw that
+    pick and its timer is running, so: reload the state in every process,
+    restart the clock from the stored current_pick and send everyone a
+    fresh sync followed by the current turn.
+    
+    The write may have failed because the database is down, so the reload
+    is retried with backoff. Until it succeeds the room keeps its cached
+    state and clock; picks made meanwhile fail to persist and are replaced
+    by the reload as well.
+    """
+    delay = RESYNC_RETRY_DELAY
+    while True:
+        try:
+            state = await room_states.refresh(room_id)
+            await get_catalog()
+            break
+        except Exception as e:
+            print(f"Error reloading room {room_id} for resync, retrying in {delay}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RESYNC_RETRY_DELAY)
+    if not state:
+        timer_scheduler.cancel(room_id)
+        return
+    
+    # Replaces the room's timer, which may be for a pick that was never stored
+    clock = {}
+    if state.status == "drafting":
+        clock = start_timer(room_id, state.current_pick + 1, state.turn_time_sec)
+    else:
+        timer_scheduler.cancel(room_id)
+    
+    # Sent as a room event, so it takes its own place in the seq order
+    sync = build_sync_message(state)
+    del sync["seq"]
+    await manager.broadcast(str(room_id), sync)
+    
+    if state.status == "drafting":
+        current_participant = state.current_drafter()
+        await manager.broadcast(str(room_id), {
+            "event": "draft_started",
+            "current_pick": state.current_pick + 1,
+            "current_turn": current_participant.user_name if current_participant else None,
+            **clock
+        })
@@ -1,19 +1,136 @@
-from typing import Dict, Set
+from typing import Callable, Dict, FrozenSet, Optional, Set
+from decimal import Decimal
 from fastapi import WebSocket
-import json
 import asyncio
+import orjson
+import time
+import uuid
+from config import settings
+from websocket.connection import OutboundConnection
+from websocket.backplane import Backplane
+from websocket.presence import PresenceTracker
+from websocket.replay import ReplayBuffers
+
+
+# Client counts down locally from an absolute deadline and only needs sparse
+# resync ticks. Negotiated with ?clock=deadline on the WebSocket URL.
+CAP_DEADLINE_CLOCK = "deadline_clock"
+
+# Capabilities whose absence other processes need to know about (see has_connections_without)
+SHARED_CAPABILITIES = (CAP_DEADLINE_CLOCK,)
+
+# Events that only matter in their latest form. A queued message with the same
+# key is replaced, so slow clients skip stale ticks and participant snapshots.
+COALESCE_KEYS = {
+    "timer_tick": "timer_tick",
+    "user_joined": "participants",
+}
+
+# Ephemeral events that are neither numbered nor kept for replay
+UNSEQUENCED_EVENTS = frozenset({"timer_tick"})
+
+
+def _encode_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def with_seq(payload: str, seq: int) -> str:
+    """Add a seq to an encoded message (a JSON object) without decoding it."""
+    return f'{{"seq":{seq},{payload[1:]}'
+
+
+def encode_message(message: dict) -> str:
+    """
+    Serialize a message once for every socket it goes to.
+    orjson produces bytes; clients parse text frames, so decode once here too.
+    """
+    return orjson.dumps(message, default=_encode_default).decode()
 
 
 class ConnectionManager:
-    def __init__(self):
+    def __init__(
+        self,
+        send_timeout: float = settings.ws_send_timeout_sec,
+        max_pending: int = settings.ws_max_pending_messages,
+        overflow_grace_sec: float = settings.ws_overflow_grace_sec
+    ):
+        self.send_timeout = send_timeout
+        self.max_pending = max_pending
+        self.overflow_grace_sec = overflow_grace_sec
         # room_id -> Set[WebSocket]
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         # room_id -> user_name -> Set[WebSocket] (supports multiple connections per user)
         self.user_connections: Dict[str, Dict[str, Set[WebSocket]]] = {}
+        # WebSocket -> its outbound queue, writer task and negotiated capabilities
+        self.connections: Dict[WebSocket, OutboundConnection] = {}
+        # Fans events out to other API processes; None means this process is alone
+        self.backplane: Optional[Backplane] = None
+        self.process_id = uuid.uuid4().hex
+        # control message name -> handler, for process-local state kept in sync over the backplane
+        self.control_handlers: Dict[str, Callable[[dict], None]] = {}
+        # room_id -> capability -> process_id -> that process's connections without the capability
+        self.remote_without: Dict[str, Dict[str, Dict[str, int]]] = {}
+        # process_id -> time.monotonic() we last heard from that process
+        self.peers: Dict[str, float] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+        # Per-room seq numbers and recent events for reconnect replay
+        self.replay_buffers = ReplayBuffers(settings.ws_replay_buffer_size, settings.ws_replay_max_rooms)
+        # Online users per room, broadcast as debounced deltas
+        self.presence = PresenceTracker(self, settings.ws_presence_debounce_sec)
+        self.on_control("capabilities", self._on_remote_capabilities)
+        self.on_control("hello", self._on_hello)
+        self.on_control("heartbeat", lambda data: None)  # Only keeps the sender in self.peers
+        self.on_control("goodbye", lambda data: self._forget_process(data["process"]))
+    
+    async def start_backplane(self, backplane: Backplane):
+        self.backplane = backplane
+        await backplane.start(self._on_backplane_message)
+        # Processes already running report their connection counts back
+        self.publish_control("hello", {"process": self.process_id})
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+    
+    async def stop_backplane(self):
+        if self._heartbeat:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        if self.backplane:
+            # Others drop our counts now rather than after ws_process_ttl_sec
+            self.publish_control("goodbye", {"process": self.process_id})
+            await self.backplane.stop()
+            self.backplane = None
     
-    async def connect(self, websocket: WebSocket, room_id: str, user_name: str):
+    def on_control(self, name: str, handler: Callable[[dict], None]):
+        self.control_handlers[name] = handler
+    
+    def publish_control(self, name: str, data: dict):
+        """Tell the other API processes about a process-local state change (e.g. a cancelled timer)."""
+        if self.backplane:
+            self.backplane.publish({"origin": self.process_id, "control": name, "data": data})
+    
+    async def connect(
+        self,
+        websocket: WebSocket,
+        room_id: str,
+        user_name: str,
+        capabilities: FrozenSet[str] = frozenset()
+    ):
         await websocket.accept()
         
+        connection = OutboundConnection(
+            websocket,
+            room_id,
+            user_name,
+            capabilities,
+            max_pending=self.max_pending,
+            overflow_grace_sec=self.overflow_grace_sec,
+            send_timeout=self.send_timeout,
+            on_closed=self._on_connection_closed
+        )
+        self.connections[websocket] = connection
+        connection.start()
+        
         if room_id not in self.active_connections:
             self.active_connections[room_id] = set()
             self.user_connections[room_id] = {}
@@ -29,71 +146,232 @@ class ConnectionManager:
         print(f"[WS] {user_name} connected to room {room_id}")
         print(f"[WS] Room {room_id} now has {len(self.active_connections[room_id])} connection(s)")
         print(f"[WS] User {user_name} has {len(self.user_connections[room_id][user_name])} device(s) connected")
+        self.presence.changed(room_id, user_name)
+        if not capabilities.issuperset(SHARED_CAPABILITIES):
+            self._report_capabilities(room_id)
     
     def disconnect(self, websocket: WebSocket, room_id: str, user_name: str):
-        if room_id in self.active_connections:
-            self.active_connections[room_id].discard(websocket)
+        connection = self.connections.get(websocket)
+        if connection:
+            connection.close()
+        self._remove(websocket, room_id, user_name)
+    
+    def replay(self, websocket: WebSocket, room_id: str, last_seq: int) -> bool:
+        """
+        Queue the room events a reconnecting client missed since last_seq.
+        Returns False if they have aged out of the buffer and a full sync is needed.
+        Call right after connect(), before any await, so live events queue behind the replay.
+        """
+        missed = self.replay_buffers.since(room_id, last_seq)
+        connection = self.connections.get(websocket)
+        if missed is None or connection is None:
+            return False
         
-        if room_id in self.user_connections:
-            if user_name in self.user_connections[room_id]:
-                self.user_connections[room_id][user_name].discard(websocket)
-                # Clean up empty sets
-                if len(self.user_connections[room_id][user_name]) == 0:
-                    del self.user_connections[room_id][user_name]
+        for payload, coalesce_key in missed:
+            connection.enqueue(payload, coalesce_key)
+        print(f"[WS] Replayed {len(missed)} event(s) to {connection.user_name} in room {room_id} after seq {last_seq}")
+        return True
+    
+    def last_seq(self, room_id: str) -> int:
+        return self.replay_buffers.last_seq(room_id)
     
     async def send_personal_message(self, message: dict, websocket: WebSocket):
-        try:
-            await websocket.send_text(json.dumps(message))
-        except Exception as e:
-            print(f"Error sending personal message: {e}")
+        connection = self.connections.get(websocket)
+        if connection:
+            connection.enqueue(encode_message(message), COALESCE_KEYS.get(message.get("event")))
+        else:
+            print("Error sending personal message: connection is not registered")
     
-    async def broadcast(self, room_id: str, message: dict):
-        """Broadcast message to all connections in a room."""
-        if room_id not in self.active_connections:
-            print(f"[WS] Broadcast to room {room_id}: No active connections")
+    def has_connections_without(self, room_id: str, capability: str) -> bool:
+        """Whether any connection to the room, in this process or another, lacks the capability."""
+        if any(self.remote_without.get(room_id, {}).get(capability, {}).values()):
+            return True
+        return self._count_without(room_id, capability) > 0
+    
+    def _count_without(self, room_id: str, capability: str) -> int:
+        return sum(
+            1 for ws in self.active_connections.get(room_id, ())
+            if ws in self.connections and capability not in self.connections[ws].capabilities
+        )
+    
+    def _report_capabilities(self, room_id: str):
+        """Tell the other processes how many of our connections to the room lack each shared capability."""
+        self.publish_control("capabilities", {
+            "process": self.process_id,
+            "room": room_id,
+            "without": {c: self._count_without(room_id, c) for c in SHARED_CAPABILITIES},
+        })
+    
+    def _on_remote_capabilities(self, data: dict):
+        rooms = self.remote_without.setdefault(data["room"], {})
+        for capability, count in data["without"].items():
+            processes = rooms.setdefault(capability, {})
+            if count:
+                processes[data["process"]] = count
+            else:
+                processes.pop(data["process"], None)
+                if not processes:
+                    del rooms[capability]
+        if not rooms:
+            del self.remote_without[data["room"]]
+    
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(settings.ws_heartbeat_sec)
+            self.publish_control("heartbeat", {"process": self.process_id})
+            cutoff = time.monotonic() - settings.ws_process_ttl_sec
+            for process_id, last_heard in list(self.peers.items()):
+                if last_heard < cutoff:
+                    print(f"[WS] No word from process {process_id} for {settings.ws_process_ttl_sec}s, dropping its connections")
+                    self._forget_process(process_id)
+    
+    def _forget_process(self, process_id: str):
+        """Another process stopped or went silent: its sockets no longer count."""
+        self.peers.pop(process_id, None)
+        for room_id in list(self.remote_without):
+            rooms = self.remote_without[room_id]
+            for capability in list(rooms):
+                rooms[capability].pop(process_id, None)
+                if not rooms[capability]:
+                    del rooms[capability]
+            if not rooms:
+                del self.remote_without[room_id]
+        # It can't announce its users going offline; the lowest remaining process id does
+        announce = all(self.process_id < peer for peer in self.peers)
+        self.presence.forget_process(process_id, announce)
+    
+    def _on_hello(self, data: dict):
+        for room_id in list(self.active_connections):
+            if self.active_connections[room_id]:
+                self._report_capabilities(room_id)
+        self.presence.report_all()
+    
+    async def broadcast(self, room_id: str, message: dict, skip_capability: Optional[str] = None):
+        """
+        Broadcast message to all connections in a room, in this process and (via the backplane) all others.
+        Connections that negotiated skip_capability don't need this message and are skipped.
+        Only enqueues: delivery happens on each connection's writer task, so this never waits on a socket.
+        
+        Room events carry a per-room seq. With other processes around, the
+        backplane numbers them (one counter per room for all processes) and
+        they reach this process's sockets when they come back from it.
+        """
+        connection_count = len(self.active_connections.get(room_id, ()))
+        print(f"[WS] Broadcasting '{message.get('event', 'unknown')}' to room {room_id} ({connection_count} local connection(s))")
+        
+        event = message.get("event")
+        envelope = {
+            "room": room_id,
+            "coalesce": COALESCE_KEYS.get(event),
+            "skip": skip_capability,
+        }
+        if event not in UNSEQUENCED_EVENTS and self.backplane and self.backplane.has_peers():
+            envelope["payload"] = encode_message(message)
+            envelope["sequence"] = True
+            # Never below what this process has already numbered or seen
+            envelope["after"] = self.replay_buffers.last_seq(room_id)
+            self._publish(envelope)
             return
+        if event not in UNSEQUENCED_EVENTS:
+            seq = self.replay_buffers.next_seq(room_id)
+            message = {**message, "seq": seq}
+            envelope["seq"] = seq
+        envelope["payload"] = encode_message(message)
+        
+        self._record(envelope)
+        self._deliver(envelope)
+        self._publish(envelope)
+    
+    async def send_to_user(self, room_id: str, user_name: str, message: dict):
+        """Send message to all connections for a specific user (all their devices, in any process)."""
+        envelope = {
+            "room": room_id,
+            "user": user_name,
+            "payload": encode_message(message),
+            "coalesce": COALESCE_KEYS.get(message.get("event")),
+        }
+        self._deliver(envelope)
+        self._publish(envelope)
+    
+    def _publish(self, envelope: dict):
+        if self.backplane:
+            self.backplane.publish({**envelope, "origin": self.process_id})
+    
+    def _deliver(self, envelope: dict):
+        """Enqueue an encoded event on the matching sockets held by this process."""
+        room_id = envelope["room"]
+        user_name = envelope.get("user")
+        if user_name is not None:
+            websockets = self.user_connections.get(room_id, {}).get(user_name, ())
+        else:
+            websockets = self.active_connections.get(room_id, ())
         
-        connection_count = len(self.active_connections[room_id])
-        print(f"[WS] Broadcasting '{message.get('event', 'unknown')}' to room {room_id} ({connection_count} connection(s))")
+        skip_capability = envelope.get("skip")
+        for websocket in list(websockets):
+            connection = self.connections.get(websocket)
+            if connection is None:
+                continue
+            if skip_capability and skip_capability in connection.capabilities:
+                continue
+            connection.enqueue(envelope["payload"], envelope.get("coalesce"))
+    
+    def _on_backplane_message(self, envelope: dict):
+        if envelope.get("sequence"):
+            # Numbered by the backplane; comes back to the publisher too
+            envelope = {**envelope, "payload": with_seq(envelope["payload"], envelope["seq"])}
+        elif envelope.get("origin") == self.process_id:
+            return  # Already delivered locally when it was published
         
-        disconnected = set()
-        for connection in self.active_connections[room_id]:
-            try:
-                await connection.send_text(json.dumps(message))
-            except Exception as e:
-                print(f"[WS] Error broadcasting to connection: {e}")
-                disconnected.add(connection)
+        origin = envelope.get("origin")
+        if origin and origin != self.process_id:
+            if origin not in self.peers and envelope.get("control") == "heartbeat":
+                # Possibly a process we had given up on, still holding sockets; have everyone report again
+                self.publish_control("hello", {"process": self.process_id})
+            self.peers[origin] = time.monotonic()
         
-        # Clean up disconnected connections
-        for connection in disconnected:
-            self.active_connections[room_id].discard(connection)
-            # Also remove from user_connections
-            for user_name, connections in self.user_connections.get(room_id, {}).items():
-                connections.discard(connection)
+        if "control" in envelope:
+            handler = self.control_handlers.get(envelope["control"])
+            if handler:
+                handler(envelope["data"])
+            return
         
-        if disconnected:
-            print(f"[WS] Cleaned up {len(disconnected)} disconnected connection(s)")
+        self._record(envelope)
+        self._deliver(envelope)
     
-    async def send_to_user(self, room_id: str, user_name: str, message: dict):
-        """Send message to all connections for a specific user (all their devices)."""
+    def _record(self, envelope: dict):
+        if "seq" in envelope:
+            self.replay_buffers.record(envelope["room"], envelope["seq"], envelope["payload"], envelope.get("coalesce"))
+    
+    def queue_stats(self) -> dict:
+        pending = [c.pending for c in self.connections.values()]
+        return {
+            "connections": len(pending),
+            "pending_messages": sum(pending),
+            "max_pending": max(pending, default=0),
+            "coalesced": sum(c.coalesced for c in self.connections.values()),
+        }
+    
+    def _on_connection_closed(self, connection: OutboundConnection):
+        # The writer gave up on this socket (error, timeout or backpressure)
+        self._remove(connection.websocket, connection.room_id, connection.user_name)
+    
+    def _remove(self, websocket: WebSocket, room_id: str, user_name: str):
+        connection = self.connections.pop(websocket, None)
+        
+        if room_id in self.active_connections:
+            self.active_connections[room_id].discard(websocket)
+        
+        if connection and not connection.capabilities.issuperset(SHARED_CAPABILITIES):
+            self._report_capabilities(room_id)
+        
         if room_id in self.user_connections:
-            if user_name in self.user_connections[room_id]:
-                disconnected = set()
-                for connection in self.user_connections[room_id][user_name]:
-                    try:
-                        await connection.send_text(json.dumps(message))
-                    except Exception as e:
-                        print(f"Error sending to user {user_name}: {e}")
-                        disconnected.add(connection)
-                
-                # Clean up disconnected connections
-                for connection in disconnected:
-                    self.user_connections[room_id][user_name].discard(connection)
-                    self.active_connections[room_id].discard(connection)
-                
+            # Removal can run twice for a socket (disconnect, then the writer closing)
+            if websocket in self.user_connections[room_id].get(user_name, ()):
+                self.user_connections[room_id][user_name].discard(websocket)
                 # Clean up empty sets
                 if len(self.user_connections[room_id][user_name]) == 0:
                     del self.user_connections[room_id][user_name]
+                self.presence.changed(room_id, user_name)
 
 
 manager = ConnectionManager()
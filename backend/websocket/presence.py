@@ -0,0 +1,177 @@
+from typing import Dict, Optional, Set, Tuple
+import asyncio
+from db.database import async_session
+from db.queries import set_participants_connected
+
+
+class PresenceTracker:
+    """
+    Who is online in each room, and on how many devices, from the sockets
+    the ConnectionManager holds. With several API processes, each one
+    reports its socket counts to the others over the backplane. Nothing is
+    read from the database.
+
+    Counts from a process that says goodbye, or sends no heartbeat for
+    ws_process_ttl_sec, are dropped, so its users can go offline.
+
+    A connect or disconnect marks the user; debounce_sec later the room gets
+    one `presence` event listing only the marked users whose online state or
+    device count actually changed, so a flaky connection that drops and comes
+    back within the window sends nothing. Online state changes are written
+    to participants.is_connected in batches, every PERSIST_INTERVAL seconds.
+    """
+
+    PERSIST_INTERVAL = 2.0
+
+    def __init__(self, manager, debounce_sec: float):
+        self._manager = manager
+        self.debounce_sec = debounce_sec
+        # room_id -> user_name -> process_id -> devices connected to that process
+        self._remote: Dict[str, Dict[str, Dict[str, int]]] = {}
+        # room_id -> user_name -> devices as last broadcast (online users only)
+        self._sent: Dict[str, Dict[str, int]] = {}
+        # room_id -> users changed since the last broadcast, and its pending flush
+        self._dirty: Dict[str, Set[str]] = {}
+        self._flushes: Dict[str, asyncio.Task] = {}
+        # (room_id, user_name) -> is_connected, waiting to be written
+        self._to_persist: Dict[Tuple[str, str], bool] = {}
+        self._writer: Optional[asyncio.Task] = None
+        self.broadcasts = 0
+        self.suppressed = 0
+        self.persisted = 0
+        manager.on_control("presence", self._on_remote)
+
+    def devices(self, room_id: str, user_name: str) -> int:
+        local = len(self._manager.user_connections.get(room_id, {}).get(user_name, ()))
+        return local + sum(self._remote.get(room_id, {}).get(user_name, {}).values())
+
+    def changed(self, room_id: str, user_name: str):
+        """Called by the ConnectionManager whenever a user's sockets in this process change."""
+        self._report(room_id, user_name)
+        self._mark(room_id, user_name)
+
+    def forget_process(self, process_id: str, announce: bool):
+        """
+        Drop the device counts of a process that stopped or went silent. If
+        announce, this process broadcasts the resulting changes; otherwise it
+        only keeps its view of what clients saw in step.
+        """
+        for room_id in list(self._remote):
+            users = self._remote[room_id]
+            for user_name in list(users):
+                if users[user_name].pop(process_id, None) is None:
+                    continue
+                if not users[user_name]:
+                    del users[user_name]
+                if announce:
+                    self._mark(room_id, user_name)
+                else:
+                    self._record(room_id, user_name, self.devices(room_id, user_name))
+            if not users:
+                del self._remote[room_id]
+
+    def _mark(self, room_id: str, user_name: str):
+        self._dirty.setdefault(room_id, set()).add(user_name)
+        if room_id not in self._flushes:
+            self._flushes[room_id] = asyncio.create_task(self._flush_later(room_id))
+
+    def report_all(self):
+        """Send our device counts to a process that has just started."""
+        for room_id, users in self._manager.user_connections.items():
+            for user_name in users:
+                self._report(room_id, user_name)
+
+    def _report(self, room_id: str, user_name: str):
+        self._manager.publish_control("presence", {
+            "process": self._manager.process_id,
+            "room": room_id,
+            "user": user_name,
+            "devices": len(self._manager.user_connections.get(room_id, {}).get(user_name, ()))
+        })
+
+    def stats(self) -> dict:
+        return {
+            "online_users": sum(len(users) for users in self._sent.values()),
+            "broadcasts": self.broadcasts,
+            "suppressed": self.suppressed,
+            "pending_writes": len(self._to_persist),
+            "persisted": self.persisted,
+        }
+
+    async def stop(self):
+        """Write any pending is_connected changes now."""
+        if self._writer:
+            self._writer.cancel()
+            self._writer = None
+        await self._write()
+
+    def _on_remote(self, data: dict):
+        room_id, user_name = data["room"], data["user"]
+        processes = self._remote.setdefault(room_id, {}).setdefault(user_name, {})
+        if data["devices"]:
+            processes[data["process"]] = data["devices"]
+        else:
+            processes.pop(data["process"], None)
+            if not processes:
+                del self._remote[room_id][user_name]
+                if not self._remote[room_id]:
+                    del self._remote[room_id]
+        # The reporting process broadcasts the change; keep our view of what clients saw in step
+        self._record(room_id, user_name, self.devices(room_id, user_name))
+
+    async def _flush_later(self, room_id: str):
+        await asyncio.sleep(self.debounce_sec)
+        del self._flushes[room_id]
+        users = self._dirty.pop(room_id, set())
+
+        changes = []
+        for user_name in sorted(users):
+            devices = self.devices(room_id, user_name)
+            before = self._sent.get(room_id, {}).get(user_name, 0)
+            if devices == before:
+                self.suppressed += 1
+                continue
+            if (devices > 0) != (before > 0):
+                self._persist(room_id, user_name, devices > 0)
+            self._record(room_id, user_name, devices)
+            changes.append({"user": user_name, "online": devices > 0, "devices": devices})
+
+        if changes:
+            self.broadcasts += 1
+            await self._manager.broadcast(room_id, {"event": "presence", "changes": changes})
+
+    def _record(self, room_id: str, user_name: str, devices: int):
+        if devices:
+            self._sent.setdefault(room_id, {})[user_name] = devices
+        elif room_id in self._sent:
+            self._sent[room_id].pop(user_name, None)
+            if not self._sent[room_id]:
+                del self._sent[room_id]
+
+    def _persist(self, room_id: str, user_name: str, online: bool):
+        self._to_persist[(room_id, user_name)] = online
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_later())
+
+    async def _write_later(self):
+        await asyncio.sleep(self.PERSIST_INTERVAL)
+        self._writer = None
+        await self._write()
+
+    async def _write(self):
+        batch, self._to_persist = self._to_persist, {}
+        if not batch:
+            return
+        try:
+            async with async_session() as db:
+                await set_participants_connected(db, batch)
+                await db.commit()
+        except Exception as e:
+            print(f"Error persisting presence: {e}")
+            # Retry with the next batch, unless a newer value has come in meanwhile
+            for key, online in batch.items():
+                self._to_persist.setdefault(key, online)
+            if self._writer is None:
+                self._writer = asyncio.create_task(self._write_later())
+            return
+        self.persisted += len(batch)
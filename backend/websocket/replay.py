@@ -0,0 +1,71 @@
+from typing import Deque, List, Optional, Tuple
+from collections import OrderedDict, deque
+
+
+class RoomEventLog:
+    """Sequence counter plus a ring buffer of a room's most recent encoded events."""
+    __slots__ = ("last_seq", "events")
+
+    def __init__(self, size: int):
+        self.last_seq = 0
+        # (seq, payload, coalesce_key)
+        self.events: Deque[Tuple[int, str, Optional[str]]] = deque(maxlen=size)
+
+
+class ReplayBuffers:
+    """
+    Per-room event sequence numbers and replay buffers for reconnecting clients.
+
+    A client that reconnects with the last seq it saw gets just the events
+    it missed, as long as they are still in the ring buffer; otherwise the
+    caller falls back to a full sync. Only the most recently active
+    max_rooms rooms keep a buffer.
+
+    A process on its own numbers its events here; with several API
+    processes the backplane numbers them and every process records the
+    numbers it receives, in order.
+    """
+
+    def __init__(self, size: int, max_rooms: int):
+        self.size = size
+        self.max_rooms = max_rooms
+        self._rooms: "OrderedDict[str, RoomEventLog]" = OrderedDict()
+
+    def next_seq(self, room_id: str) -> int:
+        return self._log(room_id).last_seq + 1
+
+    def last_seq(self, room_id: str) -> int:
+        log = self._rooms.get(room_id)
+        return log.last_seq if log else 0
+
+    def record(self, room_id: str, seq: int, payload: str, coalesce_key: Optional[str] = None):
+        log = self._log(room_id)
+        log.last_seq = max(log.last_seq, seq)
+        log.events.append((seq, payload, coalesce_key))
+
+    def since(self, room_id: str, last_seq: int) -> Optional[List[Tuple[str, Optional[str]]]]:
+        """
+        Events after last_seq as (payload, coalesce_key), or None if the client
+        needs a full sync (gap aged out, or the client is ahead of this log).
+        """
+        log = self._rooms.get(room_id)
+        if log is None or last_seq > log.last_seq:
+            return None
+        if last_seq == log.last_seq:
+            return []
+        if not log.events or log.events[0][0] > last_seq + 1:
+            return None
+        return [(payload, coalesce_key) for seq, payload, coalesce_key in log.events if seq > last_seq]
+
+    def drop(self, room_id: str):
+        self._rooms.pop(room_id, None)
+
+    def _log(self, room_id: str) -> RoomEventLog:
+        log = self._rooms.get(room_id)
+        if log is None:
+            log = self._rooms[room_id] = RoomEventLog(self.size)
+            if len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+        else:
+            self._rooms.move_to_end(room_id)
+        return log
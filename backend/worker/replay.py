@@ -0,0 +1,70 @@
+"""
+Move dead-lettered draft events back onto the event queue.
+
+Replayed events start over with a fresh delivery count. Events that were
+handled after all are skipped by the worker's idempotency check.
+
+With EVENT_QUEUE=memory the queue lives inside the API process, so events
+are put back in the outbox instead and the API's publisher sends them on.
+
+Run from backend/:  python -m worker.replay [--limit N]
+"""
+import argparse
+import asyncio
+import json
+from typing import List, Optional
+from uuid import UUID
+from config import settings
+from db.database import async_session
+from db.queries import add_outbox_event
+from services.event_queue import get_dead_letter_queue, get_event_queue
+
+BATCH_SIZE = 10
+
+
+async def replay(limit: Optional[int] = None) -> int:
+    """Move up to limit events (all by default). Returns how many were moved."""
+    source = get_dead_letter_queue()
+    send = send_to_outbox if settings.event_queue == "memory" else get_event_queue().send_batch
+    moved = 0
+    while limit is None or moved < limit:
+        size = BATCH_SIZE if limit is None else min(BATCH_SIZE, limit - moved)
+        messages = await source.receive(size, wait_time=1, visibility_timeout=60)
+        if not messages:
+            break
+
+        failed = set(await send([message.body for message in messages]))
+        await source.delete_batch([m.receipt for i, m in enumerate(messages) if i not in failed])
+        moved += len(messages) - len(failed)
+        if failed:
+            # They reappear on the dead-letter queue once their visibility timeout ends
+            print(f"{len(failed)} event(s) could not be sent back; stopping")
+            break
+    return moved
+
+
+async def send_to_outbox(bodies: List[str]) -> List[int]:
+    """Stage events in the outbox under their own event_id. Returns the indexes that failed (all or none)."""
+    try:
+        async with async_session() as db:
+            for body in bodies:
+                payload = json.loads(body)
+                add_outbox_event(db, UUID(payload["event_id"]), payload["event"], payload)
+            await db.commit()
+    except Exception as e:
+        print(f"Error writing events to the outbox: {e}")
+        return list(range(len(bodies)))
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay dead-lettered draft events")
+    parser.add_argument("--limit", type=int, default=None, help="Events to move (default: all)")
+    args = parser.parse_args()
+
+    moved = asyncio.run(replay(args.limit))
+    print(f"Replayed {moved} event(s)")
+
+
+if __name__ == "__main__":
+    main()
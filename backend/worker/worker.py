@@ -1,100 +1,284 @@
-import boto3
+import asyncio
 import json
 import time
-import sys
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+from uuid import UUID
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from config import settings
 from db.database import async_session
-from db.queries import get_room, get_teams_by_room
+from db.queries import get_graded_pick_rows, replace_draft_results, is_event_processed, mark_event_processed
+from services.event_queue import EventQueue, QueuedMessage, get_event_queue, get_dead_letter_queue
+from services.grading import GradedPick, grade_teams
 
 
-def get_sqs_client():
-    return boto3.client(
-        'sqs',
-        endpoint_url=settings.sqs_endpoint,
-        region_name='us-east-1',
-        aws_access_key_id='test',
-        aws_secret_access_key='test'
-    )
+async def process_draft_results(db: AsyncSession, room_id: str):
+    """Grade every team of a completed draft and stage the results. The caller commits."""
+    print(f"Processing draft results for room {room_id}")
 
+    rows = await get_graded_pick_rows(db, UUID(room_id))
+    if not rows:
+        print(f"Room {room_id} has no picks, nothing to grade")
+        return
 
-def process_draft_results(room_id: str):
-    """Process draft results - calculate team scores, generate grades, etc."""
-    print(f"Processing draft results for room {room_id}")
-    
-    # This is a placeholder - in a real app, you'd:
-    # 1. Calculate total fantasy points for each team
-    # 2. Generate draft grades
-    # 3. Send notifications
-    # 4. Store results in database
-    
-    # For demo, just log the teams
-    import asyncio
-    async def get_teams():
-        async with async_session() as db:
-            from uuid import UUID
-            room = await get_room(db, UUID(room_id))
-            if room:
-                teams = await get_teams_by_room(db, UUID(room_id))
-                print(f"Room {room_id} - Teams:")
-                for user_name, players in teams.items():
-                    total_pts = sum(float(p.fantasy_pts) for p in players)
-                    print(f"  {user_name}: {len(players)} players, {total_pts:.1f} total fantasy points")
-    
-    asyncio.run(get_teams())
+    picks = [GradedPick(*row) for row in rows]
+    # Every team of a completed draft has picks; order teams by their first one
+    participant_ids = list(dict.fromkeys(pick.participant_id for pick in picks))
+    grades = grade_teams(participant_ids, picks)
 
+    await replace_draft_results(db, UUID(room_id), [
+        {
+            "participant_id": g.participant_id,
+            "projected_points": g.projected_points,
+            "total_points": g.total_points,
+            "value_over_adp": g.value_over_adp,
+            "positional_strength": g.positional_strength,
+            "score": g.score,
+            "grade": g.grade,
+            "rank": g.rank,
+        }
+        for g in grades
+    ])
 
-def process_messages():
-    """Poll SQS queue and process messages."""
-    sqs = get_sqs_client()
-    
-    print(f"Worker started, polling queue: {settings.sqs_queue_url}")
-    
-    while True:
+    print(f"Room {room_id} - graded {len(grades)} teams: " + ", ".join(
+        f"#{g.rank} {g.grade} ({g.projected_points:.1f} pts)" for g in sorted(grades, key=lambda g: g.rank)
+    ))
+
+
+# Events with work to do; anything else is acknowledged and dropped
+EVENT_HANDLERS: Dict[str, Callable[[AsyncSession, str], Awaitable[None]]] = {
+    'draft_complete': process_draft_results,
+}
+
+
+def idempotency_key(body: dict) -> str:
+    """The outbox event id, which every delivery of an event shares."""
+    if body.get('event_id'):
+        return body['event_id']
+    # Published before events carried ids
+    return f"{body.get('event')}:{body.get('room_id')}:{body.get('timestamp')}"
+
+
+async def handle_event(body: dict, session_factory: async_sessionmaker = async_session) -> bool:
+    """
+    Handle an event at most once: its idempotency key is committed in the
+    same transaction as its results. Returns False for a duplicate.
+    """
+    handler = EVENT_HANDLERS.get(body.get('event'))
+    if handler is None or not body.get('room_id'):
+        return True
+
+    key = idempotency_key(body)
+    async with session_factory() as db:
+        if await is_event_processed(db, key):
+            return False
+        await handler(db, body['room_id'])
+        mark_event_processed(db, key, body['event'])
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another delivery of the same event committed first
+            return False
+    return True
+
+
+class Worker:
+    """
+    Consumes draft events on one long-lived event loop.
+
+    Messages are long-polled in batches of up to 10 and handled
+    concurrently, at most `concurrency` at a time; a batch is only received
+    when there is room for it. While a message is being handled its
+    visibility timeout is extended, so slow jobs are not redelivered to
+    another worker. Handled messages are deleted in batches.
+
+    A failed message is left on the queue and comes back after
+    retry_delay * 2 ** (deliveries - 1) seconds; one that fails
+    max_receives times is moved to the dead-letter queue (replay it with
+    python -m worker.replay). Each message gets at most job_timeout
+    seconds, so a heavy or broken room only ever holds one slot for a
+    while and never the whole worker.
+
+    The queue is services/event_queue's (EVENT_QUEUE) unless one is passed,
+    so with the in-memory queue the worker must run in the API process
+    (EMBEDDED_WORKER).
+    """
+
+    RECEIVE_BATCH = 10
+    WAIT_TIME_SEC = 10
+    # Deletes wait at most this long for a full batch
+    DELETE_DELAY = 0.5
+    STATS_INTERVAL = 30.0
+    RATE_WINDOW = 60.0
+
+    def __init__(
+        self,
+        concurrency: int,
+        visibility_timeout: int,
+        queue: Optional[EventQueue] = None,
+        session_factory: async_sessionmaker = async_session,
+        dead_letter_queue: Optional[EventQueue] = None
+    ):
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.max_receives = settings.worker_max_receives
+        self.retry_delay = settings.worker_retry_delay_sec
+        self.job_timeout = settings.worker_job_timeout_sec
+        self._queue = queue or get_event_queue()
+        self._dead_letter_queue = dead_letter_queue
+        self._session_factory = session_factory
+        self._slots = asyncio.Semaphore(concurrency)
+        self._in_flight = 0
+        self._to_delete: List[str] = []
+        self._delete_task: Optional[asyncio.Task] = None
+        self._tasks = set()
+        self.processed = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.dead_lettered = 0
+        # Completion times, for the messages per second rate
+        self._completed: Deque[float] = deque(maxlen=10000)
+        self._started = time.monotonic()
+
+    async def run(self):
+        print(f"Worker started, polling {type(self._queue).__name__} (concurrency {self.concurrency})")
+        reporter = asyncio.create_task(self._report())
         try:
-            response = sqs.receive_message(
-                QueueUrl=settings.sqs_queue_url,
-                MaxNumberOfMessages=1,
-                WaitTimeSeconds=10
-            )
-            
-            messages = response.get('Messages', [])
-            
-            for message in messages:
+            while True:
+                # Wait for a free slot, then ask for as many messages as there is room for
+                await self._slots.acquire()
+                self._slots.release()
+                free = self.concurrency - self._in_flight
                 try:
-                    body = json.loads(message['Body'])
-                    event = body.get('event')
-                    
-                    if event == 'draft_complete':
-                        room_id = body.get('room_id')
-                        if room_id:
-                            process_draft_results(room_id)
-                    
-                    # Delete message after processing
-                    sqs.delete_message(
-                        QueueUrl=settings.sqs_queue_url,
-                        ReceiptHandle=message['ReceiptHandle']
+                    messages = await self._queue.receive(
+                        min(self.RECEIVE_BATCH, free), self.WAIT_TIME_SEC, self.visibility_timeout
                     )
-                    print(f"Processed and deleted message: {event}")
-                    
                 except Exception as e:
-                    print(f"Error processing message: {e}")
-                    # Delete message even on error to avoid infinite retries
-                    try:
-                        sqs.delete_message(
-                            QueueUrl=settings.sqs_queue_url,
-                            ReceiptHandle=message['ReceiptHandle']
-                        )
-                    except:
-                        pass
-        
-        except KeyboardInterrupt:
-            print("Worker shutting down...")
-            sys.exit(0)
+                    print(f"Error in message loop: {e}")
+                    await asyncio.sleep(5)
+                    continue
+
+                for message in messages:
+                    await self._slots.acquire()
+                    self._in_flight += 1
+                    task = asyncio.create_task(self._handle(message))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+        finally:
+            reporter.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            await self._flush_deletes()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        # Over the last minute, or since starting if that was more recent
+        window = max(1e-3, min(self.RATE_WINDOW, now - self._started))
+        recent = sum(1 for t in self._completed if now - t <= window)
+        return {
+            "processed": self.processed,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "dead_lettered": self.dead_lettered,
+            "in_flight": self._in_flight,
+            "messages_per_sec": round(recent / window, 2),
+        }
+
+    async def _handle(self, message: QueuedMessage):
+        receipt = message.receipt
+        heartbeat = asyncio.create_task(self._keep_invisible(receipt))
+        event = None
+        done = True
+        try:
+            body = json.loads(message.body)
+            event = body.get('event')
+            if await asyncio.wait_for(handle_event(body, self._session_factory), self.job_timeout):
+                self.processed += 1
+                print(f"Processed message: {event}")
+            else:
+                self.duplicates += 1
+                print(f"Skipped duplicate message: {event}")
+        except Exception as e:
+            self.failed += 1
+            print(f"Error processing message {event} (delivery {message.receive_count}): {e!r}")
+            # Stop extending before setting the retry delay
+            heartbeat.cancel()
+            done = await self._after_failure(message)
+        finally:
+            heartbeat.cancel()
+            self._completed.append(time.monotonic())
+            self._in_flight -= 1
+            self._slots.release()
+
+        if done:
+            await self._delete(receipt)
+
+    async def _after_failure(self, message: QueuedMessage) -> bool:
+        """Schedule a retry, or dead-letter the message. Returns whether to delete it."""
+        if message.receive_count < self.max_receives:
+            delay = self.retry_delay * 2 ** (message.receive_count - 1)
+            try:
+                await self._queue.extend(message.receipt, delay)
+            except Exception as e:
+                # It still comes back once the visibility timeout runs out
+                print(f"Error delaying retry: {e}")
+            return False
+
+        try:
+            if self._dead_letter_queue is None:
+                self._dead_letter_queue = get_dead_letter_queue()
+            if await self._dead_letter_queue.send_batch([message.body]):
+                raise RuntimeError("dead-letter queue rejected the message")
         except Exception as e:
-            print(f"Error in message loop: {e}")
-            time.sleep(5)
+            print(f"Error dead-lettering message: {e}")
+            return False
+        self.dead_lettered += 1
+        print(f"Moved message to the dead-letter queue after {message.receive_count} deliveries")
+        return True
+
+    async def _delete(self, receipt: str):
+        self._to_delete.append(receipt)
+        if len(self._to_delete) >= self.RECEIVE_BATCH:
+            await self._flush_deletes()
+        elif self._delete_task is None:
+            self._delete_task = asyncio.create_task(self._flush_later())
+
+    async def _keep_invisible(self, receipt: str):
+        """Extend the visibility timeout halfway through it, for as long as the message is being handled."""
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 2)
+            try:
+                await self._queue.extend(receipt, self.visibility_timeout)
+            except Exception as e:
+                print(f"Error extending message visibility: {e}")
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.DELETE_DELAY)
+        self._delete_task = None
+        await self._flush_deletes()
+
+    async def _flush_deletes(self):
+        while self._to_delete:
+            batch, self._to_delete = self._to_delete[:self.RECEIVE_BATCH], self._to_delete[self.RECEIVE_BATCH:]
+            try:
+                await self._queue.delete_batch(batch)
+            except Exception as e:
+                print(f"Error deleting messages: {e}")
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.STATS_INTERVAL)
+            print(f"Worker stats: {self.stats()}")
+
+
+def process_messages():
+    """Poll the event queue and process messages."""
+    worker = Worker(settings.worker_concurrency, settings.worker_visibility_timeout_sec)
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        print("Worker shutting down...")
 
 
 if __name__ == "__main__":
     process_messages()
-
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { DraftState, DraftRoom, Pick, Player, WebSocketMessage } from '../types';
 import { useWebSocket } from './useWebSocket';
 
@@ -17,20 +17,51 @@ export const useDraftState = ({
     room: initialRoom || null,
     picks: [],
     availablePlayers: [],
+    recommendations: null,
     myTeam: [],
     currentTurn: null,
     timerSeconds: null,
     isMyTurn: false,
   });
 
+  // Absolute pick deadline (server clock) and server-minus-local clock offset
+  const deadlineRef = useRef<number | null>(null);
+  const clockOffsetRef = useRef(0);
+
+  const updateClock = (message: WebSocketMessage) => {
+    if (typeof message.deadline_ms === 'number') {
+      deadlineRef.current = message.deadline_ms;
+      clockOffsetRef.current = message.server_time_ms - Date.now();
+    }
+  };
+
+  useEffect(() => {
+    const interval = setInterval(() => {
+      if (deadlineRef.current === null) {
+        return;
+      }
+      const serverNow = Date.now() + clockOffsetRef.current;
+      const secondsLeft = Math.max(0, Math.ceil((deadlineRef.current - serverNow) / 1000));
+      setState((prev) =>
+        prev.timerSeconds === secondsLeft ? prev : { ...prev, timerSeconds: secondsLeft }
+      );
+    }, 250);
+
+    return () => clearInterval(interval);
+  }, []);
+
   const handleMessage = useCallback((message: WebSocketMessage) => {
     switch (message.event) {
       case 'sync':
+        updateClock(message);
         setState((prev) => ({
           ...prev,
-          room: message.room,
+          room: message.room
+            ? { ...message.room, participants: message.participants || [] }
+            : message.room,
           picks: message.picks || [],
           availablePlayers: message.available_players || [],
+          recommendations: message.recommendations || null,
           myTeam: (message.picks || [])
             .filter((p: Pick) => p.user_name === userName)
             .map((p: Pick) => p.player),
@@ -38,9 +69,8 @@ export const useDraftState = ({
         break;
 
       case 'user_joined':
-      case 'user_left':
         if (message.participants) {
-          console.log('User joined/left event:', message.user, 'Participants:', message.participants);
+          console.log('User joined event:', message.user, 'Participants:', message.participants);
           setState((prev) => ({
             ...prev,
             room: prev.room
@@ -50,7 +80,32 @@ export const useDraftState = ({
         }
         break;
 
+      case 'presence':
+        // Only users whose online state or device count changed
+        setState((prev) => {
+          if (!prev.room) {
+            return prev;
+          }
+          const changes: Record<string, { online: boolean; devices: number }> = {};
+          message.changes.forEach((c: { user: string; online: boolean; devices: number }) => {
+            changes[c.user] = c;
+          });
+          return {
+            ...prev,
+            room: {
+              ...prev.room,
+              participants: prev.room.participants.map((p) =>
+                changes[p.user_name]
+                  ? { ...p, is_connected: changes[p.user_name].online, devices: changes[p.user_name].devices }
+                  : p
+              ),
+            },
+          };
+        });
+        break;
+
       case 'draft_started':
+        updateClock(message);
         setState((prev) => ({
           ...prev,
           room: prev.room ? { ...prev.room, status: 'drafting' } : null,
@@ -60,6 +115,12 @@ export const useDraftState = ({
         break;
 
       case 'pick_made':
+        if (message.next_turn) {
+          updateClock(message);
+        } else {
+          deadlineRef.current = null;
+        }
+
         const newPick: Pick = {
           pick_number: message.pick_number,
           user_name: message.user,
@@ -68,6 +129,14 @@ export const useDraftState = ({
         };
 
         setState((prev) => {
+          // The sync may already hold a pick whose event was still on its way
+          if (prev.picks.some((p) => p.pick_number === message.pick_number)) {
+            return {
+              ...prev,
+              currentTurn: message.next_turn || null,
+              isMyTurn: message.next_turn === userName,
+            };
+          }
           const updatedPicks = [...prev.picks, newPick];
           const updatedAvailable = prev.availablePlayers.filter(
             (p) => p.id !== message.player.id
@@ -77,6 +146,7 @@ export const useDraftState = ({
             ...prev,
             picks: updatedPicks,
             availablePlayers: updatedAvailable,
+            recommendations: message.recommendations || prev.recommendations,
             myTeam:
               message.user === userName
                 ? [...prev.myTeam, message.player]
@@ -91,6 +161,7 @@ export const useDraftState = ({
         break;
 
       case 'timer_tick':
+        updateClock(message);
         setState((prev) => ({
           ...prev,
           timerSeconds: message.seconds_left,
@@ -98,6 +169,7 @@ export const useDraftState = ({
         break;
 
       case 'draft_complete':
+        deadlineRef.current = null;
         setState((prev) => ({
           ...prev,
           room: prev.room ? { ...prev.room, status: 'completed' } : null,
@@ -22,9 +22,15 @@ export const useWebSocket = ({
   const reconnectTimeoutRef = useRef<NodeJS.Timeout | null>(null);
   const reconnectAttempts = useRef(0);
   const maxReconnectAttempts = 5;
+  // Highest room event seq seen; sent on reconnect so the server replays only what we missed
+  const lastSeqRef = useRef<number | null>(null);
 
   const connect = () => {
-    const wsUrl = `${config.WS_URL}/${roomId}/${userName}`;
+    // clock=deadline: count down locally from deadline_ms instead of per-second timer_tick
+    let wsUrl = `${config.WS_URL}/${roomId}/${userName}?clock=deadline`;
+    if (lastSeqRef.current !== null) {
+      wsUrl += `&last_seq=${lastSeqRef.current}`;
+    }
 
     try {
       const ws = new WebSocket(wsUrl);
@@ -39,6 +45,15 @@ export const useWebSocket = ({
       ws.onmessage = (event) => {
         try {
           const message: WebSocketMessage = JSON.parse(event.data);
+          if (typeof message.seq === 'number') {
+            if (message.event === 'sync') {
+              lastSeqRef.current = message.seq;
+            } else if (lastSeqRef.current !== null && message.seq <= lastSeqRef.current) {
+              return; // Already applied
+            } else {
+              lastSeqRef.current = message.seq;
+            }
+          }
           onMessage?.(message);
         } catch (error) {
           console.error('Error parsing WebSocket message:', error);
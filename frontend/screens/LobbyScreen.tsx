@@ -31,10 +31,20 @@ const ParticipantCard = ({ participant, isCurrentUser }: { participant: any; isC
     isCurrentUser && { borderColor: colors.primary }
   ]}>
     <View>
-      <Text style={styles.participantName}>
-        {participant.user_name}
-        {isCurrentUser && ' (You)'}
-      </Text>
+      <View style={styles.participantNameRow}>
+        {participant.is_connected !== undefined && (
+          <View
+            style={[
+              styles.statusDot,
+              participant.is_connected ? styles.statusConnected : styles.statusDisconnected,
+            ]}
+          />
+        )}
+        <Text style={styles.participantName}>
+          {participant.user_name}
+          {isCurrentUser && ' (You)'}
+        </Text>
+      </View>
       <View style={styles.participantMeta}>
         {participant.is_host && (
           <Text style={styles.hostLabel}>Host · </Text>
@@ -216,6 +226,9 @@ const styles = StyleSheet.create({
     borderRadius: 4,
     marginRight: spacing.sm,
   },
+  statusConnected: {
+    backgroundColor: colors.success,
+  },
   statusDisconnected: {
     backgroundColor: colors.error,
   },
@@ -246,6 +259,10 @@ const styles = StyleSheet.create({
     justifyContent: 'space-between',
     alignItems: 'center',
   },
+  participantNameRow: {
+    flexDirection: 'row',
+    alignItems: 'center',
+  },
   participantName: {
     fontSize: 16,
     fontWeight: '600',
@@ -2,11 +2,15 @@ import { config } from '../src/config';
 
 const API_BASE_URL = config.API_URL;
 
+export type DraftOrder = 'snake' | 'linear' | 'third_round_reversal' | 'custom';
+
 export interface CreateRoomRequest {
   name: string;
   host_name: string;
   turn_time_sec?: number;
   total_rounds?: number;
+  draft_order?: DraftOrder;
+  custom_order?: number[];
 }
 
 export interface CreateRoomResponse {
@@ -26,11 +30,12 @@ export interface JoinRoomResponse {
 export interface RoomResponse {
   id: string;
   name: string;
-  code: string;
+  code: string | null; // null once reclaimed after the draft
   status: string;
   current_pick: number;
   total_rounds: number;
   turn_time_sec: number;
+  draft_order: DraftOrder;
   participants: Array<{
     id: string;
     user_name: string;
@@ -48,6 +53,25 @@ export interface PlayersListResponse {
     fantasy_pts: number;
     [key: string]: any;
   }>;
+  next_cursor?: string | null;
+}
+
+export interface PlayerQuery {
+  position?: string;
+  team?: string;
+  sort?: string;
+  search?: string;
+  match?: 'prefix' | 'substring';
+  limit?: number;
+  cursor?: string;
+}
+
+function toQueryString(query?: PlayerQuery): string {
+  if (!query) return '';
+  const params = Object.entries(query)
+    .filter(([, value]) => value !== undefined && value !== null && value !== '')
+    .map(([key, value]) => `${key}=${encodeURIComponent(String(value))}`);
+  return params.length ? `?${params.join('&')}` : '';
 }
 
 export interface PicksListResponse {
@@ -63,6 +87,22 @@ export interface TeamsResponse {
   teams: Record<string, any[]>;
 }
 
+export interface TeamResult {
+  user_name: string;
+  draft_position: number;
+  grade: string;
+  rank: number;
+  projected_points: number;
+  total_points: number;
+  value_over_adp: number;
+  positional_strength: Record<string, number>;
+}
+
+export interface ResultsResponse {
+  // Best first
+  results: TeamResult[];
+}
+
 class ApiService {
   private baseUrl: string;
 
@@ -121,12 +161,12 @@ class ApiService {
   }
 
   // Players
-  async getPlayers(): Promise<PlayersListResponse> {
-    return this.request<PlayersListResponse>('/players');
+  async getPlayers(query?: PlayerQuery): Promise<PlayersListResponse> {
+    return this.request<PlayersListResponse>(`/players${toQueryString(query)}`);
   }
 
-  async getAvailablePlayers(roomId: string): Promise<PlayersListResponse> {
-    return this.request<PlayersListResponse>(`/players/rooms/${roomId}/available`);
+  async getAvailablePlayers(roomId: string, query?: PlayerQuery): Promise<PlayersListResponse> {
+    return this.request<PlayersListResponse>(`/players/rooms/${roomId}/available${toQueryString(query)}`);
   }
 
   // Picks
@@ -137,6 +177,11 @@ class ApiService {
   async getTeams(roomId: string): Promise<TeamsResponse> {
     return this.request<TeamsResponse>(`/rooms/${roomId}/teams`);
   }
+
+  // Team grades; 404 until the worker has graded the draft
+  async getResults(roomId: string): Promise<ResultsResponse> {
+    return this.request<ResultsResponse>(`/rooms/${roomId}/results`);
+  }
 }
 
 export const apiService = new ApiService();
@@ -22,16 +22,20 @@ export interface Participant {
   user_name: string;
   draft_position: number;
   is_host: boolean;
+  // Live presence, from sync and presence events
+  is_connected?: boolean;
+  devices?: number;
 }
 
 export interface DraftRoom {
   id: string;
   name: string;
-  code: string;
+  code: string | null; // null once reclaimed after the draft
   status: 'waiting' | 'drafting' | 'completed';
   current_pick: number;
   total_rounds: number;
   turn_time_sec: number;
+  draft_order?: 'snake' | 'linear' | 'third_round_reversal' | 'custom';
   participants: Participant[];
 }
 
@@ -47,10 +51,18 @@ export interface WebSocketMessage {
   [key: string]: any;
 }
 
+export interface Recommendations {
+  // Player ids, best first
+  overall: string[];
+  by_position: Record<string, string[]>;
+  scarcity: Record<string, { remaining: number; dropoff: number }>;
+}
+
 export interface DraftState {
   room: DraftRoom | null;
   picks: Pick[];
   availablePlayers: Player[];
+  recommendations: Recommendations | null;
   myTeam: Player[];
   currentTurn: string | null;
   timerSeconds: number | null;
@@ -1,3 +1,4 @@
 #!/bin/bash
 awslocal sqs create-queue --queue-name draft-events --region us-east-1 || true
+awslocal sqs create-queue --queue-name draft-events-dlq --region us-east-1 || true
 